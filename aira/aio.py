@@ -0,0 +1,315 @@
+"""asyncio interface of the analyzer.
+
+Measurement files are read without blocking the event loop, and decoding, signal
+processing and figure rendering run on executors, so that an asyncio application
+can run many analyses concurrently:
+
+    async with AsyncAnalyzer(max_concurrency=8) as analyzer:
+        result = await analyzer.compute(input_dict, 0.01, -60, 0.5)
+        fig = await analyzer.analyze(input_dict, 0.01, -60, 0.5)
+"""
+
+import asyncio
+import io
+import os
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Iterable, Optional, Tuple
+
+from aira.batch import PATH_KEYS
+from aira.core import AmbisonicsImpulseResponseAnalyzer, AnalysisResult
+from aira.utils import NULL_PROFILER, StageProfiler, read_signals_dict
+from aira.utils.profiling import CancellableProfiler
+
+if TYPE_CHECKING:  # Plotly is only imported when a figure is built
+    from plotly import graph_objects as go
+
+
+def _read_bytes(path: str):
+    """Reads a whole file into memory, or returns the path as is if it can not be
+    read, so that decoding reports the error."""
+    try:
+        return io.BytesIO(Path(path).read_bytes())
+    except OSError:
+        return path
+
+
+class _Slot:
+    """Slot of the concurrency limit of an AsyncAnalyzer, taken by one analysis.
+
+    Work already running on an executor can not be interrupted by cancelling its
+    task, so the slot of a cancelled analysis is only released once that work
+    finishes, and the limit holds for the executors too."""
+
+    def __init__(self, semaphore: asyncio.Semaphore) -> None:
+        self._semaphore = semaphore
+        self._loop = asyncio.get_running_loop()
+        self.running: Optional[Future] = None
+
+    def release(self) -> None:
+        """Releases the slot now, or when the work left running finishes."""
+        if self.running is None:
+            self._semaphore.release()
+        else:
+            self.running.add_done_callback(self._release_from_thread)
+
+    def _release_from_thread(self, _: Future) -> None:
+        """Releases the slot from the thread that finished the work."""
+        try:
+            self._loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:  # The event loop is closed, nothing waits for slots
+            pass
+
+
+class AsyncAnalyzer:
+    """Runs analyses of an AmbisonicsImpulseResponseAnalyzer from asyncio code.
+
+    At most `max_concurrency` analyses run at once; further calls wait for a free
+    slot, which bounds the memory and executor queues of a busy service. Cancelling
+    the task of an analysis stops it before its next stage.
+
+    Parameters
+    ----------
+    analyzer : AmbisonicsImpulseResponseAnalyzer, optional
+        Analyzer shared by all the analyses, by default a new one without caches
+    max_concurrency : int, optional
+        Maximum number of analyses run at once, by default os.cpu_count()
+    io_executor : Executor, optional
+        Executor of the file reads, by default the event loop default executor
+    decode_executor : Executor, optional
+        Executor of the audio decoding, by default `compute_executor`
+    compute_executor : Executor, optional
+        Executor of the signal processing, by default a thread pool of
+        `max_concurrency` threads, shut down by `aclose()`
+    render_executor : Executor, optional
+        Executor of the figure rendering, by default `compute_executor`
+    """
+
+    def __init__(
+        # pylint: disable=too-many-arguments
+        self,
+        analyzer: AmbisonicsImpulseResponseAnalyzer = None,
+        max_concurrency: int = None,
+        io_executor: Executor = None,
+        decode_executor: Executor = None,
+        compute_executor: Executor = None,
+        render_executor: Executor = None,
+    ) -> None:
+        self.analyzer = analyzer or AmbisonicsImpulseResponseAnalyzer()
+        self.max_concurrency = max_concurrency or os.cpu_count()
+        self._owned_executor = None
+        if compute_executor is None:
+            compute_executor = ThreadPoolExecutor(
+                max_workers=self.max_concurrency, thread_name_prefix="aira"
+            )
+            self._owned_executor = compute_executor
+        self.io_executor = io_executor
+        self.compute_executor = compute_executor
+        self.decode_executor = decode_executor or compute_executor
+        self.render_executor = render_executor or compute_executor
+        self._semaphore = None
+
+    async def __aenter__(self) -> "AsyncAnalyzer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Shuts down the executor created by the analyzer, if any, waiting for its
+        running analyses to stop."""
+        if self._owned_executor is not None:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._owned_executor.shutdown
+            )
+            self._owned_executor = None
+
+    @property
+    def _slots(self) -> asyncio.Semaphore:
+        """Semaphore bounding the running analyses, created in the running loop."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _acquire_slot(self) -> _Slot:
+        """Waits for a free slot of the concurrency limit."""
+        await self._slots.acquire()
+        return _Slot(self._slots)
+
+    async def _run(
+        self, executor: Executor, function: Callable, *args, slot: _Slot = None
+    ):
+        """Runs a blocking function on an executor. If the caller is cancelled while
+        the function runs, `slot` is held until it finishes."""
+        if slot is None:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, partial(function, *args)
+            )
+        future = executor.submit(function, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if not future.cancel():
+                slot.running = future
+            raise
+
+    async def read(self, input_dict: dict) -> dict:
+        """Reads the measurement files of an input dictionary concurrently and
+        decodes them from memory.
+
+        Parameters
+        ----------
+        input_dict : dict
+            Input dictionary with the measurements paths, input mode, channels per
+            file and frequency correction flag
+
+        Returns
+        -------
+        dict
+            Copy of input_dict with the decoded signals and their sample rate
+        """
+        return await self._read(input_dict)
+
+    async def _read(self, input_dict: dict, slot: _Slot = None) -> dict:
+        """Reads and decodes measurements, holding `slot` while decoding."""
+        keys = [
+            key for key in PATH_KEYS if isinstance(input_dict.get(key), (str, Path))
+        ]
+        contents = await asyncio.gather(
+            *(self._run(self.io_executor, _read_bytes, input_dict[key]) for key in keys)
+        )
+        in_memory = {**input_dict, **dict(zip(keys, contents))}
+        return await self._run(
+            self.decode_executor, read_signals_dict, in_memory, slot=slot
+        )
+
+    async def compute(
+        self,
+        input_dict: dict,
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+        profiler: StageProfiler = None,
+    ) -> AnalysisResult:
+        """Asynchronous version of AmbisonicsImpulseResponseAnalyzer.compute."""
+        slot = await self._acquire_slot()
+        try:
+            return await self._compute(
+                input_dict,
+                integration_time,
+                intensity_threshold,
+                analysis_length,
+                profiler,
+                slot,
+            )
+        finally:
+            slot.release()
+
+    async def _compute(
+        # pylint: disable=too-many-arguments
+        self,
+        input_dict: dict,
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+        profiler: Optional[StageProfiler],
+        slot: _Slot,
+    ) -> AnalysisResult:
+        """Reads and analyzes a set of measurements in a slot of the concurrency
+        limit."""
+        signals_dict = await self._read(input_dict, slot)
+        # Cancellation can not reach analyses running in other processes
+        if isinstance(self.compute_executor, ProcessPoolExecutor):
+            cancellable = profiler
+        else:
+            cancellable = CancellableProfiler(profiler or NULL_PROFILER)
+        try:
+            result = await self._run(
+                self.compute_executor,
+                self.analyzer.compute,
+                signals_dict,
+                integration_time,
+                intensity_threshold,
+                analysis_length,
+                cancellable,
+                slot=slot,
+            )
+        except asyncio.CancelledError:
+            if isinstance(cancellable, CancellableProfiler):
+                cancellable.cancel()
+                if slot.running is None:  # The analysis never started
+                    cancellable.close()
+            raise
+        if isinstance(cancellable, CancellableProfiler):
+            result.profiler = profiler
+        return result
+
+    async def analyze(
+        # pylint: disable=too-many-arguments
+        self,
+        input_dict: dict,
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+        profiler: StageProfiler = None,
+    ) -> "go.Figure":
+        """Asynchronous version of AmbisonicsImpulseResponseAnalyzer.analyze. The
+        figure is rendered on the render executor."""
+        slot = await self._acquire_slot()
+        try:
+            result = await self._compute(
+                input_dict,
+                integration_time,
+                intensity_threshold,
+                analysis_length,
+                profiler,
+                slot,
+            )
+            return await self._run(self.render_executor, result.to_figure, slot=slot)
+        finally:
+            slot.release()
+
+    async def compute_many(
+        self,
+        input_dicts: Iterable[dict],
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+    ) -> AsyncIterator[Tuple[int, AnalysisResult]]:
+        """Analyzes many sets of measurements concurrently and yields each result as
+        soon as it is ready. Only `max_concurrency` analyses are scheduled at a time,
+        so `input_dicts` may be a lazy iterable of any length. Closing the iterator
+        cancels the pending analyses.
+
+        Yields
+        ------
+        Tuple[int, AnalysisResult]
+            Position of the input in `input_dicts` and its result. Analyses that
+            fail raise their exception from the iterator
+        """
+        parameters = (integration_time, intensity_threshold, analysis_length)
+        remaining = enumerate(input_dicts)
+        running = {}
+        try:
+            while True:
+                for index, input_dict in remaining:
+                    task = asyncio.ensure_future(self.compute(input_dict, *parameters))
+                    running[task] = index
+                    if len(running) >= self.max_concurrency:
+                        break
+                if not running:
+                    return
+                finished, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in finished:
+                    yield running.pop(task), task.result()
+        finally:
+            for task in running:
+                task.cancel()
@@ -0,0 +1,340 @@
+"""Batch analysis of measurement positions on a process pool.
+
+Positions are listed in a CSV or TOML manifest. Every position needs an input mode
+and the paths of its files, using the same keys as the input dictionaries of
+AmbisonicsImpulseResponseAnalyzer (`stacked_signals`, `front_left_up`, ...,
+`inverse_filter`). Relative paths are resolved from the manifest directory.
+
+CSV manifests have one row per position:
+
+    position,input_mode,channels_per_file,frequency_correction,stacked_signals
+    s1r1,bformat,4,false,s1r1.wav
+
+TOML manifests have an optional `[defaults]` table and one `[[positions]]` table
+per position. Any position may override `integration_time`, `intensity_threshold`
+and `analysis_length`.
+
+Results are written as JSON lines as soon as each position finishes, so an
+interrupted run can be resumed by running the same command again:
+
+    python -m aira.batch manifest.csv --output results.jsonl --workers 8
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Union
+
+import soundfile as sf
+
+from aira.core import RESULT_ARRAY_KEYS, AmbisonicsImpulseResponseAnalyzer
+from aira.engine.input import InputMode
+from aira.utils.shared import (
+    SharedArray,
+    SharedArrayHandle,
+    attach_cached,
+    receive_arrays,
+    share_arrays,
+)
+
+INTEGRATION_TIME = 0.01
+INTENSITY_THRESHOLD = -60
+ANALYSIS_LENGTH = 0.5
+PATH_KEYS = (
+    "stacked_signals",
+    "front_left_up",
+    "front_right_down",
+    "back_right_up",
+    "back_left_down",
+    "w_channel",
+    "x_channel",
+    "y_channel",
+    "z_channel",
+    "inverse_filter",
+)
+PARAMETER_KEYS = ("integration_time", "intensity_threshold", "analysis_length")
+SHARED_RESULT_MIN_BYTES = 64 * 1024  # Smaller result arrays are pickled
+
+
+def read_manifest(manifest_path: Union[str, Path]) -> List[dict]:
+    """Reads the positions of a CSV or TOML manifest.
+
+    Parameters
+    ----------
+    manifest_path : str | Path
+        Path of the manifest. The format is chosen by its extension
+
+    Returns
+    -------
+    List[dict]
+        One dictionary per position, with absolute paths
+    """
+    manifest_path = Path(manifest_path)
+    if manifest_path.suffix == ".toml":
+        try:
+            import tomllib  # pylint: disable=import-outside-toplevel
+        except ModuleNotFoundError:  # Python < 3.11
+            import tomli as tomllib  # pylint: disable=import-outside-toplevel
+
+        with open(manifest_path, "rb") as manifest_file:
+            manifest = tomllib.load(manifest_file)
+        defaults = manifest.get("defaults", {})
+        positions = [{**defaults, **position} for position in manifest["positions"]]
+    else:
+        with open(manifest_path, "r", encoding="utf-8", newline="") as manifest_file:
+            positions = [
+                {key: value for key, value in row.items() if value not in ("", None)}
+                for row in csv.DictReader(manifest_file)
+            ]
+
+    for position in positions:
+        for key in PATH_KEYS:
+            if key in position:
+                position[key] = str(manifest_path.parent / position[key])
+    return positions
+
+
+def _parse_bool(value: Union[str, bool]) -> bool:
+    """Parses booleans written as text in CSV manifests."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "y")
+    return bool(value)
+
+
+def position_input_dict(position: dict) -> dict:
+    """Builds the analyzer input dictionary of a manifest position. Signals shared
+    by the parent process are mapped instead of read from disk."""
+    input_dict = {
+        key: attach_cached(position[key])
+        if isinstance(position[key], SharedArrayHandle)
+        else position[key]
+        for key in PATH_KEYS
+        if key in position
+    }
+    input_dict["input_mode"] = InputMode(str(position["input_mode"]).lower())
+    input_dict["channels_per_file"] = int(position.get("channels_per_file", 1))
+    input_dict["frequency_correction"] = _parse_bool(
+        position.get("frequency_correction", False)
+    )
+    return input_dict
+
+
+def analyze_position(position: dict, parameters: dict, include_w_channel: bool):
+    """Analyzes a single position. Runs in the worker processes.
+
+    Returns
+    -------
+    dict
+        Record with the position name, its status and either the analysis result or
+        the error message
+    """
+    start = time.perf_counter()
+    parameters = {
+        key: float(position.get(key, parameters[key])) for key in PARAMETER_KEYS
+    }
+    try:
+        result = AmbisonicsImpulseResponseAnalyzer().compute(
+            position_input_dict(position), **parameters
+        )
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        return {
+            "position": position["position"],
+            "status": "error",
+            "error": f"{type(error).__name__}: {error}",
+        }
+    # Result arrays of a few values are pickled with the record, a shared memory
+    # block costs more. Only large ones, like the w-channel envelope, use it
+    result_dict = result.to_dict(include_w_channel=False)
+    large_arrays = {}
+    for key in RESULT_ARRAY_KEYS:
+        if key == "w_channel" and not include_w_channel:
+            continue
+        array = getattr(result, key)
+        if array.nbytes >= SHARED_RESULT_MIN_BYTES:
+            large_arrays[key] = array
+            result_dict.pop(key, None)
+        else:
+            result_dict[key] = array.tolist()
+    return {
+        "position": position["position"],
+        "status": "ok",
+        "elapsed": time.perf_counter() - start,
+        "result": result_dict,
+        "shared_arrays": share_arrays(large_arrays) if large_arrays else {},
+    }
+
+
+def share_inverse_filters(positions: List[dict]) -> List[SharedArray]:
+    """Decodes every distinct inverse filter of the positions once into shared
+    memory, and points the positions to it so that workers map it instead of reading
+    and decoding it again.
+
+    Returns
+    -------
+    List[SharedArray]
+        Shared inverse filters, to be unlinked when the batch finishes
+    """
+    shared = {}
+    for position in positions:
+        path = position.get("inverse_filter")
+        if not isinstance(path, str):
+            continue
+        if path not in shared:
+            try:
+                shared[path] = SharedArray.create(sf.read(path)[0].T)
+            except sf.SoundFileError:
+                continue  # Reported by the worker when analyzing the position
+        position["inverse_filter"] = shared[path].handle
+    return list(shared.values())
+
+
+def completed_positions(output_path: Path) -> set:
+    """Names of the positions already analyzed successfully in an output file."""
+    if not output_path.exists():
+        return set()
+    completed = set()
+    with open(output_path, "r", encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:  # Line truncated by an interruption
+                continue
+            if record.get("status") == "ok":
+                completed.add(record["position"])
+    return completed
+
+
+def run_batch(
+    # pylint: disable=too-many-arguments
+    positions: Iterable[dict],
+    output_path: Union[str, Path],
+    parameters: Dict[str, float],
+    workers: int = None,
+    include_w_channel: bool = False,
+    resume: bool = True,
+) -> Dict[str, int]:
+    """Analyzes positions on a process pool and appends each result to a JSON lines
+    file as soon as it is ready.
+
+    Parameters
+    ----------
+    positions : Iterable[dict]
+        Positions as returned by `read_manifest`
+    output_path : str | Path
+        JSON lines file where results are appended
+    parameters : Dict[str, float]
+        Default integration time, intensity threshold and analysis length
+    workers : int, optional
+        Number of worker processes, by default os.cpu_count()
+    include_w_channel : bool, optional
+        Includes the w-channel envelope in the results, by default False
+    resume : bool, optional
+        Skips positions already analyzed successfully in `output_path`, by default
+        True
+
+    Returns
+    -------
+    Dict[str, int]
+        Number of positions analyzed, failed and skipped
+    """
+    output_path = Path(output_path)
+    done = completed_positions(output_path) if resume else set()
+    pending = []
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    for position in positions:
+        if position["position"] in done:
+            counts["skipped"] += 1
+        else:
+            pending.append(position)
+    if not pending:
+        return counts
+
+    workers = workers or os.cpu_count()
+    pending = [dict(position) for position in pending]
+    shared_filters = share_inverse_filters(pending)
+    # Unlinked even if the run is interrupted, not to leak shared memory
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor, open(
+            output_path, "a" if resume else "w", encoding="utf-8"
+        ) as output_file:
+            # Bounded submission keeps memory flat for manifests of any size
+            remaining = iter(pending)
+            running = set()
+            while True:
+                for position in remaining:
+                    running.add(
+                        executor.submit(
+                            analyze_position, position, parameters, include_w_channel
+                        )
+                    )
+                    if len(running) >= 2 * workers:
+                        break
+                if not running:
+                    break
+                finished, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = future.result()
+                    arrays = receive_arrays(record.pop("shared_arrays", {}))
+                    if arrays:
+                        record["result"].update(
+                            {key: value.tolist() for key, value in arrays.items()}
+                        )
+                    output_file.write(json.dumps(record) + "\n")
+                    output_file.flush()
+                    counts[record["status"]] += 1
+    finally:
+        for shared_filter in shared_filters:
+            shared_filter.unlink()
+    return counts
+
+
+def main(argv: List[str] = None) -> int:
+    """Command line entry point of the batch analysis."""
+    parser = argparse.ArgumentParser(
+        prog="aira-batch", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("manifest", help="CSV or TOML manifest of positions")
+    parser.add_argument("--output", default="results.jsonl", help="JSON lines file")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--integration-time", type=float, default=INTEGRATION_TIME)
+    parser.add_argument(
+        "--intensity-threshold", type=float, default=INTENSITY_THRESHOLD
+    )
+    parser.add_argument("--analysis-length", type=float, default=ANALYSIS_LENGTH)
+    parser.add_argument(
+        "--w-channel", action="store_true", help="Include the w-channel envelope"
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="Ignore and overwrite previous results"
+    )
+    args = parser.parse_args(argv)
+
+    parameters = {
+        "integration_time": args.integration_time,
+        "intensity_threshold": args.intensity_threshold,
+        "analysis_length": args.analysis_length,
+    }
+    start = time.perf_counter()
+    counts = run_batch(
+        read_manifest(args.manifest),
+        args.output,
+        parameters,
+        workers=args.workers,
+        include_w_channel=args.w_channel,
+        resume=not args.restart,
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{counts['ok']} analyzed, {counts['error']} failed, "
+        f"{counts['skipped']} already done in {elapsed:.1f} s"
+    )
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
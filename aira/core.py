@@ -1,7 +1,8 @@
 """Core processing for AIRA module."""
+from dataclasses import dataclass, field, fields, replace
+from typing import TYPE_CHECKING, Optional, Tuple
+
 import numpy as np
-from dataclasses import dataclass
-from plotly import graph_objects as go
 
 from aira.engine.input import InputProcessorChain, InputMode
 from aira.engine.intensity import (
@@ -11,16 +12,475 @@ from aira.engine.intensity import (
     intensity_thresholding,
 )
 from aira.engine.pressure import w_channel_preprocess
-from aira.engine.plot import hedgehog, w_channel, setup_plotly_layout, get_xy_projection
 from aira.engine.reflections import detect_reflections
-from aira.utils import read_signals_dict, cartesian_to_spherical
+from aira.utils import (
+    read_signals_dict,
+    cartesian_to_spherical,
+    StageProfiler,
+    NULL_PROFILER,
+)
+from aira.utils.cache import BFormatCache, ResultCache, hash_inputs
+
+if TYPE_CHECKING:  # Plotly is only imported when a figure is built
+    from plotly import graph_objects as go
+
+RESULT_ARRAY_KEYS = (
+    "reflection_times",
+    "reflection_levels",
+    "reflection_azimuths",
+    "reflection_elevations",
+    "w_channel",
+)
+DETECTION_ARRAY_KEYS = (
+    "detection_times",
+    "detection_levels",
+    "detection_azimuths",
+    "detection_elevations",
+)
+
+
+@dataclass
+class AnalysisResult:
+    """Numerical results of the analysis of a set of measurements.
+
+    Attributes
+    ----------
+    reflection_times : np.ndarray
+        Time of each reflection from the direct sound in seconds. The first element
+        is the direct sound
+    reflection_levels : np.ndarray
+        Reflection-to-direct intensity ratio in dB of each reflection
+    reflection_azimuths : np.ndarray
+        Azimuth of each reflection in degrees
+    reflection_elevations : np.ndarray
+        Elevation of each reflection in degrees
+    w_channel : np.ndarray
+        Normalized moving average envelope of the omnidirectional channel
+    sample_rate : int
+        Sample rate of the measurements
+    integration_time : float
+        Integration time used in the analysis, in seconds
+    intensity_threshold : float
+        Intensity threshold used in the analysis, in dB
+    analysis_length : float
+        Analysis length used in the analysis, in seconds
+    profiler : StageProfiler, optional
+        Per-stage measurements, if the analysis was instrumented
+    detection_times, detection_levels, detection_azimuths, detection_elevations :
+    np.ndarray, optional
+        Every reflection detected before thresholding, so that `with_threshold` can
+        apply another threshold without analyzing the measurements again. Not
+        included in `to_dict`
+    """
+
+    # pylint: disable=too-many-instance-attributes
+    reflection_times: np.ndarray
+    reflection_levels: np.ndarray
+    reflection_azimuths: np.ndarray
+    reflection_elevations: np.ndarray
+    w_channel: np.ndarray
+    sample_rate: int
+    integration_time: float
+    intensity_threshold: float
+    analysis_length: float
+    profiler: Optional[StageProfiler] = None
+    detection_times: Optional[np.ndarray] = None
+    detection_levels: Optional[np.ndarray] = None
+    detection_azimuths: Optional[np.ndarray] = None
+    detection_elevations: Optional[np.ndarray] = None
+
+    def to_dict(self, include_w_channel: bool = True) -> dict:
+        """Converts the result to a JSON serializable dictionary.
+
+        Parameters
+        ----------
+        include_w_channel : bool, optional
+            Includes the w-channel envelope, by default True
+
+        Returns
+        -------
+        dict
+            Arrays as lists and analysis parameters
+        """
+        result_dict = {
+            key: value
+            for key, value in self.values().items()
+            if key not in DETECTION_ARRAY_KEYS
+        }
+        if not include_w_channel:
+            del result_dict["w_channel"]
+        return {
+            key: value.tolist() if isinstance(value, np.ndarray) else value
+            for key, value in result_dict.items()
+        }
+
+    def values(self) -> dict:
+        """Arrays and analysis parameters of the result, without the profiler. The
+        detections are included when the result has them."""
+        return {
+            field_i.name: getattr(self, field_i.name)
+            for field_i in fields(self)
+            if field_i.name != "profiler" and getattr(self, field_i.name) is not None
+        }
+
+    @classmethod
+    def from_dict(cls, result_dict: dict) -> "AnalysisResult":
+        """Builds a result from the output of `to_dict` or `values`."""
+        arrays = {
+            key: np.asarray(result_dict.get(key, []), dtype=float)
+            for key in RESULT_ARRAY_KEYS
+        }
+        detections = {
+            key: np.asarray(result_dict[key], dtype=float)
+            for key in DETECTION_ARRAY_KEYS
+            if key in result_dict
+        }
+        return cls(
+            **arrays,
+            **detections,
+            sample_rate=result_dict["sample_rate"],
+            integration_time=result_dict["integration_time"],
+            intensity_threshold=result_dict["intensity_threshold"],
+            analysis_length=result_dict["analysis_length"],
+        )
+
+    def with_threshold(self, intensity_threshold: float) -> "AnalysisResult":
+        """Returns the result of the same analysis with another intensity threshold,
+        selecting the reflections among the stored detections instead of analyzing
+        the measurements again.
+
+        Parameters
+        ----------
+        intensity_threshold : float
+            Bottom limit for the reflection-to-direct ratio in dB
+
+        Returns
+        -------
+        AnalysisResult
+            Copy of the result with the reflections above the threshold
+
+        Raises
+        ------
+        ValueError
+            If the result does not hold the detections, e.g. it was built from the
+            output of `to_dict`
+        """
+        if self.detection_levels is None:
+            raise ValueError("The result does not hold the detected reflections")
+        mask = self.detection_levels > intensity_threshold
+        return replace(
+            self,
+            reflection_times=self.detection_times[mask],
+            reflection_levels=self.detection_levels[mask],
+            reflection_azimuths=self.detection_azimuths[mask],
+            reflection_elevations=self.detection_elevations[mask],
+            intensity_threshold=intensity_threshold,
+        )
+
+    @property
+    def w_channel_time(self) -> np.ndarray:
+        """Time axis of the omnidirectional channel envelope in miliseconds."""
+        return np.arange(0, self.analysis_length, 1 / self.sample_rate) * 1000
+
+    def to_figure(self) -> "go.Figure":
+        """Builds the Plotly figure with the hedgehog and the w-channel plot.
+
+        Returns
+        -------
+        go.Figure
+            Plotly figure with hedgehog and w-channel plot
+        """
+        # pylint: disable=import-outside-toplevel
+        from aira.engine import plot
+
+        # hedgehog converts the times to miliseconds in place
+        time = self.reflection_times.copy()
+
+        fig = plot.setup_plotly_layout()
+
+        plot.hedgehog(
+            fig,
+            time,
+            self.reflection_levels,
+            self.reflection_azimuths,
+            self.reflection_elevations,
+        )
+
+        plot.w_channel(
+            fig,
+            self.w_channel_time,
+            self.w_channel,
+            time,
+        )
+        return fig
+
+    def to_xy_projection(self, size: int = None) -> np.ndarray:
+        """Draws the hedgehog seen from above as an RGBA image, e.g. to place it on a
+        floor plan. It is rasterized with NumPy, without Plotly nor a browser.
+
+        Parameters
+        ----------
+        size : int, optional
+            Width and height of the image in pixels, by default
+            aira.engine.raster.DEFAULT_SIZE
+
+        Returns
+        -------
+        np.ndarray
+            RGBA image of shape (size, size, 4) and dtype uint8
+        """
+        # pylint: disable=import-outside-toplevel
+        from aira.engine import raster
+
+        return raster.rasterize_hedgehog(
+            self.reflection_levels,
+            self.reflection_azimuths,
+            self.reflection_elevations,
+            size or raster.DEFAULT_SIZE,
+        )
+
+    def update_figure(self, fig: "go.Figure") -> "go.Figure":
+        """Shows the reflections of this result in a figure built by `to_figure` for
+        the same measurements and integration time (e.g. with another threshold),
+        patching the data of its traces instead of building it again.
+
+        Parameters
+        ----------
+        fig : go.Figure
+            Figure built by `to_figure`, updated in place
+
+        Returns
+        -------
+        go.Figure
+            The updated figure
+        """
+        # pylint: disable=import-outside-toplevel
+        from aira.engine import plot
+
+        return plot.update_reflections(
+            fig,
+            self.reflection_times * 1000,
+            self.reflection_levels,
+            self.reflection_azimuths,
+            self.reflection_elevations,
+        )
 
 
 @dataclass
 class AmbisonicsImpulseResponseAnalyzer:
-    """Main class for analyzing Ambisonics impulse responses"""
+    """Main class for analyzing Ambisonics impulse responses. Analyses keep their
+    state in local variables and never modify the given input dictionary, so a
+    single analyzer can be used from several threads at once.
+
+    Attributes
+    ----------
+    input_builder : InputProcessorChain
+        Chain of processors that converts the measurements to B-format, one per
+        analyzer
+    cache : ResultCache, optional
+        On-disk cache of results and figures, keyed on the content of the input
+        files, the input settings and the analysis parameters. By default None
+    bformat_cache : BFormatCache, optional
+        On-disk cache of the processed B-format signals, keyed on the content of the
+        input files and the input settings. Analyses of the same files with other
+        parameters skip decoding, deconvolution and correction. By default None
+    """
 
-    input_builder = InputProcessorChain()
+    input_builder: InputProcessorChain = field(default_factory=InputProcessorChain)
+    cache: Optional[ResultCache] = None
+    bformat_cache: Optional[BFormatCache] = None
+
+    def _cache_key(
+        self,
+        input_dict: dict,
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+    ) -> Optional[str]:
+        """Key of the analysis of `input_dict` in the result cache, or None if it
+        can not be cached."""
+        return hash_inputs(
+            input_dict,
+            integration_time=integration_time,
+            intensity_threshold=intensity_threshold,
+            analysis_length=analysis_length,
+        )
+
+    def bformat_signals(
+        self, input_dict: dict, profiler: StageProfiler = None
+    ) -> Tuple[np.ndarray, int]:
+        """Decodes and processes the measurements into B-format signals, or maps them
+        from the B-format cache. They can be analyzed again with other parameters by
+        passing them as the "stacked_signals" of an input dictionary in BFORMAT mode,
+        along with their "sample_rate".
+
+        Parameters
+        ----------
+        input_dict : dict
+            Dictionary with all the data needed to analyze a set of measurements
+            (paths of the measurements, input mode, channels per file, etc.)
+        profiler : StageProfiler, optional
+            Records the decoding and input processing stages, by default None
+
+        Returns
+        -------
+        Tuple[np.ndarray, int]
+            B-format signals (W, X, Y, Z rows) and their sample rate
+        """
+        profiler = profiler or NULL_PROFILER
+        bformat_key = None
+        if self.bformat_cache is not None:
+            with profiler.stage("bformat_cache"):
+                bformat_key = hash_inputs(input_dict)
+                cached = self.bformat_cache.load(bformat_key) if bformat_key else None
+            if cached is not None:
+                return cached
+
+        with profiler.stage("decode"):
+            signals_dict = read_signals_dict(input_dict)
+            sample_rate = signals_dict["sample_rate"]
+
+        bformat_signals = self.input_builder.process(signals_dict, profiler)
+
+        if bformat_key is not None:
+            self.bformat_cache.store(bformat_key, bformat_signals, sample_rate)
+        return bformat_signals, sample_rate
+
+    def compute(
+        self,
+        input_dict: dict,
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+        profiler: StageProfiler = None,
+    ) -> AnalysisResult:
+        """Analyzes a set of measurements in Ambisonics format without building any
+        figure.
+
+        Parameters
+        ----------
+        input_dict : dict
+            Dictionary with all the data needed to analyze a set of measurements
+            (paths of the measurements, input mode, channels per file, etc.)
+        integration_time : float
+            Time frame where intensity vectors are integrated by the mean of them
+        intensity_threshold : float
+            Bottom limit for intensity values in dB
+        analysis_length : float
+            Total time of analysis from intensity max peak
+        profiler : StageProfiler, optional
+            Records wall time, CPU time and peak memory of every stage (decode,
+            deconvolution, A to B conversion, correction, intensity, integration and
+            detection). By default None, which disables instrumentation
+
+        Returns
+        -------
+        AnalysisResult
+            Reflections times, levels and directions and w-channel envelope. Taken
+            from the cache of the analyzer when it has one and holds the result
+        """
+        instrumented = profiler
+        profiler = profiler or NULL_PROFILER
+        # Closed even when the analysis fails or is cancelled, so that memory
+        # tracing never outlives it
+        try:
+            result = self._compute(
+                input_dict,
+                integration_time,
+                intensity_threshold,
+                analysis_length,
+                profiler,
+            )
+        finally:
+            profiler.close()
+        result.profiler = instrumented
+        return result
+
+    def _compute(
+        self,
+        input_dict: dict,
+        integration_time: float,
+        intensity_threshold: float,
+        analysis_length: float,
+        profiler: StageProfiler,
+    ) -> AnalysisResult:
+        """Runs the stages of `compute` with a profiler, without closing it."""
+        cache_key = None
+        if self.cache is not None:
+            with profiler.stage("cache"):
+                cache_key = self._cache_key(
+                    input_dict, integration_time, intensity_threshold, analysis_length
+                )
+                cached = self.cache.load(cache_key) if cache_key else None
+            if cached is not None:
+                return AnalysisResult.from_dict(cached)
+
+        bformat_signals, sample_rate = self.bformat_signals(input_dict, profiler)
+
+        with profiler.stage("intensity"):
+            intensity_directions = convert_bformat_to_intensity(bformat_signals)
+
+            intensity_directions_cropped = analysis_crop_2d(
+                analysis_length, sample_rate, intensity_directions
+            )
+
+        with profiler.stage("integration"):
+            intensity_windowed, time = integrate_intensity_directions(
+                intensity_directions_cropped, integration_time, sample_rate
+            )
+
+            intensity, azimuth, elevation = cartesian_to_spherical(intensity_windowed)
+
+        with profiler.stage("detection"):
+            (
+                intensity_peaks,
+                azimuth_peaks,
+                elevation_peaks,
+                reflections_idx,
+            ) = detect_reflections(intensity, azimuth, elevation)
+
+            # Every detection is kept, so that the result can be thresholded again
+            (
+                reflex_to_direct,
+                azimuth_peaks,
+                elevation_peaks,
+                reflections_idx,
+            ) = intensity_thresholding(
+                -np.inf,
+                intensity_peaks,
+                azimuth_peaks,
+                elevation_peaks,
+                reflections_idx,
+            )
+
+            time = time[reflections_idx]
+
+        with profiler.stage("w_channel"):
+            w_channel_signal = w_channel_preprocess(
+                bformat_signals[0, :],
+                int(integration_time * sample_rate),
+                analysis_length,
+                sample_rate,
+            )
+
+        result = AnalysisResult(
+            reflection_times=time,
+            reflection_levels=reflex_to_direct,
+            reflection_azimuths=azimuth_peaks,
+            reflection_elevations=elevation_peaks,
+            w_channel=w_channel_signal,
+            sample_rate=sample_rate,
+            integration_time=integration_time,
+            intensity_threshold=-np.inf,
+            analysis_length=analysis_length,
+            detection_times=time,
+            detection_levels=reflex_to_direct,
+            detection_azimuths=azimuth_peaks,
+            detection_elevations=elevation_peaks,
+        ).with_threshold(intensity_threshold)
+        if cache_key is not None:
+            self.cache.store(cache_key, result.values())
+        return result
 
     def analyze(
         self,
@@ -29,9 +489,11 @@ class AmbisonicsImpulseResponseAnalyzer:
         intensity_threshold: float,
         analysis_length: float,
         show: bool = False,
-    ) -> go.Figure:
+        profiler: StageProfiler = None,
+    ) -> "go.Figure":
         """Analyzes a set of measurements in Ambisonics format and plots a hedgehog
-        with the estimated reflections direction.
+        with the estimated reflections direction. If the analyzer has a cache, the
+        figure of a previous analysis of the same files and parameters is reused.
 
         Parameters
         ----------
@@ -47,76 +509,64 @@ class AmbisonicsImpulseResponseAnalyzer:
             Total time of analysis from intensity max peak, by default ANALYSIS_LENGTH
         show : bool, optional
             Shows plotly figure in browser, by default False
+        profiler : StageProfiler, optional
+            Records wall time, CPU time and peak memory of every stage, plotting
+            included. By default None, which disables instrumentation
 
         Returns
         -------
         go.Figure
             Plotly figure with hedgehog and w-channel plot
         """
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(
+                input_dict, integration_time, intensity_threshold, analysis_length
+            )
+            figure_json = self.cache.load_figure(cache_key) if cache_key else None
+            if figure_json is not None:
+                import plotly.io as pio  # pylint: disable=import-outside-toplevel
 
-        signals_dict = read_signals_dict(input_dict)
-        sample_rate = signals_dict["sample_rate"]
-
-        bformat_signals = self.input_builder.process(input_dict)
-
-        intensity_directions = convert_bformat_to_intensity(bformat_signals)
+                fig = pio.from_json(figure_json)
+                if show:
+                    fig.show()
+                return fig
 
-        intensity_directions_cropped = analysis_crop_2d(
-            analysis_length, sample_rate, intensity_directions
-        )
-
-        intensity_windowed, time = integrate_intensity_directions(
-            intensity_directions_cropped, integration_time, sample_rate
-        )
-
-        intensity, azimuth, elevation = cartesian_to_spherical(intensity_windowed)
-
-        (
-            intensity_peaks,
-            azimuth_peaks,
-            elevation_peaks,
-            reflections_idx,
-        ) = detect_reflections(intensity, azimuth, elevation)
-
-        (
-            reflex_to_direct,
-            azimuth_peaks,
-            elevation_peaks,
-            reflections_idx,
-        ) = intensity_thresholding(
+        result = self.compute(
+            input_dict,
+            integration_time,
             intensity_threshold,
-            intensity_peaks,
-            azimuth_peaks,
-            elevation_peaks,
-            reflections_idx,
-        )
-
-        time = time[reflections_idx]
-
-        fig = setup_plotly_layout()
-
-        hedgehog(fig, time, reflex_to_direct, azimuth_peaks, elevation_peaks)
-
-        w_channel_signal = w_channel_preprocess(
-            bformat_signals[0, :],
-            int(integration_time * sample_rate),
             analysis_length,
-            sample_rate,
+            profiler,
         )
 
-        w_channel(
-            fig,
-            np.arange(0, analysis_length, 1 / sample_rate) * 1000,
-            w_channel_signal,
-            intensity_threshold,
-            time,
-        )
+        profiler = profiler or NULL_PROFILER
+        try:
+            with profiler.stage("plotting"):
+                fig = result.to_figure()
+        finally:
+            profiler.close()
+        if cache_key is not None:
+            self.cache.store_figure(cache_key, fig.to_json())
 
         if show:
             fig.show()
         return fig
 
-    def export_xy_projection(self, fig: go.Figure, img_name: str):
+    def export_xy_projection(self, fig: "go.Figure", img_name: str):
+        """Exports the top view of the hedgehog of a figure as a PNG image, without
+        the w-channel plot, axes and colorbar.
+
+        Parameters
+        ----------
+        fig : go.Figure
+            Figure returned by `analyze`
+        img_name : str
+            Path of the PNG image
+        """
+        # pylint: disable=import-outside-toplevel
+        from aira.engine.plot import get_xy_projection
+
         new_fig = get_xy_projection(fig)
         new_fig.write_image(img_name, format="png")
 
@@ -1,7 +1,6 @@
 """Functionality for filtering signals."""
 
 import numpy as np
-from scipy.signal import bilinear, firwin, kaiserord, lfilter
 
 MIC2CENTER = 3
 SOUND_SPEED = 340
@@ -48,6 +47,9 @@ class NonCoincidentMicsCorrection:
             Filtered array
         """
 
+        # pylint: disable=import-outside-toplevel
+        from scipy.signal import bilinear, lfilter
+
         # Analog to digital filter conversion
         zeros, poles = bilinear(b, a, self.sample_rate)
 
@@ -119,6 +121,9 @@ def apply_low_pass_filter(
     Returns:
         np.ndarray: filtered signal.
     """
+    # pylint: disable=import-outside-toplevel
+    from scipy.signal import firwin, kaiserord, lfilter
+
     nyquist_rate = sample_rate / 2.0
 
     # Compute FIR filter parameters and apply to signal.
@@ -3,10 +3,9 @@ from abc import ABC, abstractmethod
 from enum import Enum
 
 import numpy as np
-from scipy.signal import fftconvolve
 
 from aira.engine.filtering import NonCoincidentMicsCorrection
-from aira.utils import convert_ambisonics_a_to_b
+from aira.utils import convert_ambisonics_a_to_b, NULL_PROFILER
 
 
 # pylint: disable=too-few-public-methods
@@ -22,17 +21,22 @@ class InputMode(Enum):
 class InputProcessor(ABC):
     """Base interface for inputs processors"""
 
+    stage_name = "input"
+
     @abstractmethod
-    def process(self, input_dict: dict) -> dict:
+    def process(self, input_dict: dict, profiler=NULL_PROFILER) -> dict:
         """Abstract method to be overwritten by concrete implementations of
-        input processing."""
+        input processing. Long processors call `profiler.checkpoint()` between
+        steps, so that cancelled analyses stop before the processor ends."""
 
 
 # pylint: disable=too-few-public-methods
 class LSSInputProcessor(InputProcessor):
     """Processing when input data is in LSS mode"""
 
-    def process(self, input_dict: dict) -> dict:
+    stage_name = "deconvolution"
+
+    def process(self, input_dict: dict, profiler=NULL_PROFILER) -> dict:
         """Gets impulse response arrays from Long Sine Sweep (LSS) measurements. The new
         signals are in A-Format.
 
@@ -40,30 +44,43 @@ class LSSInputProcessor(InputProcessor):
         ----------
         input_dict : dict
             Dictionary with LSS measurement arrays
+        profiler : StageProfiler, optional
+            Checked for cancellation before the deconvolution of each channel, by
+            default NULL_PROFILER
 
         Returns
         -------
         dict
-            input_dict overwritten with A-Format signals
+            Copy of input_dict with A-Format signals. input_dict is not modified
         """
         if input_dict["input_mode"] != InputMode.LSS:
             return input_dict
 
-        input_dict["stacked_signals"] = np.apply_along_axis(
-            lambda array: fftconvolve(array, input_dict["inverse_filter"], mode="full"),
-            axis=1,
-            arr=input_dict["stacked_signals"],
-        )
-        input_dict["input_mode"] = InputMode.AFORMAT
+        # pylint: disable=import-outside-toplevel
+        from scipy.signal import fftconvolve
 
-        return input_dict
+        channels = []
+        for channel in input_dict["stacked_signals"]:
+            profiler.checkpoint()
+            channels.append(
+                fftconvolve(channel, input_dict["inverse_filter"], mode="full")
+            )
+        stacked_signals = np.stack(channels)
+        return {
+            **input_dict,
+            "stacked_signals": stacked_signals,
+            "input_mode": InputMode.AFORMAT,
+        }
 
 
 # pylint: disable=too-few-public-methods
 class AFormatProcessor(InputProcessor):
     """Processing when input data is in mode AFORMAT"""
 
-    def process(self, input_dict: dict) -> dict:
+    stage_name = "a_to_b_conversion"
+
+    # pylint: disable-next=unused-argument
+    def process(self, input_dict: dict, profiler=NULL_PROFILER) -> dict:
         """Gets B-format arrays from A-format arrays. For more details see
         aira.utils.formatter.convert_ambisonics_a_to_b function.
 
@@ -75,26 +92,34 @@ class AFormatProcessor(InputProcessor):
         Returns
         -------
         dict
-            input_dict overwritten with B-format signals
+            Copy of input_dict with B-format signals. input_dict is not modified
         """
         if input_dict["input_mode"] != InputMode.AFORMAT:
             return input_dict
-        input_dict["stacked_signals"] = convert_ambisonics_a_to_b(
+        stacked_signals = convert_ambisonics_a_to_b(
             input_dict["stacked_signals"][0, :],
             input_dict["stacked_signals"][1, :],
             input_dict["stacked_signals"][2, :],
             input_dict["stacked_signals"][3, :],
         )
-        input_dict["input_mode"] = InputMode.BFORMAT
-        return input_dict
+        return {
+            **input_dict,
+            "stacked_signals": stacked_signals,
+            "input_mode": InputMode.BFORMAT,
+        }
 
 
 # pylint: disable=too-few-public-methods
 class BFormatProcessor(InputProcessor):
     """Processin when input data is in BFORMAT mode."""
 
-    def process(self, input_dict: dict) -> dict:
-        """Corrects B-format arrays frequency response for non-coincident microphones.
+    stage_name = "correction"
+
+    # pylint: disable-next=unused-argument
+    def process(self, input_dict: dict, profiler=NULL_PROFILER) -> dict:
+        """Corrects B-format arrays frequency response for non-coincident microphones,
+        only when `frequency_correction` is set. Every input mode reaches this
+        processor as B-format, so signals are passed through otherwise.
 
         Parameters
         ----------
@@ -104,23 +129,30 @@ class BFormatProcessor(InputProcessor):
         Returns
         -------
         dict
-            input_dict overwritten with B-format frequency corrected arrays.
+            Copy of input_dict with B-format frequency corrected arrays. input_dict
+            is not modified.
         """
-        if input_dict["input_mode"] != InputMode.BFORMAT and not bool(
+        if input_dict["input_mode"] != InputMode.BFORMAT or not bool(
             input_dict["frequency_correction"]
         ):
             return input_dict
 
         frequency_corrector = NonCoincidentMicsCorrection(input_dict["sample_rate"])
 
-        input_dict["stacked_signals"][0, :] = frequency_corrector.correct_omni(
+        # The correction filters have complex coefficients, only the real part of
+        # their output is kept
+        stacked_signals = np.empty(np.shape(input_dict["stacked_signals"]))
+        stacked_signals[0, :] = frequency_corrector.correct_omni(
             input_dict["stacked_signals"][0, :]
-        )
-        input_dict["stacked_signals"][1:, :] = frequency_corrector.correct_axis(
+        ).real
+        stacked_signals[1:, :] = frequency_corrector.correct_axis(
             input_dict["stacked_signals"][1:, :]
-        )
-        input_dict["input_mode"] = InputMode.BFORMAT
-        return input_dict
+        ).real
+        return {
+            **input_dict,
+            "stacked_signals": stacked_signals,
+            "input_mode": InputMode.BFORMAT,
+        }
 
 
 # pylint: disable=too-few-public-methods
@@ -130,13 +162,18 @@ class InputProcessorChain:
     def __init__(self):
         self.processors = [LSSInputProcessor(), AFormatProcessor(), BFormatProcessor()]
 
-    def process(self, input_dict: dict) -> np.ndarray:
-        """Applies the chain of processors for the input_mode setted.
+    def process(self, input_dict: dict, profiler=NULL_PROFILER) -> np.ndarray:
+        """Applies the chain of processors for the input_mode setted. Processors
+        return new dictionaries, so input_dict is not modified and the chain can be
+        used from several threads at once.
 
         Parameters
         ----------
         input_dict : dict
             Contains arrays and input mode data
+        profiler : StageProfiler, optional
+            Records each processor as a stage and is passed to the processors to
+            check for cancellation, by default NULL_PROFILER
 
         Returns
         -------
@@ -144,6 +181,7 @@ class InputProcessorChain:
             Arrays processed stacked in single numpy.ndarray object
         """
         for process_i in self.processors:
-            input_dict = process_i.process(input_dict)
+            with profiler.stage(process_i.stage_name):
+                input_dict = process_i.process(input_dict, profiler)
 
         return input_dict["stacked_signals"]
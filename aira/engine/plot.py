@@ -1,13 +1,22 @@
 """Plotting functions."""
-from typing import Tuple, Dict
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, Tuple, Union
 import numpy as np
-import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
 from aira.utils.formatter import spherical_to_cartesian
 from aira.engine.intensity import min_max_normalization
 
+# The w-channel plot is never wider than a few thousand pixels: two points per
+# pixel column (its minimum and maximum) draw the same line as every sample
+W_CHANNEL_MAX_POINTS = 4000
+
 
 def hedgehog(
     fig: go.Figure,
@@ -18,54 +27,31 @@ def hedgehog(
 ) -> go.Figure:
     """Create a hedgehog plot."""
     time_peaks *= 1000  # seconds to miliseconds
-    normalized_intensities = min_max_normalization(reflex_to_direct)
-    # pylint: disable=invalid-name
-    x, y, z = spherical_to_cartesian(
-        normalized_intensities, azimuth_peaks, elevation_peaks
-    )
-
-    fig.add_trace(
-        go.Scatter3d(
-            x=zero_inserter(x),
-            y=zero_inserter(y),
-            z=zero_inserter(z),
-            marker={
-                "color": zero_inserter(normalized_intensities),
-                "colorscale": "portland",
-                "colorbar": {
-                    "thickness": 20,
-                    "tickvals": [0.99],
-                    "ticktext": ["Direct          <br>sound          "],
-                    "ticklabelposition": "inside",
-                    "ticksuffix": "                     ",
-                    "ticklabeloverflow": "allow",
-                    "title": {"text": "<b>Time</b>"},
-                },
-                "size": 3,
-            },
-            line={
-                "width": 8,
-                "color": zero_inserter(normalized_intensities),
-                "colorscale": "portland",
+    trace = go.Scatter3d(
+        marker={
+            "colorscale": "portland",
+            "colorbar": {
+                "thickness": 20,
+                "tickvals": [0.99],
+                "ticktext": ["Direct          <br>sound          "],
+                "ticklabelposition": "inside",
+                "ticksuffix": "                     ",
+                "ticklabeloverflow": "allow",
+                "title": {"text": "<b>Time</b>"},
             },
-            customdata=np.stack(
-                (
-                    zero_inserter(reflex_to_direct),
-                    zero_inserter(time_peaks),
-                    zero_inserter(azimuth_peaks),
-                    zero_inserter(elevation_peaks),
-                ),
-                axis=-1,
-            ),
-            hovertemplate="<b>Reflection-to-direct [dB]:</b> %{customdata[0]:.2f} dB <br>"
-            + "<b>Time [ms]: </b>%{customdata[1]:.2f} ms <br>"
-            + "<b>Azimuth [°]: </b>%{customdata[2]:.2f}° <br>"
-            + "<b>Elevation [°]: </b>%{customdata[3]:.2f}° <extra></extra>",
-            showlegend=False,
-        ),
-        row=1,
-        col=1,
+            "size": 3,
+        },
+        line={"width": 8, "colorscale": "portland"},
+        hovertemplate="<b>Reflection-to-direct [dB]:</b> %{customdata[0]:.2f} dB <br>"
+        + "<b>Time [ms]: </b>%{customdata[1]:.2f} ms <br>"
+        + "<b>Azimuth [°]: </b>%{customdata[2]:.2f}° <br>"
+        + "<b>Elevation [°]: </b>%{customdata[3]:.2f}° <extra></extra>",
+        showlegend=False,
+    )
+    trace.update(
+        hedgehog_data(time_peaks, reflex_to_direct, azimuth_peaks, elevation_peaks)
     )
+    fig.add_trace(trace, row=1, col=1)
 
     fig.update_layout(
         scene={
@@ -93,26 +79,141 @@ def hedgehog(
     return fig
 
 
+def hedgehog_data(
+    time_peaks: np.ndarray,
+    reflex_to_direct: np.ndarray,
+    azimuth_peaks: np.ndarray,
+    elevation_peaks: np.ndarray,
+) -> Dict[str, np.ndarray]:
+    """Computes the data of the hedgehog trace: one line from the origin per
+    reflection, with its length and color given by its normalized level.
+
+    The lines form a single polyline that goes back to the origin between
+    reflections, which takes two points per reflection, one less than separating
+    the lines with NaN. The arrays are single precision, far beyond what the plot
+    and its hover labels show. Plotly 6, required by this package, serializes them
+    as base64 typed arrays, half the size of double precision. They are read by
+    plotly.js 2.28 or later: the one bundled with Plotly 6 (used by the PyQt GUI
+    and the HTML pages of the service) and the one of Streamlit 1.34 or later.
+
+    Parameters
+    ----------
+    time_peaks : np.ndarray
+        Time of each reflection in miliseconds
+    reflex_to_direct : np.ndarray
+        Reflection-to-direct ratio of each reflection in dB
+    azimuth_peaks : np.ndarray
+        Azimuth of each reflection in degrees
+    elevation_peaks : np.ndarray
+        Elevation of each reflection in degrees
+
+    Returns
+    -------
+    Dict[str, np.ndarray]
+        Properties of the trace, in magic underscore notation
+    """
+    normalized_intensities = min_max_normalization(reflex_to_direct)
+    # pylint: disable=invalid-name
+    x, y, z = spherical_to_cartesian(
+        normalized_intensities, azimuth_peaks, elevation_peaks
+    )
+    colors = zero_inserter(normalized_intensities.astype(np.float32))
+    return {
+        "x": zero_inserter(x.astype(np.float32)),
+        "y": zero_inserter(y.astype(np.float32)),
+        "z": zero_inserter(z.astype(np.float32)),
+        "marker_color": colors,
+        "line_color": colors,
+        "customdata": zero_inserter(
+            np.stack(
+                (reflex_to_direct, time_peaks, azimuth_peaks, elevation_peaks),
+                axis=-1,
+            ).astype(np.float32)
+        ),
+    }
+
+
+def reflection_markers_data(time_reflections: np.ndarray) -> Dict[str, np.ndarray]:
+    """Computes the data of the trace marking the reflections over the w-channel,
+    given their times in miliseconds."""
+    return {
+        "x": time_reflections,
+        "y": np.ones_like(time_reflections) * 0.95,
+        "customdata": time_reflections,
+    }
+
+
+def update_reflections(
+    fig: go.Figure,
+    time_peaks: np.ndarray,
+    reflex_to_direct: np.ndarray,
+    azimuth_peaks: np.ndarray,
+    elevation_peaks: np.ndarray,
+) -> go.Figure:
+    """Replaces the reflections shown in a figure built with `setup_plotly_layout`,
+    `hedgehog` and `w_channel`, patching the data of the hedgehog and of the
+    reflection markers in place. The layout, the camera and the w-channel trace are
+    left as they are, which is much cheaper than building the figure again.
+
+    Parameters
+    ----------
+    fig : go.Figure
+        Figure to update
+    time_peaks : np.ndarray
+        Time of each reflection in miliseconds
+    reflex_to_direct : np.ndarray
+        Reflection-to-direct ratio of each reflection in dB
+    azimuth_peaks : np.ndarray
+        Azimuth of each reflection in degrees
+    elevation_peaks : np.ndarray
+        Elevation of each reflection in degrees
+
+    Returns
+    -------
+    go.Figure
+        The updated figure
+    """
+    hedgehog_trace, _, markers_trace = fig.data
+    with fig.batch_update():
+        hedgehog_trace.update(
+            hedgehog_data(time_peaks, reflex_to_direct, azimuth_peaks, elevation_peaks)
+        )
+        markers_trace.update(reflection_markers_data(time_peaks))
+    return fig
+
+
 def w_channel(
     fig: go.Figure,
     time: np.ndarray,
     w_channel: np.ndarray,
-    ylim: float,
     time_reflections: np.ndarray,
 ) -> go.Figure:
-    """_summary_
+    """Plots the omnidirectional channel envelope and the reflection markers.
+
+    Envelopes longer than W_CHANNEL_MAX_POINTS samples are decimated with
+    `min_max_decimation` and drawn with WebGL, so the size of the figure and its
+    rendering time do not grow with the sample rate or the analysis length.
 
     Parameters
     ----------
     fig : go.Figure
-        _description_
+        Figure built with `setup_plotly_layout`
+    time : np.ndarray
+        Time of each sample of the envelope in miliseconds
+    w_channel : np.ndarray
+        Omnidirectional channel envelope
+    time_reflections : np.ndarray
+        Time of each reflection in miliseconds
     """
+    scatter = go.Scatter
+    if len(w_channel) > W_CHANNEL_MAX_POINTS:
+        time, w_channel = min_max_decimation(time, w_channel, W_CHANNEL_MAX_POINTS)
+        scatter = go.Scattergl
     fig.add_trace(
-        go.Scatter(
+        scatter(
             x=time,
             y=w_channel,
-            customdata=time,
-            hovertemplate="<b>Time [ms]:</b> %{customdata:.2f} ms <extra></extra>",
+            hovertemplate="<b>Time [ms]:</b> %{x:.2f} ms <extra></extra>",
             showlegend=False,
         )
     )
@@ -120,11 +221,9 @@ def w_channel(
         go.Scatter(
             mode="markers",
             marker={"symbol": "star-diamond", "size": 10, "color": "rgb(72,116,212)"},
-            x=time_reflections,
-            y=np.ones_like(time_reflections) * 0.95,
-            customdata=time_reflections,
             hovertemplate="<b>Time [ms]:</b> %{customdata:.2f} ms <extra></extra>",
             showlegend=False,
+            **reflection_markers_data(time_reflections),
         )
     )
     fig.update_layout(yaxis_range=[0, 1], xaxis_range=[0, max(time)])
@@ -132,6 +231,52 @@ def w_channel(
     fig.update_yaxes(title_text="Relative amplitude", row=2, col=1)
 
 
+def min_max_decimation(
+    x: np.ndarray, y: np.ndarray, max_points: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Decimates a line keeping the minimum and the maximum of each of
+    `max_points // 2` consecutive bins, plus its first and last points.
+
+    Drawn on a plot narrower than `max_points // 2` pixels, the decimated line
+    covers the same pixels as the original one, peaks included.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Horizontal coordinates, in increasing order
+    y : np.ndarray
+        Vertical coordinates
+    max_points : int
+        Approximate maximum number of points kept
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Decimated x and y coordinates, in their original order
+    """
+    length = len(y)
+    if length <= max_points:
+        return x, y
+    bin_size = -(-length // max(max_points // 2, 1))
+    bins = -(-length // bin_size)
+    # The last bin is padded with the last value, which is kept anyway
+    padded = np.full(bins * bin_size, y[-1], dtype=np.result_type(y, float))
+    padded[:length] = y
+    blocks = padded.reshape(bins, bin_size)
+    offsets = np.arange(bins) * bin_size
+    kept = np.unique(
+        np.concatenate(
+            (
+                [0, length - 1],
+                offsets + np.argmin(blocks, axis=1),
+                offsets + np.argmax(blocks, axis=1),
+            )
+        )
+    )
+    kept = kept[kept < length]
+    return x[kept], y[kept]
+
+
 def setup_plotly_layout() -> go.Figure:
     """_summary_
 
@@ -253,16 +398,144 @@ def get_xy_projection(fig: go.Figure) -> go.Figure:
 
 
 def zero_inserter(array: np.ndarray) -> np.ndarray:
-    """_summary_
+    """Inserts zeros before each element of an array, or before each row of a 2D
+    array, keeping its dtype.
 
     Parameters
     ----------
     array : np.ndarray
-        _description_
+        Array to interleave with zeros
 
     Returns
     -------
     np.ndarray
-        _description_
+        Array twice as long, with zeros at the even indices
+    """
+    return np.insert(array, np.arange(len(array)), values=0, axis=0)
+
+
+def _warm_renderer() -> None:
+    """Starts the static image renderer of a worker process by exporting an empty
+    figure, so the first real export does not pay its startup. If it can not
+    start, the error is printed by the worker and the pool is broken."""
+    go.Figure().to_image(format="png", width=10, height=10)
+
+
+def _write_image(figure: dict, path: str, write_kwargs: dict) -> str:
+    """Exports a figure from a worker process."""
+    go.Figure(figure).write_image(path, **write_kwargs)
+    return path
+
+
+class ImageExporter:
+    """Pool of processes with a warm static image renderer, to export figures with
+    `write_image` in parallel.
+
+    Kaleido keeps its renderer running in the process that started it, but starting
+    it takes much longer than exporting a figure. The worker processes start it once
+    and reuse it for every figure they export. They are spawned, so they never share
+    the renderer of the parent process.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of renderer processes, by default os.cpu_count()
+    """
+
+    def __init__(self, workers: int = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_renderer,
+        )
+
+    def export(
+        self,
+        figures: Iterable[Union[go.Figure, dict]],
+        paths: Iterable[Union[str, Path]],
+        **write_kwargs,
+    ) -> Dict[str, float]:
+        """Exports figures to image files, in parallel.
+
+        Parameters
+        ----------
+        figures : Iterable[go.Figure | dict]
+            Figures to export
+        paths : Iterable[str | Path]
+            Image file of each figure
+        write_kwargs
+            Arguments of `write_image` for every figure, e.g. `format`, `width`,
+            `height` or `scale`
+
+        Returns
+        -------
+        Dict[str, float]
+            Number of images exported, elapsed seconds and images per second
+
+        Raises
+        ------
+        RuntimeError
+            If the renderer could not be started in the worker processes
+        """
+        start = time.perf_counter()
+        exported = 0
+        # Bounded submission keeps memory flat for any number of figures
+        remaining = iter(zip(figures, paths))
+        running = set()
+        while True:
+            for figure, path in remaining:
+                if isinstance(figure, go.Figure):
+                    figure = figure.to_dict()
+                running.add(
+                    self._executor.submit(_write_image, figure, str(path), write_kwargs)
+                )
+                if len(running) >= 2 * self.workers:
+                    break
+            if not running:
+                break
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    future.result()
+                except BrokenProcessPool as error:
+                    raise RuntimeError(
+                        "The image renderer could not be started, see the error "
+                        "of the worker processes above (is Kaleido installed?)"
+                    ) from error
+                exported += 1
+        seconds = time.perf_counter() - start
+        return {
+            "images": exported,
+            "seconds": seconds,
+            "images_per_second": exported / seconds if seconds > 0 else 0.0,
+        }
+
+    def close(self) -> None:
+        """Stops the renderer processes."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> "ImageExporter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def export_images(
+    figures: Iterable[Union[go.Figure, dict]],
+    paths: Iterable[Union[str, Path]],
+    workers: int = None,
+    **write_kwargs,
+) -> Dict[str, float]:
+    """Exports figures to image files on a pool of warm renderer processes, see
+    `ImageExporter`. Keep an `ImageExporter` open instead to export several batches
+    without starting the renderers again.
+
+    Returns
+    -------
+    Dict[str, float]
+        Number of images exported, elapsed seconds and images per second
     """
-    return np.insert(array, np.arange(len(array)), values=0)
+    with ImageExporter(workers) as exporter:
+        return exporter.export(figures, paths, **write_kwargs)
@@ -0,0 +1,168 @@
+"""Rasterization of the hedgehog projection on the horizontal plane with NumPy.
+
+Plan overlays only need a top view of the hedgehog, which is drawn here straight
+from the reflection arrays into an RGBA buffer, in milliseconds and without the
+headless browser of Plotly static exports.
+"""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from aira.engine.intensity import min_max_normalization
+from aira.utils.formatter import spherical_to_cartesian
+
+if TYPE_CHECKING:  # Pillow is an optional dependency
+    from PIL import Image
+
+DEFAULT_SIZE = 400
+DEFAULT_LINE_WIDTH = 3.0
+SUPERSAMPLING = 2
+SAMPLE_SPACING = 0.7  # Distance between drawn points in supersampled pixels
+# Plotly "portland" colorscale, as used by the hedgehog trace
+PORTLAND_POSITIONS = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+PORTLAND_COLORS = np.array(
+    [[12, 51, 131], [10, 136, 186], [242, 211, 56], [242, 143, 56], [217, 30, 30]],
+    dtype=float,
+)
+
+
+def portland(values: np.ndarray) -> np.ndarray:
+    """Maps values between 0 and 1 to RGB colors of the portland colorscale.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Values to map, clipped to [0, 1]
+
+    Returns
+    -------
+    np.ndarray
+        RGB colors between 0 and 255, with one row per value
+    """
+    values = np.clip(values, 0, 1)
+    return np.stack(
+        [
+            np.interp(values, PORTLAND_POSITIONS, PORTLAND_COLORS[:, channel])
+            for channel in range(3)
+        ],
+        axis=-1,
+    )
+
+
+def _block_sum(canvas: np.ndarray) -> np.ndarray:
+    """Sums the blocks of SUPERSAMPLING x SUPERSAMPLING pixels of a canvas."""
+    return sum(
+        canvas[row::SUPERSAMPLING, column::SUPERSAMPLING]
+        for row in range(SUPERSAMPLING)
+        for column in range(SUPERSAMPLING)
+    )
+
+
+def rasterize_hedgehog(
+    reflection_levels: np.ndarray,
+    reflection_azimuths: np.ndarray,
+    reflection_elevations: np.ndarray,
+    size: int = DEFAULT_SIZE,
+    line_width: float = DEFAULT_LINE_WIDTH,
+) -> np.ndarray:
+    """Draws the projection of the hedgehog seen from above on a transparent image.
+
+    As in the hedgehog plot, each reflection is a line from the center whose length
+    is its normalized level, colored from the bottom of the colorscale at the
+    center to the color of its level at the tip. As in the top view of the Plotly
+    projection, the front (positive x) points right and the left (positive y)
+    points up. Weaker reflections are drawn first, so
+    stronger ones stay on top. Edges are antialiased by supersampling.
+
+    Parameters
+    ----------
+    reflection_levels : np.ndarray
+        Reflection-to-direct ratio of each reflection in dB
+    reflection_azimuths : np.ndarray
+        Azimuth of each reflection in degrees
+    reflection_elevations : np.ndarray
+        Elevation of each reflection in degrees
+    size : int, optional
+        Width and height of the image in pixels, by default DEFAULT_SIZE. A line of
+        normalized level 1 reaches the border
+    line_width : float, optional
+        Width of the lines in pixels, by default DEFAULT_LINE_WIDTH
+
+    Returns
+    -------
+    np.ndarray
+        RGBA image of shape (size, size, 4) and dtype uint8, not premultiplied
+    """
+    canvas_size = size * SUPERSAMPLING
+    # Position of each pixel in the colorscale, and whether a line covers it
+    tint = np.zeros((canvas_size, canvas_size))
+    covered = np.zeros((canvas_size, canvas_size), dtype=bool)
+    if len(reflection_levels):
+        normalized = min_max_normalization(np.asarray(reflection_levels, dtype=float))
+        if len(reflection_levels) == 1:  # The direct sound alone
+            normalized = np.ones(1)
+        x, y, _ = spherical_to_cartesian(  # pylint: disable=invalid-name
+            normalized, reflection_azimuths, reflection_elevations
+        )
+        half_width = line_width * SUPERSAMPLING / 2
+        radius = canvas_size / 2 - half_width
+        center = (canvas_size - 1) / 2
+        order = np.argsort(normalized, kind="stable")
+        tip_rows, tip_columns = -y[order] * radius, x[order] * radius
+
+        # Points along every line, in drawing order, closer than a pixel
+        lengths = np.hypot(tip_rows, tip_columns)
+        samples = np.ceil(lengths / SAMPLE_SPACING).astype(int) + 2
+        line_index = np.repeat(np.arange(len(order)), samples)
+        first_sample = np.repeat(np.cumsum(samples) - samples, samples)
+        steps = (np.arange(len(line_index)) - first_sample) / (samples - 1)[line_index]
+
+        # Each point is spread across the line width, perpendicular to its line
+        across = np.arange(-half_width, half_width + 1e-9, SAMPLE_SPACING)
+        safe_lengths = np.where(lengths > 0, lengths, 1)
+        normal_rows = (tip_columns / safe_lengths)[line_index, None]
+        normal_columns = (-tip_rows / safe_lengths)[line_index, None]
+        rows = center + steps[:, None] * tip_rows[line_index, None]
+        columns = center + steps[:, None] * tip_columns[line_index, None]
+        pixel_rows = np.rint(rows + across * normal_rows).astype(int).ravel()
+        pixel_columns = np.rint(columns + across * normal_columns).astype(int).ravel()
+        pixel_tints = np.repeat(steps * normalized[order][line_index], len(across))
+        inside = (
+            (pixel_rows >= 0)
+            & (pixel_rows < canvas_size)
+            & (pixel_columns >= 0)
+            & (pixel_columns < canvas_size)
+        )
+        # With repeated pixels, the last assignment (the strongest line) wins
+        tint[pixel_rows[inside], pixel_columns[inside]] = pixel_tints[inside]
+        covered[pixel_rows[inside], pixel_columns[inside]] = True
+
+    # Box filter of the supersampled canvas. Colors vary smoothly along the lines,
+    # so the mean position in the colorscale of the covered subpixels is colored
+    coverage = _block_sum(covered.astype(int))
+    tint_sum = _block_sum(tint)
+    rgba = np.zeros((size, size, 4), dtype=np.uint8)
+    visible = coverage > 0
+    rgba[visible, :3] = np.rint(portland(tint_sum[visible] / coverage[visible]))
+    rgba[..., 3] = np.rint(coverage * 255 / SUPERSAMPLING**2)
+    return rgba
+
+
+def to_pil_image(rgba: np.ndarray) -> "Image.Image":
+    """Converts an RGBA buffer of `rasterize_hedgehog` to a Pillow image, e.g. to
+    save it as PNG.
+
+    Raises
+    ------
+    ImportError
+        If Pillow is not installed
+    """
+    try:
+        from PIL import Image  # pylint: disable=import-outside-toplevel
+    except ImportError as error:
+        raise ImportError(
+            "Pillow is needed to convert hedgehog projections to images: "
+            "pip install pillow"
+        ) from error
+    return Image.fromarray(rgba, mode="RGBA")
@@ -0,0 +1,383 @@
+"""Association of detected reflections with the surfaces of a room mesh."""
+
+from pathlib import Path
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from aira.utils.formatter import spherical_to_cartesian
+
+LEAF_SIZE = 8
+DEFAULT_SURFACE = "default"
+EPSILON = 1e-9
+
+
+class TriangleMesh:
+    """Triangulated room geometry with a surface label for every triangle."""
+
+    def __init__(
+        self,
+        vertices: np.ndarray,
+        faces: np.ndarray,
+        surface_ids: np.ndarray = None,
+        surface_names: List[str] = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        vertices : np.ndarray
+            Vertex coordinates in meters. Shape: (V, 3)
+        faces : np.ndarray
+            Vertex indices of each triangle. Shape: (F, 3)
+        surface_ids : np.ndarray, optional
+            Index into `surface_names` for each triangle, by default every triangle
+            belongs to a single surface
+        surface_names : List[str], optional
+            Names of the surfaces, by default [DEFAULT_SURFACE]
+        """
+        self.vertices = np.asarray(vertices, dtype=np.float64)
+        self.faces = np.asarray(faces, dtype=np.int64)
+        if surface_ids is None:
+            surface_ids = np.zeros(len(self.faces), dtype=np.int64)
+        self.surface_ids = np.asarray(surface_ids, dtype=np.int64)
+        self.surface_names = list(surface_names or [DEFAULT_SURFACE])
+
+    @property
+    def triangles(self) -> np.ndarray:
+        """Vertex coordinates of every triangle. Shape: (F, 3, 3)"""
+        return self.vertices[self.faces]
+
+    @classmethod
+    def from_obj(cls, obj_path: Union[str, Path]) -> "TriangleMesh":
+        """Loads a Wavefront OBJ file. Polygons are fan-triangulated and every face
+        is labelled with the last `g`, `o` or `usemtl` statement that precedes it.
+
+        Parameters
+        ----------
+        obj_path : str | Path
+            Path of the OBJ file
+
+        Returns
+        -------
+        TriangleMesh
+            Mesh with one surface per group, object or material of the file
+        """
+        vertices, faces, surface_ids = [], [], []
+        surface_names = [DEFAULT_SURFACE]
+        current_surface = 0
+
+        with open(obj_path, "r", encoding="utf-8") as obj_file:
+            for line in obj_file:
+                tokens = line.split()
+                if not tokens:
+                    continue
+                if tokens[0] == "v":
+                    vertices.append([float(value) for value in tokens[1:4]])
+                elif tokens[0] == "f":
+                    polygon = [
+                        _parse_obj_index(token, len(vertices)) for token in tokens[1:]
+                    ]
+                    for i in range(1, len(polygon) - 1):
+                        faces.append([polygon[0], polygon[i], polygon[i + 1]])
+                        surface_ids.append(current_surface)
+                elif tokens[0] in ("g", "o", "usemtl"):
+                    name = " ".join(tokens[1:]) or DEFAULT_SURFACE
+                    if name not in surface_names:
+                        surface_names.append(name)
+                    current_surface = surface_names.index(name)
+
+        return cls(
+            np.array(vertices).reshape(-1, 3),
+            np.array(faces, dtype=np.int64).reshape(-1, 3),
+            np.array(surface_ids, dtype=np.int64),
+            surface_names,
+        )
+
+
+def _parse_obj_index(token: str, vertex_count: int) -> int:
+    """Converts an OBJ face token (`7`, `7/1`, `7//3`, `-1`) into a zero based
+    vertex index."""
+    index = int(token.split("/")[0])
+    return index - 1 if index > 0 else vertex_count + index
+
+
+class BoundingVolumeHierarchy:
+    """Axis aligned bounding-volume hierarchy over the triangles of a mesh.
+
+    The tree is built once with median splits along the longest centroid axis, and
+    rays are traversed in packets so that each tree level is a handful of vectorized
+    NumPy operations over every (ray, node) pair still alive.
+    """
+
+    def __init__(self, mesh: TriangleMesh, leaf_size: int = LEAF_SIZE) -> None:
+        self.mesh = mesh
+        self.leaf_size = leaf_size
+
+        triangles = mesh.triangles
+        self._vertex_0 = triangles[:, 0]
+        self._edge_1 = triangles[:, 1] - triangles[:, 0]
+        self._edge_2 = triangles[:, 2] - triangles[:, 0]
+
+        self._build(triangles)
+
+    def _build(self, triangles: np.ndarray) -> None:
+        """Builds the tree level by level. Triangles of every node are stored
+        contiguously in `self.order`, between `self.node_start` and `self.node_end`.
+        Inner nodes have their children in `self.node_left` and `self.node_left + 1`,
+        leaves have `self.node_left == -1`."""
+        centroids = triangles.mean(axis=1)
+        triangle_count = len(triangles)
+        order = np.arange(triangle_count)
+
+        level_ids = np.array([0])
+        level_start = np.array([0])
+        level_end = np.array([triangle_count])
+        node_count = 1
+        ids, starts, ends, lefts = [], [], [], []
+
+        while level_ids.size:
+            counts = level_end - level_start
+            is_inner = counts > self.leaf_size
+            left = np.full(level_ids.size, -1)
+            left[is_inner] = node_count + 2 * np.arange(is_inner.sum())
+            ids.append(level_ids)
+            starts.append(level_start)
+            ends.append(level_end)
+            lefts.append(left)
+
+            inner_start, inner_end = level_start[is_inner], level_end[is_inner]
+            if not inner_start.size:
+                break
+
+            # Sort the triangles of every inner node along its longest axis
+            positions, labels = _expand_ranges(inner_start, inner_end)
+            centroid_min, centroid_max = _range_bounds(
+                centroids[order], centroids[order], inner_start, inner_end
+            )
+            axis = np.argmax(centroid_max - centroid_min, axis=1)
+            key = centroids[order[positions], axis[labels]]
+            order[positions] = order[positions][np.lexsort((key, labels))]
+
+            middle = inner_start + (inner_end - inner_start) // 2
+            level_ids = node_count + np.arange(2 * inner_start.size)
+            level_start = np.column_stack((inner_start, middle)).ravel()
+            level_end = np.column_stack((middle, inner_end)).ravel()
+            node_count += level_ids.size
+
+        node_ids = np.concatenate(ids)
+        self.order = order
+        self.node_start = np.empty(node_count, dtype=np.int64)
+        self.node_end = np.empty(node_count, dtype=np.int64)
+        self.node_left = np.empty(node_count, dtype=np.int64)
+        self.node_start[node_ids] = np.concatenate(starts)
+        self.node_end[node_ids] = np.concatenate(ends)
+        self.node_left[node_ids] = np.concatenate(lefts)
+        self.node_min, self.node_max = _range_bounds(
+            triangles.min(axis=1)[order],
+            triangles.max(axis=1)[order],
+            self.node_start,
+            self.node_end,
+        )
+
+    def intersect(
+        self, origins: np.ndarray, directions: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Finds the closest triangle hit by each ray.
+
+        Parameters
+        ----------
+        origins : np.ndarray
+            Ray origins. Shape: (R, 3), or (3,) for a common origin
+        directions : np.ndarray
+            Unit ray directions. Shape: (R, 3)
+
+        Returns
+        -------
+        Tuple[np.ndarray, np.ndarray]
+            Index of the closest triangle hit by each ray (-1 when nothing is hit) and
+            the distance along the ray (np.inf when nothing is hit)
+        """
+        directions = np.atleast_2d(np.asarray(directions, dtype=np.float64))
+        origins = np.broadcast_to(
+            np.asarray(origins, dtype=np.float64), directions.shape
+        )
+        with np.errstate(divide="ignore"):
+            inverse_directions = 1 / directions
+
+        ray_count = len(directions)
+        closest_distance = np.full(ray_count, np.inf)
+        closest_triangle = np.full(ray_count, -1)
+
+        rays = np.arange(ray_count)
+        nodes = np.zeros(ray_count, dtype=np.int64)
+        while rays.size:
+            near = _slab_test(
+                origins[rays],
+                inverse_directions[rays],
+                self.node_min[nodes],
+                self.node_max[nodes],
+            )
+            alive = near < closest_distance[rays]
+            rays, nodes = rays[alive], nodes[alive]
+
+            is_leaf = self.node_left[nodes] < 0
+            if is_leaf.any():
+                self._intersect_leaves(
+                    origins,
+                    directions,
+                    rays[is_leaf],
+                    nodes[is_leaf],
+                    closest_distance,
+                    closest_triangle,
+                )
+
+            inner_rays, inner_nodes = rays[~is_leaf], nodes[~is_leaf]
+            rays = np.repeat(inner_rays, 2)
+            nodes = np.column_stack(
+                (self.node_left[inner_nodes], self.node_left[inner_nodes] + 1)
+            ).ravel()
+
+        return closest_triangle, closest_distance
+
+    def _intersect_leaves(
+        # pylint: disable=too-many-arguments
+        self,
+        origins: np.ndarray,
+        directions: np.ndarray,
+        rays: np.ndarray,
+        leaves: np.ndarray,
+        closest_distance: np.ndarray,
+        closest_triangle: np.ndarray,
+    ) -> None:
+        """Tests every (ray, triangle) pair of the given leaves and updates the
+        closest hits in place."""
+        positions, labels = _expand_ranges(
+            self.node_start[leaves], self.node_end[leaves]
+        )
+        pair_rays = rays[labels]
+        pair_triangles = self.order[positions]
+
+        distance = _moller_trumbore(
+            origins[pair_rays],
+            directions[pair_rays],
+            self._vertex_0[pair_triangles],
+            self._edge_1[pair_triangles],
+            self._edge_2[pair_triangles],
+        )
+        is_closer = distance < closest_distance[pair_rays]
+        pair_rays = pair_rays[is_closer]
+        pair_triangles = pair_triangles[is_closer]
+        distance = distance[is_closer]
+
+        # Write farthest first so the closest hit of each ray is the one that remains
+        farthest_first = np.argsort(distance)[::-1]
+        closest_distance[pair_rays[farthest_first]] = distance[farthest_first]
+        closest_triangle[pair_rays[farthest_first]] = pair_triangles[farthest_first]
+
+
+def _expand_ranges(
+    starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Concatenates the ranges [start, end) and labels each position with the index
+    of the range it belongs to."""
+    counts = ends - starts
+    labels = np.repeat(np.arange(starts.size), counts)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(counts.sum()), labels
+
+
+def _range_bounds(
+    minimums: np.ndarray, maximums: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduces the rows [start, end) of `minimums` and `maximums` for every range."""
+    # A padding row keeps `end == len(array)` a valid reduceat index
+    boundaries = np.column_stack((starts, ends)).ravel()
+    padding = np.zeros((1, minimums.shape[1]))
+    range_min = np.minimum.reduceat(np.vstack((minimums, padding)), boundaries)[::2]
+    range_max = np.maximum.reduceat(np.vstack((maximums, padding)), boundaries)[::2]
+    return range_min, range_max
+
+
+def _slab_test(
+    origins: np.ndarray,
+    inverse_directions: np.ndarray,
+    box_min: np.ndarray,
+    box_max: np.ndarray,
+) -> np.ndarray:
+    """Ray-box intersection. Returns the entry distance of each ray into its box,
+    or np.inf when the box is missed."""
+    with np.errstate(invalid="ignore"):
+        t_1 = (box_min - origins) * inverse_directions
+        t_2 = (box_max - origins) * inverse_directions
+    t_near = np.nanmax(np.minimum(t_1, t_2), axis=1)
+    t_far = np.nanmin(np.maximum(t_1, t_2), axis=1)
+    t_near = np.maximum(t_near, 0)
+    return np.where(t_near <= t_far, t_near, np.inf)
+
+
+def _moller_trumbore(
+    origins: np.ndarray,
+    directions: np.ndarray,
+    vertex_0: np.ndarray,
+    edge_1: np.ndarray,
+    edge_2: np.ndarray,
+) -> np.ndarray:
+    """Ray-triangle intersection. Returns the hit distance of each pair, or np.inf
+    when the triangle is missed."""
+    p_vector = np.cross(directions, edge_2)
+    determinant = np.einsum("ij,ij->i", edge_1, p_vector)
+    parallel = np.abs(determinant) < EPSILON
+    inverse_determinant = 1 / np.where(parallel, 1, determinant)
+
+    t_vector = origins - vertex_0
+    u = np.einsum("ij,ij->i", t_vector, p_vector) * inverse_determinant
+    q_vector = np.cross(t_vector, edge_1)
+    v = np.einsum("ij,ij->i", directions, q_vector) * inverse_determinant
+    distance = np.einsum("ij,ij->i", edge_2, q_vector) * inverse_determinant
+
+    # pylint: disable=invalid-name
+    hit = ~parallel & (u >= 0) & (v >= 0) & (u + v <= 1) & (distance > EPSILON)
+    return np.where(hit, distance, np.inf)
+
+
+def associate_reflections(
+    bvh: BoundingVolumeHierarchy,
+    receiver: np.ndarray,
+    azimuth: np.ndarray,
+    elevation: np.ndarray,
+) -> Tuple[np.ndarray]:
+    """Casts a ray from the receiver along the direction of arrival of each
+    reflection and reports the surface it hits.
+
+    Parameters
+    ----------
+    bvh : BoundingVolumeHierarchy
+        Hierarchy built over the room mesh
+    receiver : np.ndarray
+        Receiver position in mesh coordinates. Shape: (3,)
+    azimuth : np.ndarray
+        Reflections azimuth in degrees, as returned by `detect_reflections`
+    elevation : np.ndarray
+        Reflections elevation in degrees, as returned by `detect_reflections`
+
+    Returns
+    -------
+    Tuple[np.ndarray]
+        Surface name hit by each reflection (None when nothing is hit), index of the
+        triangle hit (-1 when nothing is hit), path length from the receiver to the
+        surface in meters (np.inf when nothing is hit) and hit points. Shape of the
+        hit points: (R, 3)
+    """
+    directions = np.column_stack(
+        spherical_to_cartesian(1.0, np.atleast_1d(azimuth), np.atleast_1d(elevation))
+    )
+    triangles, distances = bvh.intersect(receiver, directions)
+
+    is_hit = triangles >= 0
+    surface_names = np.array(bvh.mesh.surface_names + [None], dtype=object)
+    surface_ids = np.where(is_hit, bvh.mesh.surface_ids[triangles], -1)
+    hit_points = (
+        np.asarray(receiver)
+        + directions * np.where(is_hit, distances, np.nan)[:, np.newaxis]
+    )
+    return surface_names[surface_ids], triangles, distances, hit_points
@@ -5,7 +5,6 @@ from enum import Enum
 from typing import Tuple, Union
 
 import numpy as np
-from scipy.signal import find_peaks, find_peaks_cwt
 
 
 # pylint: disable=too-few-public-methods
@@ -52,6 +51,9 @@ class NeighborReflectionDetectionStrategy(ReflectionDetectionStrategy):
         Returns:
             np.ndarray: an array with the indeces of the peaks.
         """
+        # pylint: disable=import-outside-toplevel
+        from scipy.signal import find_peaks
+
         # Drop peak properties ([0]) and direct sound peak ([1])
         return find_peaks(intensity_magnitude)[0]
 
@@ -69,8 +71,10 @@ class WaveletReflectionDetectionStrategy(ReflectionDetectionStrategy):
         Returns:
             np.ndarray: an array with the indeces of the peaks.
         """
-        # Drop peak properties ([0]) and direct sound peak ([1])
-        return find_peaks_cwt(intensity_magnitude, widths=np.arange(5, 15))[0]
+        # pylint: disable=import-outside-toplevel
+        from scipy.signal import find_peaks_cwt
+
+        return find_peaks_cwt(intensity_magnitude, widths=np.arange(5, 15))
 
 
 class ReflectionDetectionStrategies(Enum):
@@ -115,3 +119,45 @@ def detect_reflections(
         elevation[reflections_indeces],
         reflections_indeces,
     )
+
+
+def score_detected_reflections(
+    detected_times: np.ndarray,
+    expected_times: np.ndarray,
+    tolerance: float,
+) -> Tuple[float, float, float]:
+    """Scores detected reflections against ground truth. Each expected reflection is
+    matched to at most one detection, closest pairs first, when they are no more
+    than `tolerance` apart.
+
+    Args:
+        detected_times (np.ndarray): times of the detected reflections, in seconds.
+        expected_times (np.ndarray): times of the ground truth reflections, in seconds.
+        tolerance (float): maximum time difference of a match, in seconds.
+
+    Returns:
+        precision (float): ratio of detections matched to a ground truth reflection.
+        recall (float): ratio of ground truth reflections matched to a detection.
+        timing_error (float): mean absolute time difference of the matches, in
+            seconds. NaN if there are no matches.
+    """
+    detected_times = np.asarray(detected_times, dtype=float)
+    expected_times = np.asarray(expected_times, dtype=float)
+    differences = np.abs(detected_times[:, np.newaxis] - expected_times[np.newaxis, :])
+
+    detected_matched, expected_matched, errors = set(), set(), []
+    for flat_index in np.argsort(differences, axis=None):
+        indexes = np.unravel_index(flat_index, differences.shape)
+        detected_i, expected_i = int(indexes[0]), int(indexes[1])
+        if differences[detected_i, expected_i] > tolerance:
+            break
+        if detected_i in detected_matched or expected_i in expected_matched:
+            continue
+        detected_matched.add(detected_i)
+        expected_matched.add(expected_i)
+        errors.append(differences[detected_i, expected_i])
+
+    precision = len(errors) / detected_times.size if detected_times.size else 0.0
+    recall = len(errors) / expected_times.size if expected_times.size else 1.0
+    timing_error = float(np.mean(errors)) if errors else float("nan")
+    return precision, recall, timing_error
@@ -8,6 +8,10 @@
 # run again.  Do not edit this file unless you know what you are doing.
 
 
+import importlib.util
+from contextlib import contextmanager
+from pathlib import Path
+
 from PyQt5 import QtCore, QtGui, QtWidgets, QtWebEngineWidgets
 from PyQt5.QtWidgets import (
     QLabel,
@@ -16,10 +20,119 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtGui import QPixmap, QPainter, QImage
 from PyQt5.QtCore import Qt, QPoint
 
-from pathlib import Path
-
 from aira.core import AmbisonicsImpulseResponseAnalyzer
 from aira.engine.input import InputMode
+from aira.utils.cache import ResultCache
+from aira.utils.profiling import AnalysisCancelled, CancellableProfiler
+
+# Stages reported by the analysis worker, in the order they run
+ANALYSIS_STAGES = (
+    "cache",
+    "bformat_cache",
+    "decode",
+    "deconvolution",
+    "a_to_b_conversion",
+    "correction",
+    "intensity",
+    "integration",
+    "detection",
+    "w_channel",
+    "plotting",
+    "export",
+)
+
+# Page of the hedgehog web view. It is loaded once with the plotly.js bundled with
+# Plotly, and each analysis only sends its figure to renderFigure
+FIGURE_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<script src="plotly.min.js"></script>
+<style>
+html, body, #figure { margin: 0; width: 100%; height: 100%; }
+body { background: rgb(49, 52, 56); }
+</style>
+</head>
+<body>
+<div id="figure"></div>
+<script>
+function renderFigure(figure) {
+    figure.layout.uirevision = "aira";  // Keeps the camera between analyses
+    Plotly.react("figure", figure.data, figure.layout, {responsive: true});
+}
+</script>
+</body>
+</html>
+"""
+
+
+def plotly_js_url():
+    """URL of the plotly.js file bundled with Plotly, found without importing it."""
+    package_path = importlib.util.find_spec("plotly").submodule_search_locations[0]
+    return QtCore.QUrl.fromLocalFile(
+        str(Path(package_path) / "package_data" / "plotly.min.js")
+    )
+
+
+# Lado en píxeles de la proyección del hedgehog ubicada en el plano
+OVERLAY_SIZE = 300
+
+
+class AnalysisWorker(QtCore.QThread):
+    """Runs an analysis and the export of its figures outside of the GUI thread.
+
+    The worker is the profiler of the analysis, so it reports the start of every
+    stage with `stage_started`. The figure is sent with its Plotly JSON and its
+    plan projection image, serialized and rasterized in the worker. `cancel()` stops
+    the analysis at its next stage, or between the channels of an LSS deconvolution.
+    """
+
+    stage_started = QtCore.pyqtSignal(str)
+    analysis_finished = QtCore.pyqtSignal(object, str, QImage)
+    analysis_failed = QtCore.pyqtSignal(str)
+    analysis_cancelled = QtCore.pyqtSignal()
+
+    def __init__(self, analyzer, input_dict, *parameters):
+        super().__init__()
+        self.analyzer = analyzer
+        self.input_dict = input_dict
+        self.parameters = parameters
+        self.profiler = CancellableProfiler(self)
+
+    @contextmanager
+    def stage(self, name):
+        """Reports the start of stage `name` to the GUI thread."""
+        self.stage_started.emit(name)
+        yield
+
+    def close(self):
+        """Does nothing, the worker keeps no measurements."""
+
+    def cancel(self):
+        """Requests the analysis to stop at its next stage."""
+        self.profiler.cancel()
+
+    def run(self):
+        """Analyzes the measurements and emits the result, the error or the
+        cancellation of the analysis."""
+        try:
+            result = self.analyzer.compute(
+                self.input_dict, *self.parameters, self.profiler
+            )
+            with self.profiler.stage("plotting"):
+                fig = result.to_figure()
+            with self.profiler.stage("export"):
+                rgba = result.to_xy_projection(OVERLAY_SIZE)
+                projection = QImage(
+                    rgba.data, OVERLAY_SIZE, OVERLAY_SIZE, QImage.Format_RGBA8888
+                ).copy()
+                fig_json = fig.to_json()
+        except AnalysisCancelled:
+            self.analysis_cancelled.emit()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.analysis_failed.emit(f"{type(error).__name__}: {error}")
+        else:
+            self.analysis_finished.emit(fig, fig_json, projection)
 
 
 class Ui_MainWindow(object):
@@ -799,6 +912,26 @@ class Ui_MainWindow(object):
         self.input_mode_selected = QLabel()
         self.channels_per_file_selected = QLabel()
 
+        # Las rutinas de análisis corren en un QThread para no congelar la GUI
+        self.analyzer = AmbisonicsImpulseResponseAnalyzer(cache=ResultCache())
+        self.worker = None
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setMaximum(len(ANALYSIS_STAGES))
+        self.progress_bar.setMaximumWidth(300)
+        self.progress_bar.hide()
+        self.statusbar.addPermanentWidget(self.progress_bar)
+
+        # La página de la figura se carga una sola vez, luego solo recibe figuras
+        self.figure_page_ready = False
+        self.pending_figure_json = None
+
+        # Imágenes del plano: la base escalada, la proyección del último análisis
+        # (decodificada una sola vez) y el resultado con los hedgehogs ubicados
+        self.overlay_image = None
+        self.result_image = None
+        self.gV_hedgehog.loadFinished.connect(self.figure_page_loaded)
+        self.gV_hedgehog.setHtml(FIGURE_PAGE, plotly_js_url())
+
         self.actionImport_LSS.triggered.connect(self.import_LSS)
         self.actionImport_Aformat_1channel.triggered.connect(
             self.import_Aformat_1channel
@@ -870,6 +1003,12 @@ class Ui_MainWindow(object):
     # Acá empiezan los métodos para las acciones del usuario
 
     def analyze(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.pb_analyze.setEnabled(False)
+            self.statusbar.showMessage("Cancelling analysis...")
+            return
+
         if self.input_mode_selected.text() == "LSS":
             input_mode = InputMode.LSS
             FLU_path = self.path_1.text()
@@ -923,10 +1062,10 @@ class Ui_MainWindow(object):
                 Z_path = self.path_4.text()
                 channels_per_file = 1
                 data = {
-                    "channel_w": W_path,
-                    "channel_X": X_path,
-                    "channel_Y": Y_path,
-                    "channel_Z": Z_path,
+                    "w_channel": W_path,
+                    "x_channel": X_path,
+                    "y_channel": Y_path,
+                    "z_channel": Z_path,
                     "input_mode": input_mode,
                     "channels_per_file": channels_per_file,
                     "frequency_correction": False,
@@ -951,18 +1090,54 @@ class Ui_MainWindow(object):
         intensity_threshold = float(self.lineEdit_threshold.text())
         analysis_length = float(self.lineEdit_aLength.text()) / 1000
 
-        analyzer = AmbisonicsImpulseResponseAnalyzer()
-        fig = analyzer.analyze(
-            input_dict=data,
-            integration_time=integration_time,
-            intensity_threshold=intensity_threshold,
-            analysis_length=analysis_length,
-        )
-        analyzer.export_xy_projection(fig, "projection.png")
-        fig.write_html("out.html")
-        url = QtCore.QUrl.fromLocalFile(str(Path("out.html").resolve()))
-        self.gV_hedgehog.load(url)
+        self.worker = AnalysisWorker(
+            self.analyzer, data, integration_time, intensity_threshold, analysis_length
+        )
+        self.worker.stage_started.connect(self.show_stage)
+        self.worker.analysis_finished.connect(self.show_analysis)
+        self.worker.analysis_failed.connect(
+            lambda message: self.statusbar.showMessage(f"Analysis failed: {message}")
+        )
+        self.worker.analysis_cancelled.connect(
+            lambda: self.statusbar.showMessage("Analysis cancelled")
+        )
+        self.worker.finished.connect(self.analysis_ended)
+        self.pb_analyze.setText("Cancel")
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+        self.worker.start()
+
+    def show_stage(self, name):
+        """Advances the progress bar to the stage started by the worker."""
+        if name in ANALYSIS_STAGES:
+            self.progress_bar.setValue(ANALYSIS_STAGES.index(name))
+        self.statusbar.showMessage(f"Analyzing: {name.replace('_', ' ')}...")
+
+    def show_analysis(self, fig, fig_json, projection):
+        """Shows the figure of a finished analysis and keeps its plan projection."""
         self.plotly_fig = fig
+        self.overlay_image = projection
+        if self.figure_page_ready:
+            self.gV_hedgehog.page().runJavaScript(f"renderFigure({fig_json});")
+        else:
+            self.pending_figure_json = fig_json
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.statusbar.showMessage("Analysis finished", 5000)
+
+    def figure_page_loaded(self, ok):
+        """Renders the figure of an analysis that finished before the page loaded."""
+        self.figure_page_ready = ok
+        if ok and self.pending_figure_json is not None:
+            self.gV_hedgehog.page().runJavaScript(
+                f"renderFigure({self.pending_figure_json});"
+            )
+            self.pending_figure_json = None
+
+    def analysis_ended(self):
+        """Restores the analyze button once the worker finishes."""
+        self.progress_bar.hide()
+        self.pb_analyze.setText("Analyze")
+        self.pb_analyze.setEnabled(True)
 
     def load_plan(self):
         file_dialog = QFileDialog()
@@ -970,51 +1145,53 @@ class Ui_MainWindow(object):
             MainWindow, "Select image", "", "Image file (*.png *.jpg *.jpeg)"
         )
         if file_path:
-            # Cargar la imagen base
-            self.base_image = QImage(file_path)
-            scaled_image = self.base_image.scaled(
+            # Cargar la imagen base, escalada una sola vez
+            base_image = QImage(file_path).scaled(
                 1000, 800, Qt.AspectRatioMode.KeepAspectRatio
             )
 
-            # Crear una imagen resultante del mismo tamaño que la imagen base
-            self.result_image = QImage(scaled_image.size(), QImage.Format_ARGB32)
-            self.result_image.fill(0)  # Rellenar con transparencia
+            # La imagen resultante parte de la base y acumula los hedgehogs
+            self.result_image = base_image.convertToFormat(
+                QImage.Format_ARGB32_Premultiplied
+            )
 
-            # Mostrar la imagen base en un QLabel
-            self.label_plan_view.setPixmap(QPixmap.fromImage(scaled_image))
+            # Mostrar la imagen resultante en un QLabel
+            self.label_plan_view.setPixmap(QPixmap.fromImage(self.result_image))
 
             # Ajustar el tamaño del QLabel al tamaño de la imagen base escalada
-            self.label_plan_view.resize(scaled_image.size())
+            self.label_plan_view.resize(self.result_image.size())
 
             self.enable_export()
 
     def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            # Verificar si el clic ocurrió dentro de los límites de la imagen base
-            if (
-                event.x() < self.base_image.width()
-                and event.y() < self.base_image.height()
-            ):
-                # Cargar la imagen superpuesta
-                overlay_image = QImage("projection.png")
-                overlay_position = QPoint(event.x() - 787, event.y() - 350)
-
-                # Dibujar la imagen base en la imagen resultante
-                painter = QPainter(self.result_image)
-                painter.drawImage(
-                    0,
-                    0,
-                    self.base_image.scaled(
-                        1000, 800, Qt.AspectRatioMode.KeepAspectRatio
-                    ),
-                )
-
-                # Dibujar la imagen superpuesta en la imagen resultante
-                painter.drawImage(overlay_position, overlay_image)
-                painter.end()
-
-                # Mostrar la imagen resultante en el QLabel
-                self.label_plan_view.setPixmap(QPixmap.fromImage(self.result_image))
+        if (
+            event.button() != Qt.LeftButton
+            or self.result_image is None
+            or self.overlay_image is None
+        ):
+            return
+        # El pixmap está centrado en el QLabel: pasar a coordenadas de la imagen
+        pixmap = self.label_plan_view.pixmap()
+        pixmap_x = (self.label_plan_view.width() - pixmap.width()) // 2
+        pixmap_y = (self.label_plan_view.height() - pixmap.height()) // 2
+        x = event.x() - pixmap_x
+        y = event.y() - pixmap_y
+
+        # Verificar si el clic ocurrió dentro de los límites de la imagen base
+        if not (0 <= x < pixmap.width() and 0 <= y < pixmap.height()):
+            return
+        overlay_position = QPoint(
+            x - self.overlay_image.width() // 2,
+            y - self.overlay_image.height() // 2,
+        )
+
+        # Dibujar solo la imagen superpuesta sobre la imagen resultante
+        painter = QPainter(self.result_image)
+        painter.drawImage(overlay_position, self.overlay_image)
+        painter.end()
+
+        # Mostrar la imagen resultante en el QLabel
+        self.label_plan_view.setPixmap(QPixmap.fromImage(self.result_image))
 
     def enable_export(self):
         self.pB_export_plan.setEnabled(True)
@@ -0,0 +1,462 @@
+"""HTTP analysis service backed by a process pool and a result cache.
+
+Several front ends can share one warm backend:
+
+    python -m aira.service --port 8000 --workers 4
+
+Endpoints:
+
+- `GET /health`: status of the service and number of jobs in flight.
+- `POST /analyze`: analyzes one measurement. The body is a JSON object with the
+  keys of a batch manifest position (`input_mode`, `channels_per_file`,
+  `frequency_correction`, paths of the files and optionally `integration_time`,
+  `intensity_threshold` and `analysis_length`), plus `output`: `json` (default)
+  for the numerical results, `figure` for the Plotly JSON figure or `html` for a
+  standalone HTML page.
+  Instead of a path, a file can be uploaded as `{"base64": "<encoded file>"}`; it
+  is decoded from memory by the worker, without temporary files.
+- `POST /batch`: analyzes several measurements. The body is a JSON object with a
+  list of `positions` and optional default `parameters`. Returns one record per
+  position, as written by `aira.batch`.
+
+Jobs beyond the pool size wait in a bounded queue. When it is full, requests are
+rejected with `503 Service Unavailable` and a `Retry-After` header.
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from aira.batch import (
+    ANALYSIS_LENGTH,
+    INTEGRATION_TIME,
+    INTENSITY_THRESHOLD,
+    PARAMETER_KEYS,
+    PATH_KEYS,
+    position_input_dict,
+)
+from aira.core import AmbisonicsImpulseResponseAnalyzer, AnalysisResult
+from aira.utils.cache import ResultCache, hash_inputs
+
+DEFAULT_PORT = 8000
+DEFAULT_QUEUE_SIZE = 32
+OUTPUT_FORMATS = ("json", "figure", "html")
+RETRY_AFTER_SECONDS = 1
+
+
+class ServiceBusy(Exception):
+    """Raised when the job queue of the service is full."""
+
+
+def _warm_up() -> None:
+    """Imports the plotting modules once per worker process, so that the first
+    request rendering a figure does not pay for it."""
+    # pylint: disable=import-outside-toplevel,unused-import
+    from aira.engine import plot  # noqa: F401
+
+
+def analyze_request(
+    position: dict, parameters: dict, render: bool
+) -> Tuple[dict, Optional[str]]:
+    """Analyzes a measurement. Runs in the worker processes.
+
+    Returns
+    -------
+    Tuple[dict, Optional[str]]
+        Result as returned by AnalysisResult.to_dict and Plotly JSON of its figure,
+        or None if `render` is False
+    """
+    result = AmbisonicsImpulseResponseAnalyzer().compute(
+        position_input_dict(position), **parameters
+    )
+    figure_json = result.to_figure().to_json() if render else None
+    return result.to_dict(), figure_json
+
+
+class AnalysisService:
+    """Runs analyses on a process pool, caching their results.
+
+    Parameters
+    ----------
+    workers : int, optional
+        Number of worker processes, by default os.cpu_count()
+    queue_size : int, optional
+        Number of jobs that may wait for a free worker, by default
+        DEFAULT_QUEUE_SIZE
+    cache : ResultCache, optional
+        Cache of results and figures, by default None
+    """
+
+    def __init__(
+        self,
+        workers: int = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        cache: ResultCache = None,
+    ) -> None:
+        self.workers = workers or os.cpu_count()
+        self.capacity = self.workers + queue_size
+        self.cache = cache
+        # Spawned workers do not inherit the sockets of the server, which forked
+        # workers would keep open after the server stops
+        self.executor = ProcessPoolExecutor(
+            self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up,
+        )
+        self._jobs = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """Number of jobs running or queued."""
+        return self._in_flight
+
+    def _reserve(self, jobs: int) -> None:
+        """Takes `jobs` slots of the queue, or raises ServiceBusy without taking any
+        if they are not all free."""
+        taken = 0
+        while taken < jobs and self._jobs.acquire(blocking=False):
+            taken += 1
+        if taken < jobs:
+            for _ in range(taken):
+                self._jobs.release()
+            raise ServiceBusy(f"{self.in_flight} jobs in flight")
+        with self._lock:
+            self._in_flight += jobs
+
+    def _release(self) -> None:
+        """Frees the slot of a finished job."""
+        with self._lock:
+            self._in_flight -= 1
+        self._jobs.release()
+
+    @staticmethod
+    def parameters(position: dict, defaults: dict = None) -> Dict[str, float]:
+        """Analysis parameters of a position, falling back to `defaults` and then
+        to the defaults of the batch analysis."""
+        defaults = {
+            "integration_time": INTEGRATION_TIME,
+            "intensity_threshold": INTENSITY_THRESHOLD,
+            "analysis_length": ANALYSIS_LENGTH,
+            **(defaults or {}),
+        }
+        return {key: float(position.get(key, defaults[key])) for key in PARAMETER_KEYS}
+
+    def _cached(self, key: str, render: bool) -> Optional[Tuple[dict, Optional[str]]]:
+        """Result and figure of a cache entry, or None if any of them is missing."""
+        if self.cache is None:
+            return None
+        values = self.cache.load(key)
+        figure_json = self.cache.load_figure(key) if render else None
+        if values is None or (render and figure_json is None):
+            return None
+        return AnalysisResult.from_dict(values).to_dict(), figure_json
+
+    def _store(self, key: str, result_dict: dict, figure_json: Optional[str]) -> None:
+        """Stores a result and its figure in the cache."""
+        if self.cache is None:
+            return
+        if self.cache.entry(key) is not None:  # Result stored without its figure
+            if figure_json is not None:
+                self.cache.store_figure(key, figure_json)
+            return
+        values = AnalysisResult.from_dict(result_dict).values()
+        self.cache.store(key, values, figure_json)
+
+    def _submit(self, position: dict, defaults: dict, render: bool):
+        """Submits the analysis of a position, once a queue slot was reserved.
+
+        Returns
+        -------
+        Tuple[str, Future | tuple]
+            Cache key and either the future of the job or the cached result
+        """
+        parameters = self.parameters(position, defaults)
+        key = hash_inputs(position_input_dict(position), **parameters)
+        cached = self._cached(key, render)
+        if cached is not None:
+            self._release()
+            return key, cached
+        future = self.executor.submit(analyze_request, position, parameters, render)
+        future.add_done_callback(lambda _: self._release())
+        return key, future
+
+    def analyze(self, position: dict, render: bool = False) -> Tuple[dict, str, bool]:
+        """Analyzes one position.
+
+        Parameters
+        ----------
+        position : dict
+            Position as in a batch manifest, with absolute paths
+        render : bool, optional
+            Also returns the Plotly JSON figure, by default False
+
+        Returns
+        -------
+        Tuple[dict, str, bool]
+            Result dictionary, Plotly JSON figure (None if not rendered) and whether
+            the result came from the cache
+
+        Raises
+        ------
+        ServiceBusy
+            If the job queue is full
+        """
+        self._reserve(1)
+        try:
+            key, job = self._submit(position, None, render)
+        except Exception:
+            self._release()
+            raise
+        if isinstance(job, tuple):
+            return (*job, True)
+        result_dict, figure_json = job.result()
+        self._store(key, result_dict, figure_json)
+        return result_dict, figure_json, False
+
+    def batch(self, positions: List[dict], defaults: dict = None) -> List[dict]:
+        """Analyzes several positions concurrently.
+
+        Returns
+        -------
+        List[dict]
+            One record per position with its name, status and result or error
+
+        Raises
+        ------
+        ServiceBusy
+            If the job queue has not room for every position
+        """
+        self._reserve(len(positions))
+        jobs = []
+        for position in positions:
+            try:
+                jobs.append(self._submit(position, defaults, False))
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                self._release()
+                jobs.append((None, error))
+        records = []
+        for index, (position, (key, job)) in enumerate(zip(positions, jobs)):
+            record = {"position": position.get("position", index)}
+            try:
+                if isinstance(job, Exception):
+                    raise job
+                if isinstance(job, tuple):
+                    result_dict = job[0]
+                else:
+                    result_dict, _ = job.result()
+                    self._store(key, result_dict, None)
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                record.update(status="error", error=f"{type(error).__name__}: {error}")
+            else:
+                record.update(status="ok", result=result_dict)
+            records.append(record)
+        return records
+
+    def close(self) -> None:
+        """Shuts the worker processes down."""
+        self.executor.shutdown()
+
+
+def decode_uploads(position: dict) -> dict:
+    """Decodes the files uploaded as base64 in a JSON position to bytes.
+
+    Raises
+    ------
+    ValueError
+        If an upload is not valid base64
+    """
+    position = dict(position)
+    for key in PATH_KEYS:
+        upload = position.get(key)
+        if isinstance(upload, dict) and "base64" in upload:
+            try:
+                position[key] = base64.b64decode(upload["base64"], validate=True)
+            except binascii.Error as error:
+                raise ValueError(f"{key} is not valid base64: {error}") from error
+    return position
+
+
+def figure_html(figure_json: str) -> str:
+    """Standalone HTML page of a Plotly JSON figure, loading plotly.js from its CDN."""
+    import plotly.io as pio  # pylint: disable=import-outside-toplevel
+
+    return pio.from_json(figure_json).to_html(include_plotlyjs="cdn")
+
+
+class AnalysisRequestHandler(BaseHTTPRequestHandler):
+    """Handles the requests of an AnalysisHTTPServer."""
+
+    server: "AnalysisHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def _send(
+        self,
+        status: HTTPStatus,
+        body: bytes,
+        content_type: str = "application/json",
+        headers: dict = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: HTTPStatus, payload, headers: dict = None) -> None:
+        self._send(status, json.dumps(payload).encode(), headers=headers)
+
+    def _send_error(self, status: HTTPStatus, message: str, headers=None) -> None:
+        self._send_json(status, {"error": message}, headers)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Reports the status of the service."""
+        if self.path != "/health":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown endpoint {self.path}")
+            return
+        service = self.server.service
+        self._send_json(
+            HTTPStatus.OK,
+            {
+                "status": "ok",
+                "workers": service.workers,
+                "capacity": service.capacity,
+                "in_flight": service.in_flight,
+            },
+        )
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Runs the analysis endpoints."""
+        if self.path not in ("/analyze", "/batch"):
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown endpoint {self.path}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError("The body must be a JSON object")
+        except ValueError as error:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {error}")
+            return
+
+        try:
+            if self.path == "/analyze":
+                self._analyze(request)
+            else:
+                self._batch(request)
+        except ServiceBusy as error:
+            self._send_error(
+                HTTPStatus.SERVICE_UNAVAILABLE,
+                f"Service busy: {error}",
+                {"Retry-After": str(RETRY_AFTER_SECONDS)},
+            )
+        except (KeyError, ValueError) as error:
+            self._send_error(HTTPStatus.BAD_REQUEST, f"{type(error).__name__}: {error}")
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self._send_error(
+                HTTPStatus.UNPROCESSABLE_ENTITY, f"{type(error).__name__}: {error}"
+            )
+
+    def _analyze(self, request: dict) -> None:
+        output = request.pop("output", "json")
+        if output not in OUTPUT_FORMATS:
+            raise ValueError(f"output must be one of {', '.join(OUTPUT_FORMATS)}")
+        result_dict, figure_json, cache_hit = self.server.service.analyze(
+            decode_uploads(request), render=output != "json"
+        )
+        headers = {"X-Cache": "hit" if cache_hit else "miss"}
+        if output == "json":
+            self._send_json(HTTPStatus.OK, result_dict, headers)
+        elif output == "figure":
+            self._send(HTTPStatus.OK, figure_json.encode(), headers=headers)
+        else:
+            self._send(
+                HTTPStatus.OK,
+                figure_html(figure_json).encode(),
+                "text/html; charset=utf-8",
+                headers,
+            )
+
+    def _batch(self, request: dict) -> None:
+        positions = request["positions"]
+        if not isinstance(positions, list):
+            raise ValueError("positions must be a list")
+        records = self.server.service.batch(
+            [decode_uploads(position) for position in positions],
+            request.get("parameters"),
+        )
+        self._send_json(HTTPStatus.OK, {"positions": records})
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class AnalysisHTTPServer(ThreadingHTTPServer):
+    """HTTP server of an AnalysisService. Each request is handled in its own thread,
+    waiting for the worker processes without blocking the other requests."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: Tuple[str, int], service: AnalysisService, verbose=True
+    ) -> None:
+        self.service = service
+        self.verbose = verbose
+        super().__init__(address, AnalysisRequestHandler)
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients closing their connections are not errors of the service
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.service.close()
+
+
+def main(argv: List[str] = None) -> None:
+    """Command line entry point of the analysis service."""
+    parser = argparse.ArgumentParser(
+        prog="aira-service", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--cache-dir", help="Result cache directory")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Do not cache the results"
+    )
+    args = parser.parse_args(argv)
+
+    cache = None
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir) if args.cache_dir else ResultCache()
+    service = AnalysisService(args.workers, args.queue_size, cache)
+    # Stopping the service with SIGTERM also shuts the worker processes down
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with AnalysisHTTPServer((args.host, args.port), service) as server:
+        print(f"Serving on http://{args.host}:{server.server_address[1]}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,133 @@
 import os
-import tempfile
+from concurrent.futures import wait
+from typing import TYPE_CHECKING, Tuple
+
+import numpy as np
 import streamlit as st
 
-from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.core import AmbisonicsImpulseResponseAnalyzer, AnalysisResult
 from aira.engine.input import InputMode
+from aira.utils.cache import hash_inputs
+from aira.utils.jobs import JobQueue
+
+if TYPE_CHECKING:  # Plotly is only imported when a figure is built
+    from plotly import graph_objects as go
+
+# Analyses running at once in the server process, shared by every session
+MAX_CONCURRENT_ANALYSES = int(os.environ.get("AIRA_MAX_CONCURRENT_ANALYSES", 0))
+QUEUE_POLL_SECONDS = 0.25
+
+# Each stage is cached on the hash of the uploads and on the parameters it depends
+# on, so changing a parameter only runs the stages after it. The analysis keeps
+# every detected reflection, so a new threshold only selects among them and patches
+# the figure. Arguments starting with an underscore are not hashed by Streamlit.
+
+
+@st.cache_resource
+def get_analyzer() -> AmbisonicsImpulseResponseAnalyzer:
+    """Returns the analyzer shared by every session of the app."""
+    return AmbisonicsImpulseResponseAnalyzer()
+
+
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Returns the job queue shared by every session of the app."""
+    return JobQueue(MAX_CONCURRENT_ANALYSES or None)
+
+
+# The analysis stages run in the threads of the job queue, without the script
+# context that the spinner of the cached functions needs. input_key is only the
+# Streamlit cache key of the uploads
+@st.cache_resource(max_entries=8, show_spinner=False)
+# pylint: disable-next=unused-argument
+def process_uploads(input_key: str, _input_dict: dict) -> Tuple[np.ndarray, int]:
+    """Decodes and processes the uploaded measurements into B-format signals. They
+    are shared by every session without copies, so they are made read-only."""
+    bformat_signals, sample_rate = get_analyzer().bformat_signals(_input_dict)
+    bformat_signals.setflags(write=False)
+    return bformat_signals, sample_rate
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_result(
+    # pylint: disable-next=unused-argument
+    input_key: str,  # Only the Streamlit cache key of the uploads
+    integration_time: float,
+    analysis_length: float,
+    _bformat_signals: np.ndarray,
+    _sample_rate: int,
+) -> dict:
+    """Analyzes the B-format signals of the uploads without intensity threshold."""
+    bformat_dict = {
+        "stacked_signals": _bformat_signals,
+        "sample_rate": _sample_rate,
+        "input_mode": InputMode.BFORMAT,
+        "channels_per_file": 4,
+        "frequency_correction": False,
+    }
+    result = get_analyzer().compute(
+        bformat_dict, integration_time, -np.inf, analysis_length
+    )
+    return result.values()
 
 
-def save_temp_file(file):
-    temp_dir = tempfile.gettempdir()
-    temp_file_path = os.path.join(temp_dir, file.name)
-    with open(temp_file_path, "wb") as temp_file:
-        temp_file.write(file.getvalue())
-    return temp_file_path
+def analyze_uploads(
+    input_key: str, input_dict: dict, integration_time: float, analysis_length: float
+) -> dict:
+    """Job of the analysis of the uploads, run by the job queue."""
+    bformat_signals, sample_rate = process_uploads(input_key, input_dict)
+    return compute_result(
+        input_key, integration_time, analysis_length, bformat_signals, sample_rate
+    )
+
+
+def queued_analysis(
+    input_key: str, input_dict: dict, integration_time: float, analysis_length: float
+) -> dict:
+    """Runs the analysis of the uploads through the job queue of the server, showing
+    the position of the session in the queue while it waits. Sessions asking for
+    the same analysis share one job."""
+    jobs = get_job_queue()
+    job_key = (input_key, integration_time, analysis_length)
+    future = jobs.submit(
+        job_key,
+        analyze_uploads,
+        input_key,
+        input_dict,
+        integration_time,
+        analysis_length,
+    )
+    status = st.empty()
+    while not wait([future], timeout=QUEUE_POLL_SECONDS).done:
+        position = jobs.position(job_key)
+        if position:
+            status.info(f"⏳ Waiting for a free slot: position {position} in the queue")
+        else:
+            status.info("⚙️ Analyzing...")
+    status.empty()
+    return future.result()
+
+
+@st.cache_data(max_entries=64)
+def build_figure(
+    input_key: str,
+    # Only Streamlit cache keys, the result was computed with them
+    # pylint: disable-next=unused-argument
+    integration_time: float,
+    # pylint: disable-next=unused-argument
+    analysis_length: float,
+    _result_values: dict,
+) -> "go.Figure":
+    """Builds the figure of an analysis with the layout of the app. Every call
+    returns a copy, whose reflections can be updated for a threshold."""
+    fig = AnalysisResult.from_dict(_result_values).to_figure()
+    fig.update_layout(
+        uirevision=input_key,  # Keeps the camera when the sliders move
+        height=1080,
+        paper_bgcolor="rgb(14,17,23)",
+        plot_bgcolor="rgb(14,17,23)",
+    )
+    return fig
 
 
 def run_streamlit_app():
@@ -33,11 +149,17 @@ def run_streamlit_app():
         st.subheader("⚙️ Settings")
         col1, col2, col3 = st.columns(3)
         with col1:
-            integration_time = st.selectbox("Integration time [ms]", [1, 5, 10])
+            integration_time = st.select_slider(
+                "Integration time [ms]", options=[1, 5, 10]
+            )
         with col2:
-            analysis_length = st.text_input("Analysis length [ms]", value="500")
+            analysis_length = st.slider(
+                "Analysis length [ms]", min_value=50, max_value=2000, value=500, step=50
+            )
         with col3:
-            intensity_threshold = st.text_input("Intensity threshold [dB]", value=-60)
+            intensity_threshold = st.slider(
+                "Intensity threshold [dB]", min_value=-100, max_value=0, value=-60
+            )
 
     with audio_files:
         st.subheader("🔉 LSS room responses in A-Format")
@@ -55,32 +177,32 @@ def run_streamlit_app():
             "Inverse filter", type=["mp3", "wav"]
         )
 
-    # "Analyze" button
-    if st.button("Analyze", use_container_width=True):
-        data = {
-            "front_left_up": save_temp_file(audio_file_flu),
-            "front_right_down": save_temp_file(audio_file_frd),
-            "back_right_up": save_temp_file(audio_file_bru),
-            "back_left_down": save_temp_file(audio_file_bld),
-            "inverse_filter": save_temp_file(audio_file_inverse_filter),
-            "input_mode": InputMode.LSS,
-            "channels_per_file": 1,
-            "frequency_correction": True,
-        }
-        analyzer = AmbisonicsImpulseResponseAnalyzer()
-        fig = analyzer.analyze(
-            input_dict=data,
-            integration_time=float(integration_time) / 1000,
-            intensity_threshold=float(intensity_threshold),
-            analysis_length=float(analysis_length) / 1000,
-            show=False,
-        )
-        fig.update_layout(
-            height=1080,
-            paper_bgcolor="rgb(14,17,23)",
-            plot_bgcolor="rgb(14,17,23)",
-        )
-        st.plotly_chart(fig, use_container_width=True, height=1080)
+    uploads = {
+        "front_left_up": audio_file_flu,
+        "front_right_down": audio_file_frd,
+        "back_right_up": audio_file_bru,
+        "back_left_down": audio_file_bld,
+        "inverse_filter": audio_file_inverse_filter,
+    }
+    if any(upload is None for upload in uploads.values()):
+        st.info("Upload the four A-format responses and the inverse filter.")
+        return
+
+    # The analysis follows the sliders, every stage runs only when its inputs change
+    data = {
+        **{key: upload.getvalue() for key, upload in uploads.items()},
+        "input_mode": InputMode.LSS,
+        "channels_per_file": 1,
+        "frequency_correction": True,
+    }
+    input_key = hash_inputs(data)
+    integration_time = float(integration_time) / 1000
+    analysis_length = float(analysis_length) / 1000
+    result_values = queued_analysis(input_key, data, integration_time, analysis_length)
+    fig = build_figure(input_key, integration_time, analysis_length, result_values)
+    result = AnalysisResult.from_dict(result_values)
+    result.with_threshold(float(intensity_threshold)).update_figure(fig)
+    st.plotly_chart(fig, use_container_width=True, height=1080)
 
 
 if __name__ == "__main__":
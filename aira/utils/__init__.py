@@ -6,3 +6,4 @@ from .formatter import (
     spherical_to_cartesian,
 )
 from .utils import read_signals_dict, read_aformat
+from .profiling import StageProfiler, NULL_PROFILER
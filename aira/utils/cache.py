@@ -0,0 +1,290 @@
+"""On-disk caches of analysis results keyed on the content of the input files."""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIRECTORY = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "aira"
+)
+DEFAULT_MAX_BYTES = 512 * 1024**2
+HASH_CHUNK_BYTES = 1024**2
+
+_file_hashes: Dict[Tuple[str, int, int], str] = {}
+
+
+def hash_file(path: Union[str, Path]) -> str:
+    """Hashes the content of a file. Hashes are remembered per process by path,
+    size and modification time, so unchanged files are only read once.
+
+    Parameters
+    ----------
+    path : str | Path
+        Path of the file
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the file content
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _file_hashes:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_BYTES), b""):
+                digest.update(chunk)
+        _file_hashes[memo_key] = digest.hexdigest()
+    return _file_hashes[memo_key]
+
+
+def _hash_buffer(value) -> Optional[str]:
+    """Hashes the content of bytes or of a binary file object without moving its
+    position. Unseekable files can not be hashed without consuming them, so they
+    get None."""
+    if isinstance(value, io.BytesIO):
+        return hashlib.blake2b(value.getbuffer(), digest_size=20).hexdigest()
+    if not isinstance(value, io.IOBase):
+        return hashlib.blake2b(value, digest_size=20).hexdigest()
+    if not value.seekable():
+        return None
+    position = value.tell()
+    digest = hashlib.blake2b(digest_size=20)
+    for chunk in iter(lambda: value.read(HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    value.seek(position)
+    return digest.hexdigest()
+
+
+def hash_inputs(input_dict: dict, **parameters) -> Optional[str]:
+    """Builds a cache key from an input dictionary and analysis parameters. Paths
+    are replaced by the hash of the file they point to, so renaming or touching a
+    file does not invalidate its entries, while editing it does.
+
+    Parameters
+    ----------
+    input_dict : dict
+        Input dictionary with the measurements (paths, audio files in memory or
+        arrays), input mode, channels per file and frequency correction flag
+    **parameters
+        Analysis parameters that the cached value depends on
+
+    Returns
+    -------
+    str | None
+        Hexadecimal cache key, or None if an input can not be hashed without
+        consuming it (an unseekable file), in which case nothing should be cached
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"aira-cache-{CACHE_VERSION}".encode())
+    for key, value in sorted({**input_dict, **parameters}.items()):
+        if isinstance(value, (str, Path)) and Path(value).is_file():
+            value = hash_file(value)
+        elif isinstance(value, (bytes, bytearray, memoryview, io.IOBase)):
+            value = _hash_buffer(value)
+            if value is None:
+                return None
+        elif isinstance(value, np.ndarray):
+            array = np.ascontiguousarray(value)
+            value = (
+                f"{array.dtype.str}{array.shape}"
+                + hashlib.blake2b(array.data, digest_size=20).hexdigest()
+            )
+        elif isinstance(value, Enum):
+            value = value.value
+        digest.update(f"{key}={value!r};".encode())
+    return digest.hexdigest()
+
+
+class DirectoryCache:
+    """Cache of entries stored as subdirectories of `directory`, evicted in least
+    recently used order when their total size exceeds `max_bytes`.
+
+    Entries are written to a temporary directory and renamed into place, so that
+    concurrent processes never read incomplete entries.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = DEFAULT_CACHE_DIRECTORY,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def entry(self, key: str) -> Optional[Path]:
+        """Directory of an entry, marked as recently used, or None on a miss."""
+        entry_path = self.directory / key
+        try:
+            os.utime(entry_path)
+        except FileNotFoundError:
+            return None
+        return entry_path
+
+    def _commit(self, key: str, temp_path: Path) -> Path:
+        """Moves a fully written temporary entry into place and evicts old ones."""
+        entry_path = self.directory / key
+        try:
+            os.replace(temp_path, entry_path)
+        except OSError:  # Stored meanwhile by another process
+            shutil.rmtree(temp_path, ignore_errors=True)
+        self.evict()
+        return entry_path
+
+    def _temp_entry(self) -> Path:
+        """Creates a temporary directory where a new entry is written."""
+        return Path(tempfile.mkdtemp(prefix=".tmp-", dir=self.directory))
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits in
+        `max_bytes`."""
+        entries = []
+        for entry_path in self.directory.iterdir():
+            if entry_path.name.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(file.stat().st_size for file in entry_path.iterdir())
+                entries.append((entry_path.stat().st_mtime, size, entry_path))
+            except FileNotFoundError:  # Evicted meanwhile by another process
+                continue
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_bytes -= size
+
+    def clear(self) -> None:
+        """Removes every entry. Entries being written by other processes are left
+        alone."""
+        for entry_path in self.directory.iterdir():
+            if entry_path.name.startswith(".tmp-"):
+                continue
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+
+class ResultCache(DirectoryCache):
+    """Cache of analysis results and their figures. Arrays are stored in a `.npz`
+    file, the remaining values in a JSON file and the figure as Plotly JSON."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = DEFAULT_CACHE_DIRECTORY / "results",
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        super().__init__(directory, max_bytes)
+
+    def load(self, key: str) -> Optional[dict]:
+        """Loads the values of a stored result, or returns None on a miss."""
+        entry_path = self.entry(key)
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path / "values.json", "r", encoding="utf-8") as file:
+                values = json.load(file)
+            with np.load(entry_path / "arrays.npz") as arrays:
+                values.update(arrays)
+        except (OSError, ValueError):  # Evicted while reading, or corrupted
+            return None
+        return values
+
+    def store(self, key: str, values: dict, figure_json: str = None) -> None:
+        """Stores the values of a result. NumPy arrays go to the `.npz` file and
+        the rest must be JSON serializable."""
+        temp_path = self._temp_entry()
+        arrays = {k: v for k, v in values.items() if isinstance(v, np.ndarray)}
+        np.savez(temp_path / "arrays.npz", **arrays)
+        with open(temp_path / "values.json", "w", encoding="utf-8") as file:
+            json.dump({k: v for k, v in values.items() if k not in arrays}, file)
+        if figure_json is not None:
+            (temp_path / "figure.json").write_text(figure_json, encoding="utf-8")
+        self._commit(key, temp_path)
+
+    def load_figure(self, key: str) -> Optional[str]:
+        """Loads the Plotly JSON of a stored figure, or returns None on a miss."""
+        entry_path = self.entry(key)
+        if entry_path is None:
+            return None
+        try:
+            return (entry_path / "figure.json").read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def store_figure(self, key: str, figure_json: str) -> None:
+        """Adds the figure to a stored result. Does nothing if it was evicted."""
+        entry_path = self.entry(key)
+        if entry_path is None:
+            return
+        temp_file = entry_path / f".tmp-figure-{os.getpid()}-{time.monotonic_ns()}"
+        try:
+            temp_file.write_text(figure_json, encoding="utf-8")
+            os.replace(temp_file, entry_path / "figure.json")
+        except OSError:  # Evicted meanwhile by another process
+            return
+        self.evict()
+
+
+class BFormatCache(DirectoryCache):
+    """Cache of processed B-format impulse responses, the output of the input
+    processor chain. Arrays are stored as `.npy` files and opened memory-mapped, so
+    a hit reads only the samples that the analysis touches."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = DEFAULT_CACHE_DIRECTORY / "bformat",
+        max_bytes: int = 4 * DEFAULT_MAX_BYTES,
+    ) -> None:
+        super().__init__(directory, max_bytes)
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, int]]:
+        """Opens a stored B-format array as a read-only memory map.
+
+        Parameters
+        ----------
+        key : str
+            Key of the input files, as returned by `hash_inputs`
+
+        Returns
+        -------
+        Tuple[np.ndarray, int] | None
+            B-format array with one channel per row and its sample rate, or None on
+            a miss
+        """
+        entry_path = self.entry(key)
+        if entry_path is None:
+            return None
+        try:
+            with open(entry_path / "metadata.json", "r", encoding="utf-8") as file:
+                metadata = json.load(file)
+            bformat = np.load(entry_path / "bformat.npy", mmap_mode="r")
+        except (OSError, ValueError):  # Evicted while reading, or corrupted
+            return None
+        return bformat, metadata["sample_rate"]
+
+    def store(self, key: str, bformat: np.ndarray, sample_rate: int) -> None:
+        """Stores a B-format array with one channel per row and its sample rate."""
+        temp_path = self._temp_entry()
+        np.save(temp_path / "bformat.npy", np.ascontiguousarray(bformat))
+        with open(temp_path / "metadata.json", "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "sample_rate": int(sample_rate),
+                    "shape": list(bformat.shape),
+                    "dtype": np.asarray(bformat).dtype.str,
+                },
+                file,
+            )
+        self._commit(key, temp_path)
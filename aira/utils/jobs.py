@@ -0,0 +1,98 @@
+"""Process-wide queue of analysis jobs, for servers shared by several users."""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Optional
+
+
+class JobQueue:
+    """Runs jobs in submission order on a bounded number of threads.
+
+    Running many analyses at once only adds up their memory, while the CPU time of
+    each one grows, so the number of running jobs is capped and the rest wait in a
+    queue. Jobs submitted with the key of a job that is still queued or running get
+    its future instead of running again, so identical requests of several users are
+    computed once.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        Maximum number of jobs running at once, by default os.cpu_count()
+    """
+
+    def __init__(self, max_concurrency: int = None) -> None:
+        self.max_concurrency = max_concurrency or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="aira-job"
+        )
+        self._lock = threading.Lock()
+        self._futures: Dict[Hashable, Future] = {}
+        # Keys of the jobs that have not started, in submission order
+        self._waiting: Dict[Hashable, None] = {}
+
+    def submit(self, key: Hashable, function: Callable, *args, **kwargs) -> Future:
+        """Queues a job, or returns the future of the job in flight with the same key.
+
+        Parameters
+        ----------
+        key : Hashable
+            Identifies the job, e.g. the hash of its inputs and parameters
+        function : Callable
+            Function run by the job with `args` and `kwargs`
+
+        Returns
+        -------
+        Future
+            Future of the job result
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None:
+                return future
+            self._waiting[key] = None
+            future = self._executor.submit(self._run, key, function, args, kwargs)
+            self._futures[key] = future
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future
+
+    def _run(self, key: Hashable, function: Callable, args: tuple, kwargs: dict):
+        """Runs a job in a worker thread."""
+        with self._lock:
+            self._waiting.pop(key, None)
+        return function(*args, **kwargs)
+
+    def _forget(self, key: Hashable, future: Future) -> None:
+        """Removes a finished or cancelled job."""
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+                self._waiting.pop(key, None)
+
+    def position(self, key: Hashable) -> Optional[int]:
+        """Position of a job in the queue: 1 for the next job to start, 0 once it is
+        running and None if there is no such job in flight."""
+        with self._lock:
+            if key in self._waiting:
+                return list(self._waiting).index(key) + 1
+            return 0 if key in self._futures else None
+
+    @property
+    def waiting(self) -> int:
+        """Number of jobs waiting to start."""
+        return len(self._waiting)
+
+    @property
+    def running(self) -> int:
+        """Number of jobs running."""
+        with self._lock:
+            return len(self._futures) - len(self._waiting)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Cancels the waiting jobs and stops the worker threads once the running
+        jobs finish."""
+        with self._lock:
+            waiting = [self._futures[key] for key in self._waiting]
+        for future in waiting:
+            future.cancel()
+        self._executor.shutdown(wait=wait)
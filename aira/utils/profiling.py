@@ -0,0 +1,250 @@
+"""Per-stage timing and memory instrumentation of the analysis pipeline."""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Union
+
+
+class _MemoryTracing:
+    """Shared use of tracemalloc, which traces the whole process: tracing is stopped
+    when the last profiler that needed it is closed, and the peak is only reset when
+    no other stage is being measured."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._users = 0
+        self._started = False
+        self._running_stages = 0
+
+    def acquire(self) -> None:
+        """Starts memory tracing, unless it is already running."""
+        with self._lock:
+            if self._users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started = True
+            self._users += 1
+
+    def release(self) -> None:
+        """Stops memory tracing when its last user releases it, if a profiler
+        started it."""
+        with self._lock:
+            self._users -= 1
+            if self._users == 0 and self._started:
+                tracemalloc.stop()
+                self._started = False
+
+    def enter_stage(self) -> int:
+        """Registers a measured stage and returns the memory allocated at its start.
+        The peak is reset only if no other stage is running, not to lose its peak."""
+        with self._lock:
+            self._running_stages += 1
+            if self._running_stages == 1 and hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()  # Python >= 3.9
+            return tracemalloc.get_traced_memory()[0]
+
+    def exit_stage(self) -> int:
+        """Unregisters a measured stage and returns the peak memory allocated."""
+        with self._lock:
+            self._running_stages -= 1
+            return tracemalloc.get_traced_memory()[1]
+
+
+_MEMORY_TRACING = _MemoryTracing()
+
+
+@dataclass
+class StageRecord:
+    """Measurements of a single pipeline stage.
+
+    Attributes
+    ----------
+    name : str
+        Stage name
+    start : float
+        Start time in seconds, relative to the creation of the profiler
+    wall_time : float
+        Elapsed wall time in seconds
+    cpu_time : float
+        CPU time of the calling thread in seconds
+    peak_bytes : int
+        Peak memory allocated during the stage, above the allocation at its start.
+        0 when memory is not traced
+    thread_id : int
+        Identifier of the thread that ran the stage
+    """
+
+    name: str
+    start: float
+    wall_time: float
+    cpu_time: float
+    peak_bytes: int
+    thread_id: int
+
+
+class StageProfiler:
+    """Records wall time, CPU time and peak allocated memory (via tracemalloc) of
+    each stage run inside `stage()`. Memory tracing is started on the first stage
+    if it is not already running, and stopped once `close()` was called on every
+    profiler that needed it.
+
+    tracemalloc measures the whole process: while several analyses are profiled at
+    once, the peak of a stage also counts the allocations of the others, and may
+    include a peak reached before the stage started. Peak memory is only exact for
+    a single analysis at a time. Wall and CPU times are always per stage."""
+
+    def __init__(self, trace_memory: bool = True) -> None:
+        self.trace_memory = trace_memory
+        self.records: List[StageRecord] = []
+        self._origin = time.perf_counter()
+        self._tracing = False
+
+    @contextmanager
+    def stage(self, name: str):
+        """Context manager that measures the code run inside it as stage `name`."""
+        if self.trace_memory and not self._tracing:
+            _MEMORY_TRACING.acquire()
+            self._tracing = True
+        if self.trace_memory:
+            allocated_at_start = _MEMORY_TRACING.enter_stage()
+
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall_time = time.perf_counter() - start_wall
+            cpu_time = time.thread_time() - start_cpu
+            peak_bytes = 0
+            if self.trace_memory:
+                peak_bytes = max(_MEMORY_TRACING.exit_stage() - allocated_at_start, 0)
+            self.records.append(
+                StageRecord(
+                    name,
+                    start_wall - self._origin,
+                    wall_time,
+                    cpu_time,
+                    peak_bytes,
+                    threading.get_ident(),
+                )
+            )
+
+    def checkpoint(self) -> None:
+        """Does nothing, analyses run by this profiler can not be cancelled."""
+
+    def close(self) -> None:
+        """Releases memory tracing, which stops when no other profiler uses it and
+        it was started by a profiler. Stages run afterwards trace it again."""
+        if self._tracing:
+            self._tracing = False
+            _MEMORY_TRACING.release()
+
+    def summary(self) -> Dict[str, dict]:
+        """Measurements of every stage, accumulated by stage name.
+
+        Returns
+        -------
+        Dict[str, dict]
+            Wall time and CPU time in seconds and the largest peak bytes of each stage
+        """
+        summary = {}
+        for record in self.records:
+            stage = summary.setdefault(
+                record.name, {"wall_time": 0.0, "cpu_time": 0.0, "peak_bytes": 0}
+            )
+            stage["wall_time"] += record.wall_time
+            stage["cpu_time"] += record.cpu_time
+            stage["peak_bytes"] = max(stage["peak_bytes"], record.peak_bytes)
+        return summary
+
+    def to_chrome_trace(self) -> dict:
+        """Converts the records to the Chrome trace event format, which can be
+        opened in chrome://tracing or https://ui.perfetto.dev."""
+        events = [
+            {
+                "name": record.name,
+                "cat": "aira",
+                "ph": "X",
+                "ts": record.start * 1e6,
+                "dur": record.wall_time * 1e6,
+                "pid": os.getpid(),
+                "tid": record.thread_id,
+                "args": {
+                    key: value
+                    for key, value in asdict(record).items()
+                    if key in ("cpu_time", "peak_bytes")
+                },
+            }
+            for record in self.records
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: Union[str, Path]) -> None:
+        """Writes the records as a Chrome trace JSON file."""
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(self.to_chrome_trace(), trace_file)
+
+
+class NullProfiler:
+    """Profiler that records nothing, used when instrumentation is disabled."""
+
+    _null_stage = nullcontext()
+
+    def stage(self, name: str):  # pylint: disable=unused-argument
+        """Returns a context manager that does nothing."""
+        return self._null_stage
+
+    def checkpoint(self) -> None:
+        """Does nothing."""
+
+    def close(self) -> None:
+        """Does nothing."""
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class AnalysisCancelled(Exception):
+    """Raised at the start of a stage, or at a checkpoint inside a long stage, of an
+    analysis that was cancelled."""
+
+
+class CancellableProfiler:
+    """Wraps a profiler and stops the analysis at the next stage or checkpoint once
+    `cancel()` is called, possibly from another thread."""
+
+    def __init__(self, profiler=NULL_PROFILER) -> None:
+        self.profiler = profiler
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        """Requests the analysis to stop before its next stage."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether `cancel()` was called."""
+        return self._cancelled.is_set()
+
+    def checkpoint(self) -> None:
+        """Raises AnalysisCancelled if `cancel()` was called. Long stages call it
+        between steps, so that they can be stopped before they end."""
+        if self._cancelled.is_set():
+            raise AnalysisCancelled("Analysis cancelled")
+
+    @contextmanager
+    def stage(self, name: str):
+        """Runs stage `name` in the wrapped profiler, unless cancelled."""
+        if self._cancelled.is_set():
+            raise AnalysisCancelled(f"Analysis cancelled before stage {name}")
+        with self.profiler.stage(name):
+            yield
+
+    def close(self) -> None:
+        """Closes the wrapped profiler."""
+        self.profiler.close()
@@ -0,0 +1,168 @@
+"""NumPy arrays exchanged between processes through shared memory blocks."""
+
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class SharedArrayHandle:
+    """Picklable description of an array stored in a shared memory block.
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block
+    shape : Tuple[int, ...]
+        Shape of the array
+    dtype : str
+        Data type of the array
+    offset : int
+        Position of the array in the block, in bytes
+    """
+
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+    offset: int = 0
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    """Opens an existing block without registering it in the resource tracker of
+    the calling process, which would unlink it when that process exits. Meant for
+    blocks owned by another process."""
+    try:
+        # pylint: disable-next=unexpected-keyword-arg
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no `track` argument
+        block = shared_memory.SharedMemory(name=name)
+        # Attaching registers the block. Processes started by multiprocessing share
+        # the resource tracker of their parent, where the owner already registered
+        # it, so only a tracker of their own needs it unregistered
+        if multiprocessing.parent_process() is None:
+            # pylint: disable=protected-access
+            resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+def _create_untracked_block(size: int) -> shared_memory.SharedMemory:
+    """Creates a block whose ownership is handed over to another process, so it is
+    not registered in the resource tracker of the creating process."""
+    try:
+        # pylint: disable-next=unexpected-keyword-arg
+        return shared_memory.SharedMemory(create=True, size=size, track=False)
+    except TypeError:  # Python < 3.13 has no `track` argument
+        block = shared_memory.SharedMemory(create=True, size=size)
+        # pylint: disable=protected-access
+        resource_tracker.unregister(block._name, "shared_memory")
+        return block
+
+
+class SharedArray:
+    """NumPy array backed by a shared memory block. The process that creates it
+    owns the block and must `unlink()` it; other processes `attach()` to it through
+    its `handle` and read it without copying."""
+
+    def __init__(
+        self, block: shared_memory.SharedMemory, handle: SharedArrayHandle
+    ) -> None:
+        self._block = block
+        self.handle = handle
+        self.array = np.ndarray(
+            handle.shape, dtype=handle.dtype, buffer=block.buf, offset=handle.offset
+        )
+
+    @classmethod
+    def create(cls, array: np.ndarray) -> "SharedArray":
+        """Copies an array into a new shared memory block.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            Array to be shared
+
+        Returns
+        -------
+        SharedArray
+            Owner of the new block
+        """
+        array = np.ascontiguousarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        shared = cls(block, SharedArrayHandle(block.name, array.shape, array.dtype.str))
+        shared.array[...] = array
+        return shared
+
+    @classmethod
+    def attach(cls, handle: SharedArrayHandle) -> "SharedArray":
+        """Maps an array shared by another process."""
+        return cls(_open_block(handle.name), handle)
+
+    def close(self) -> None:
+        """Unmaps the block from this process. The array must not be used after."""
+        self.array = None
+        self._block.close()
+
+    def unlink(self) -> None:
+        """Closes and destroys the block. Only the owner should call it."""
+        self.close()
+        self._block.unlink()
+
+
+_attached: Dict[str, SharedArray] = {}
+
+
+def attach_cached(handle: SharedArrayHandle) -> np.ndarray:
+    """Maps a shared array once per process and returns the same read-only view on
+    every later call. Meant for assets read by many tasks of a worker process."""
+    if handle.name not in _attached:
+        _attached[handle.name] = SharedArray.attach(handle)
+        _attached[handle.name].array.flags.writeable = False
+    return _attached[handle.name].array
+
+
+def share_arrays(arrays: Dict[str, np.ndarray]) -> Dict[str, SharedArrayHandle]:
+    """Copies several arrays into a single new shared memory block, to be received
+    once by another process with `receive_arrays`.
+
+    Parameters
+    ----------
+    arrays : Dict[str, np.ndarray]
+        Arrays to be sent
+
+    Returns
+    -------
+    Dict[str, SharedArrayHandle]
+        Handle of each array in the block
+    """
+    arrays = {key: np.ascontiguousarray(value) for key, value in arrays.items()}
+    offsets, size = {}, 0
+    for key, array in arrays.items():
+        offsets[key] = size
+        size += -(-array.nbytes // 8) * 8  # Keep every array 8 bytes aligned
+
+    block = _create_untracked_block(max(size, 1))
+    handles = {}
+    for key, array in arrays.items():
+        handles[key] = SharedArrayHandle(
+            block.name, array.shape, array.dtype.str, offsets[key]
+        )
+        SharedArray(block, handles[key]).array[...] = array
+    block.close()
+    return handles
+
+
+def receive_arrays(handles: Dict[str, SharedArrayHandle]) -> Dict[str, np.ndarray]:
+    """Copies out the arrays sent with `share_arrays` and destroys their block."""
+    if not handles:
+        return {}
+    # The receiver takes ownership of the block
+    block = shared_memory.SharedMemory(name=next(iter(handles.values())).name)
+    arrays = {
+        key: SharedArray(block, handle).array.copy() for key, handle in handles.items()
+    }
+    block.close()
+    block.unlink()
+    return arrays
@@ -0,0 +1,204 @@
+"""Synthetic Ambisonics impulse responses with known reflections."""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import fftconvolve
+
+from aira.utils.formatter import convert_ambisonics_a_to_b, spherical_to_cartesian
+
+# Unit vectors of the FLU, FRD, BRU and BLD capsules, consistent with the channel
+# sums of convert_ambisonics_a_to_b
+CAPSULE_DIRECTIONS = np.array(
+    [[1, 1, 1], [1, -1, -1], [-1, -1, 1], [-1, 1, -1]]
+) / np.sqrt(3)
+PULSE_HALF_WIDTH = 16
+SWEEP_START_FREQUENCY = 20.0
+
+
+@dataclass
+class SyntheticReflection:
+    """Ground truth of a single arrival in a synthetic impulse response.
+
+    Attributes
+    ----------
+    time : float
+        Arrival time in seconds from the start of the impulse response
+    azimuth : float
+        Direction of arrival in degrees, with the convention of spherical_to_cartesian
+    elevation : float
+        Direction of arrival in degrees, with the convention of spherical_to_cartesian
+    level : float
+        Level in dB, where 0 dB is a unit amplitude arrival
+    """
+
+    time: float
+    azimuth: float
+    elevation: float
+    level: float = 0.0
+
+
+def synthesize_aformat(
+    reflections: List[SyntheticReflection],
+    sample_rate: int,
+    duration: float,
+    diffuse_level: Optional[float] = None,
+    reverberation_time: float = 1.0,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """Synthesizes the impulse responses of an ideal tetrahedral array of cardioid
+    capsules. Every arrival is a band limited (windowed sinc) pulse placed at its
+    exact, possibly fractional, arrival time.
+
+    Parameters
+    ----------
+    reflections : List[SyntheticReflection]
+        Arrivals to be synthesized
+    sample_rate : int
+        Sample rate in Hz
+    duration : float
+        Length of the impulse responses in seconds
+    diffuse_level : float, optional
+        Level in dB of an exponentially decaying diffuse tail, uncorrelated between
+        capsules, by default None (no tail)
+    reverberation_time : float, optional
+        Decay time (-60 dB) of the diffuse tail in seconds, by default 1.0
+    seed : int, optional
+        Seed of the diffuse tail noise, by default None
+
+    Returns
+    -------
+    np.ndarray
+        A-format impulse responses (FLU, FRD, BRU, BLD). Shape: (4, N)
+    """
+    length = int(round(duration * sample_rate))
+    aformat = np.zeros((4, length))
+    offsets = np.arange(-PULSE_HALF_WIDTH, PULSE_HALF_WIDTH + 1)
+    window = np.hanning(offsets.size + 2)[1:-1]
+
+    for reflection in reflections:
+        direction = np.array(
+            spherical_to_cartesian(1.0, reflection.azimuth, reflection.elevation)
+        )
+        capsule_gains = 0.5 * (1 + CAPSULE_DIRECTIONS @ direction)
+
+        arrival = reflection.time * sample_rate
+        positions = int(np.floor(arrival)) + offsets
+        valid = (positions >= 0) & (positions < length)
+        pulse = np.sinc(positions - arrival) * window * 10 ** (reflection.level / 20)
+        aformat[:, positions[valid]] += np.outer(capsule_gains, pulse[valid])
+
+    if diffuse_level is not None:
+        rng = np.random.default_rng(seed)
+        decay = np.exp(-6.9 * np.arange(length) / (reverberation_time * sample_rate))
+        aformat += 10 ** (diffuse_level / 20) * decay * rng.standard_normal((4, length))
+
+    return aformat
+
+
+def synthesize_bformat(
+    reflections: List[SyntheticReflection],
+    sample_rate: int,
+    duration: float,
+    **kwargs,
+) -> np.ndarray:
+    """Synthesizes B-format impulse responses. See synthesize_aformat for the
+    parameters.
+
+    Returns
+    -------
+    np.ndarray
+        B-format impulse responses (W, X, Y, Z). Shape: (4, N)
+    """
+    aformat = synthesize_aformat(reflections, sample_rate, duration, **kwargs)
+    return convert_ambisonics_a_to_b(*aformat)
+
+
+def exponential_sweep(
+    sample_rate: int,
+    duration: float,
+    start_frequency: float = SWEEP_START_FREQUENCY,
+    end_frequency: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Generates a logarithmic sine sweep and its inverse filter, normalized so
+    that their convolution is a unit impulse delayed by len(sweep) - 1 samples.
+
+    Parameters
+    ----------
+    sample_rate : int
+        Sample rate in Hz
+    duration : float
+        Length of the sweep in seconds
+    start_frequency : float, optional
+        Starting frequency in Hz, by default SWEEP_START_FREQUENCY
+    end_frequency : float, optional
+        Ending frequency in Hz, by default the Nyquist frequency
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Sweep and inverse filter
+    """
+    end_frequency = end_frequency or sample_rate / 2
+    time = np.arange(int(round(duration * sample_rate))) / sample_rate
+    sweep_rate = np.log(end_frequency / start_frequency)
+    sweep = np.sin(
+        2
+        * np.pi
+        * start_frequency
+        * duration
+        / sweep_rate
+        * (np.exp(time * sweep_rate / duration) - 1)
+    )
+    inverse_filter = sweep[::-1] * np.exp(-time * sweep_rate / duration)
+    inverse_filter /= np.abs(fftconvolve(sweep, inverse_filter)).max()
+    return sweep, inverse_filter
+
+
+def synthesize_lss(
+    reflections: List[SyntheticReflection],
+    sample_rate: int,
+    duration: float,
+    sweep_duration: float = 1.0,
+    **kwargs,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Synthesizes Long Sine Sweep (LSS) captures of the four A-format capsules and
+    the matching inverse filter, as expected by the LSS input mode. See
+    synthesize_aformat for the remaining parameters.
+
+    Parameters
+    ----------
+    sweep_duration : float, optional
+        Length of the excitation sweep in seconds, by default 1.0
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Captured sweeps (FLU, FRD, BRU, BLD) and inverse filter. Shape of the
+        captures: (4, N)
+    """
+    sweep, inverse_filter = exponential_sweep(sample_rate, sweep_duration)
+    aformat = synthesize_aformat(reflections, sample_rate, duration, **kwargs)
+    captures = fftconvolve(aformat, sweep[np.newaxis, :], axes=1)
+    return captures, inverse_filter
+
+
+def reflection_times_from_direct(
+    reflections: List[SyntheticReflection],
+) -> np.ndarray:
+    """Arrival times of the reflections relative to the direct sound (the earliest
+    arrival), which is how the analysis reports them.
+
+    Parameters
+    ----------
+    reflections : List[SyntheticReflection]
+        Ground truth arrivals
+
+    Returns
+    -------
+    np.ndarray
+        Sorted arrival times in seconds, without the direct sound
+    """
+    times = np.sort([reflection.time for reflection in reflections])
+    return times[1:] - times[0]
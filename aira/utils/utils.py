@@ -1,5 +1,6 @@
 """Audio utilities"""
 
+import io
 from functools import singledispatch
 from pathlib import Path
 from traceback import print_exc
@@ -10,29 +11,52 @@ import soundfile as sf
 
 
 def read_signals_dict(signals_dict: dict) -> dict:
-    """Read the signals contained in signals_dict and overwrites the paths with the arrays.
+    """Read the signals contained in signals_dict and replaces the paths with the arrays.
 
     Parameters
     ----------
     signals_dict : dict
-        Dictionary with signals path.
+        Dictionary with the signals as paths, encoded audio files in memory (bytes
+        or binary file objects such as io.BytesIO) or arrays with one channel per
+        row. Arrays are kept as they are and need a "sample_rate" key, unless a file
+        is read too. It is not modified.
 
     Returns
     -------
     dict
-        Same signals_dict dictionary with the signals array overwritting signals path.
+        Copy of signals_dict with the signals array replacing signals path.
     """
+    signals_dict = dict(signals_dict)
+    sample_rate = signals_dict.get("sample_rate")
     for key_i, path_i in signals_dict.items():
+        if isinstance(path_i, (bytes, bytearray, memoryview)):
+            path_i = io.BytesIO(path_i)
+        # Integers and booleans would be taken by soundfile as file descriptors
+        elif not isinstance(path_i, (str, Path)) and not hasattr(path_i, "read"):
+            continue
+        # File objects are left at their position, so that the same input
+        # dictionary can be read again
+        seekable = hasattr(path_i, "seekable") and path_i.seekable()
+        position = path_i.tell() if seekable else None
         try:
             signal_i, sample_rate = sf.read(path_i)
-            signals_dict[key_i] = signal_i.T
-        except:
-            pass
-
+        except sf.SoundFileError:
+            continue  # Strings that are not audio files, such as the input mode
+        finally:
+            if seekable:
+                path_i.seek(position)
+        signals_dict[key_i] = signal_i.T
+
+    if sample_rate is None:
+        raise ValueError("sample_rate is required when no audio file is given")
     signals_dict["sample_rate"] = sample_rate
 
     if signals_dict["channels_per_file"] == 1:
-        if signals_dict["input_mode"] == "bformat":
+        # input_mode may be an InputMode or its value
+        input_mode = getattr(
+            signals_dict["input_mode"], "value", signals_dict["input_mode"]
+        )
+        if input_mode == "bformat":
             bformat_keys = ["w_channel", "x_channel", "y_channel", "z_channel"]
             signals_dict["stacked_signals"] = stack_dict_arrays(
                 signals_dict, bformat_keys
@@ -71,7 +95,7 @@ def stack_dict_arrays(signals_dict_array: dict, keys: List[str]) -> np.ndarray:
     for key_i in keys:
         audio_array.append(signals_dict_array[key_i])
 
-    return audio_array
+    return np.array(audio_array)
 
 
 @singledispatch
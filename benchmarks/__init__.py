@@ -0,0 +1,2 @@
+"""Benchmarks for AIRA module. Run them from the repository root, e.g.
+`python -m benchmarks.pipeline`."""
@@ -0,0 +1,142 @@
+"""Timing, memory profiling and history helpers shared by the benchmarks."""
+
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+HISTORY_PATH = Path(__file__).parent / "history.jsonl"
+DEFAULT_REPEAT = 5
+
+
+def measure(
+    function: Callable,
+    setup: Optional[Callable] = None,
+    repeat: int = DEFAULT_REPEAT,
+) -> Dict[str, float]:
+    """Times a function and measures its peak allocated memory.
+
+    Parameters
+    ----------
+    function : Callable
+        Function to be measured. It receives the output of `setup`, if given
+    setup : Callable, optional
+        Called before each run, outside of the measurements, by default None
+    repeat : int, optional
+        Number of timed runs, by default DEFAULT_REPEAT
+
+    Returns
+    -------
+    Dict[str, float]
+        Median and minimum wall time in seconds and peak allocated bytes
+    """
+
+    def run_once():
+        arguments = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        function(*arguments)
+        return time.perf_counter() - start
+
+    # Memory is traced in a separate run so that tracemalloc does not skew timings
+    arguments = () if setup is None else (setup(),)
+    tracemalloc.start()
+    function(*arguments)
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wall_times = [run_once() for _ in range(repeat)]
+    return {
+        "wall_median": statistics.median(wall_times),
+        "wall_min": min(wall_times),
+        "peak_bytes": peak_bytes,
+    }
+
+
+def git_commit() -> str:
+    """Short hash of the checked out commit, with a `+dirty` suffix when the working
+    tree has changes. Returns "unknown" outside of a git repository."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        is_dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("+dirty" if is_dirty else "")
+
+
+def run_metadata() -> Dict[str, str]:
+    """Commit, date and environment shared by all the records of a run."""
+    return {
+        "commit": git_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def append_history(records: List[dict], history_path: Path = HISTORY_PATH) -> None:
+    """Appends benchmark records as JSON lines to the history file."""
+    with open(history_path, "a", encoding="utf-8") as history_file:
+        for record in records:
+            history_file.write(json.dumps(record) + "\n")
+
+
+def load_history(history_path: Path = HISTORY_PATH) -> List[dict]:
+    """Loads every benchmark record of the history file."""
+    if not history_path.exists():
+        return []
+    with open(history_path, "r", encoding="utf-8") as history_file:
+        return [json.loads(line) for line in history_file if line.strip()]
+
+
+def compare_runs(records: List[dict], baseline_commit: str) -> List[str]:
+    """Compares the records of a run against the latest records of the same
+    benchmark measured at `baseline_commit`.
+
+    Returns
+    -------
+    List[str]
+        One formatted line per benchmark found in both runs
+    """
+    baseline = {}
+    for record in load_history():
+        if record["commit"].startswith(baseline_commit):
+            baseline[record["benchmark"]] = record
+
+    lines = []
+    for record in records:
+        previous = baseline.get(record["benchmark"])
+        if previous is None:
+            continue
+        time_ratio = record["wall_median"] / previous["wall_median"]
+        memory_ratio = record["peak_bytes"] / max(previous["peak_bytes"], 1)
+        lines.append(
+            f"{record['benchmark']:<60} time x{time_ratio:5.2f}  "
+            f"memory x{memory_ratio:5.2f}"
+        )
+    return lines
+
+
+def format_record(record: dict) -> str:
+    """Formats a benchmark record as a single line."""
+    return (
+        f"{record['benchmark']:<60} {record['wall_median'] * 1000:10.2f} ms  "
+        f"{record['peak_bytes'] / 2**20:9.2f} MiB"
+    )
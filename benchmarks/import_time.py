@@ -0,0 +1,106 @@
+"""Import time of the AIRA modules, measured in fresh interpreters.
+
+Each module is imported in a new Python process, so that nothing is cached in
+`sys.modules`. Heavy dependencies loaded by the import are reported, to catch
+eager imports of plotting or SciPy code paths:
+
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --compare <commit>
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.common import (
+    append_history,
+    compare_runs,
+    format_record,
+    run_metadata,
+)
+
+ROOT = Path(__file__).parents[1]
+MODULES = ("aira.core", "aira.batch", "aira.utils", "aira.engine.plot")
+HEAVY_MODULES = ("plotly", "scipy.signal", "scipy.stats", "pandas", "matplotlib")
+CHILD_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+elapsed = time.perf_counter() - start
+try:
+    import resource
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    max_rss *= 1 if sys.platform == "darwin" else 1024
+except ImportError:  # Windows
+    max_rss = 0
+heavy = [name for name in sys.argv[2:] if name in sys.modules]
+print(json.dumps({"elapsed": elapsed, "max_rss": max_rss, "heavy": heavy}))
+"""
+
+
+def import_once(module: str) -> dict:
+    """Imports a module in a new interpreter and returns its measurements."""
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, module, *HEAVY_MODULES],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=ROOT,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def measure_import(module: str, repeat: int) -> Dict[str, object]:
+    """Measures the import time of a module over `repeat` fresh interpreters.
+
+    Returns
+    -------
+    Dict[str, object]
+        Median and minimum import time in seconds, peak resident memory of the
+        interpreter in bytes and heavy dependencies loaded by the import
+    """
+    import_once(module)  # Warms up the file system cache and bytecode
+    runs = [import_once(module) for _ in range(repeat)]
+    wall_times = [run["elapsed"] for run in runs]
+    return {
+        "wall_median": statistics.median(wall_times),
+        "wall_min": min(wall_times),
+        "peak_bytes": max(run["max_rss"] for run in runs),
+        "heavy_modules": runs[-1]["heavy"],
+    }
+
+
+def main():
+    """Runs the import time benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Imports per module")
+    parser.add_argument("--compare", help="Commit to compare the results against")
+    parser.add_argument(
+        "--no-history", action="store_true", help="Do not append to the history"
+    )
+    args = parser.parse_args()
+
+    metadata = run_metadata()
+    records: List[dict] = []
+    for module in MODULES:
+        record = {
+            "benchmark": f"import/{module}",
+            **measure_import(module, args.repeat),
+        }
+        heavy_modules = ", ".join(record["heavy_modules"]) or "-"
+        print(f"{format_record(record)}  loads: {heavy_modules}")
+        records.append({**metadata, **record})
+
+    if args.compare:
+        print(f"\nCompared to {args.compare}:")
+        print("\n".join(compare_runs(records, args.compare)))
+    if not args.no_history:
+        append_history(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""Timing and memory benchmarks of every stage of the analysis pipeline.
+
+Each stage is measured on the bundled measurements and on synthetic LSS captures
+of growing length and sample rate. Results are appended to benchmarks/history.jsonl
+so that runs can be compared across commits:
+
+    python -m benchmarks.pipeline --quick
+    python -m benchmarks.pipeline --compare <commit>
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+import soundfile as sf
+
+from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.engine.input import BFormatProcessor, InputMode, LSSInputProcessor
+from aira.engine.intensity import (
+    analysis_crop_2d,
+    convert_bformat_to_intensity,
+    integrate_intensity_directions,
+)
+from aira.engine.plot import hedgehog, setup_plotly_layout, w_channel
+from aira.engine.pressure import w_channel_preprocess
+from aira.engine.reflections import detect_reflections
+from aira.utils import (
+    cartesian_to_spherical,
+    convert_ambisonics_a_to_b,
+    read_signals_dict,
+)
+from aira.utils.synthesis import SyntheticReflection, synthesize_lss
+from benchmarks.common import (
+    append_history,
+    compare_runs,
+    format_record,
+    measure,
+    run_metadata,
+)
+
+MOCK_DATA = Path(__file__).parents[1] / "test" / "mock_data"
+INTEGRATION_TIME = 0.01
+INTENSITY_THRESHOLD = -60
+SAMPLE_RATES = (48000, 96000, 192000)
+DURATIONS = (1.0, 2.0, 4.0)
+QUICK_SAMPLE_RATES = (48000,)
+QUICK_DURATIONS = (1.0,)
+REFLECTIONS_COUNT = 40
+CAPSULE_KEYS = ("front_left_up", "front_right_down", "back_right_up", "back_left_down")
+
+
+def bundled_cases() -> Dict[str, dict]:
+    """Input dictionaries of the measurements shipped in test/mock_data."""
+    cases = {}
+    york_path = MOCK_DATA / "york_auditorium" / "s2r2.wav"
+    if york_path.exists():
+        cases["york_auditorium"] = {
+            "stacked_signals": str(york_path),
+            "input_mode": InputMode.BFORMAT,
+            "channels_per_file": 4,
+            "frequency_correction": False,
+        }
+    regio_directory = MOCK_DATA / "regio_theater"
+    if regio_directory.exists():
+        cases["regio_theater"] = {
+            "front_left_up": str(regio_directory / "soundfield_flu.wav"),
+            "front_right_down": str(regio_directory / "soundfield_frd.wav"),
+            "back_right_up": str(regio_directory / "soundfield_bru.wav"),
+            "back_left_down": str(regio_directory / "soundfield_bld.wav"),
+            "inverse_filter": str(regio_directory / "soundfield_inverse_filter.wav"),
+            "input_mode": InputMode.LSS,
+            "channels_per_file": 1,
+            "frequency_correction": True,
+        }
+    return cases
+
+
+def synthetic_reflections(seed: int = 0) -> List[SyntheticReflection]:
+    """Direct sound followed by reflections decaying in level over 300 ms."""
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0.015, 0.3, REFLECTIONS_COUNT))
+    reflections = [SyntheticReflection(0.01, 0, 0, 0)]
+    for time_i in times:
+        reflections.append(
+            SyntheticReflection(
+                time=time_i,
+                azimuth=rng.uniform(-180, 180),
+                elevation=rng.uniform(-60, 60),
+                level=-3 - 60 * time_i,
+            )
+        )
+    return reflections
+
+
+def write_synthetic_case(directory: Path, sample_rate: int, duration: float) -> dict:
+    """Writes synthetic LSS captures and inverse filter as WAV files.
+
+    Returns
+    -------
+    dict
+        Input dictionary pointing to the written files
+    """
+    captures, inverse_filter = synthesize_lss(
+        synthetic_reflections(),
+        sample_rate,
+        duration,
+        sweep_duration=duration,
+        diffuse_level=-50,
+        seed=0,
+    )
+    input_dict = {
+        "input_mode": InputMode.LSS,
+        "channels_per_file": 1,
+        "frequency_correction": True,
+    }
+    for key_i, capture_i in zip(CAPSULE_KEYS, captures):
+        path_i = directory / f"{key_i}_{sample_rate}_{duration}.wav"
+        sf.write(path_i, capture_i / np.abs(captures).max(), sample_rate, "FLOAT")
+        input_dict[key_i] = str(path_i)
+    path_i = directory / f"inverse_filter_{sample_rate}_{duration}.wav"
+    sf.write(path_i, inverse_filter, sample_rate, "FLOAT")
+    input_dict["inverse_filter"] = str(path_i)
+    return input_dict
+
+
+def stage_benchmarks(input_dict: dict, analysis_length: float) -> Dict[str, tuple]:
+    """Builds the (function, setup) pairs of every pipeline stage for one input.
+    Intermediate results of the previous stages are computed once, beforehand."""
+    signals_dict = read_signals_dict(dict(input_dict))
+    sample_rate = signals_dict["sample_rate"]
+    stacked_signals = np.array(signals_dict["stacked_signals"], dtype=float)
+
+    if signals_dict["input_mode"] == InputMode.LSS:
+        aformat = LSSInputProcessor().process(dict(signals_dict))["stacked_signals"]
+        bformat = convert_ambisonics_a_to_b(*aformat)
+    else:
+        bformat = stacked_signals
+
+    intensity_directions = convert_bformat_to_intensity(bformat)
+    intensity_cropped = analysis_crop_2d(
+        analysis_length, sample_rate, intensity_directions
+    )
+    intensity_windowed, time = integrate_intensity_directions(
+        intensity_cropped, INTEGRATION_TIME, sample_rate
+    )
+    intensity, azimuth, elevation = cartesian_to_spherical(intensity_windowed)
+    _, azimuth_peaks, elevation_peaks, reflections_idx = detect_reflections(
+        intensity, azimuth, elevation
+    )
+    reflex_to_direct = 10 * np.log10(
+        intensity[reflections_idx] / intensity[reflections_idx[0]]
+    )
+    w_channel_signal = w_channel_preprocess(
+        bformat[0], int(INTEGRATION_TIME * sample_rate), analysis_length, sample_rate
+    )
+
+    def plot():
+        fig = setup_plotly_layout()
+        time_peaks = time[reflections_idx].copy()
+        hedgehog(fig, time_peaks, reflex_to_direct, azimuth_peaks, elevation_peaks)
+        w_channel(
+            fig,
+            np.arange(0, analysis_length, 1 / sample_rate) * 1000,
+            w_channel_signal,
+            time_peaks,
+        )
+        return fig
+
+    def compute(fresh_input_dict):
+        return AmbisonicsImpulseResponseAnalyzer().compute(
+            fresh_input_dict, INTEGRATION_TIME, INTENSITY_THRESHOLD, analysis_length
+        )
+
+    def analyze(fresh_input_dict):
+        return AmbisonicsImpulseResponseAnalyzer().analyze(
+            fresh_input_dict, INTEGRATION_TIME, INTENSITY_THRESHOLD, analysis_length
+        )
+
+    benchmarks = {"read_signals_dict": (read_signals_dict, lambda: dict(input_dict))}
+    if signals_dict["input_mode"] == InputMode.LSS:
+        benchmarks["LSSInputProcessor"] = (
+            LSSInputProcessor().process,
+            lambda: {**signals_dict, "stacked_signals": stacked_signals.copy()},
+        )
+    benchmarks.update(
+        {
+            "BFormatProcessor": (
+                BFormatProcessor().process,
+                lambda: {
+                    "stacked_signals": bformat.copy(),
+                    "input_mode": InputMode.BFORMAT,
+                    "frequency_correction": True,
+                    "sample_rate": sample_rate,
+                },
+            ),
+            "convert_bformat_to_intensity": (
+                lambda: convert_bformat_to_intensity(bformat),
+                None,
+            ),
+            "integrate_intensity_directions": (
+                lambda: integrate_intensity_directions(
+                    intensity_cropped, INTEGRATION_TIME, sample_rate
+                ),
+                None,
+            ),
+            "detect_reflections": (
+                lambda: detect_reflections(*cartesian_to_spherical(intensity_windowed)),
+                None,
+            ),
+            "plot": (plot, None),
+            "compute": (compute, lambda: dict(input_dict)),
+            "analyze": (analyze, lambda: dict(input_dict)),
+        }
+    )
+    return benchmarks
+
+
+def run_case(
+    case_name: str,
+    input_dict: dict,
+    analysis_length: float,
+    repeat: int,
+    selected: Callable[[str], bool],
+) -> List[dict]:
+    """Measures every selected stage of a case and prints the results."""
+    records = []
+    for stage_name, (function, setup) in stage_benchmarks(
+        input_dict, analysis_length
+    ).items():
+        benchmark_name = f"{case_name}/{stage_name}"
+        if not selected(benchmark_name):
+            continue
+        record = {
+            "benchmark": benchmark_name,
+            "analysis_length": analysis_length,
+            **measure(function, setup, repeat),
+        }
+        print(format_record(record))
+        records.append(record)
+    return records
+
+
+def main():
+    """Runs the pipeline benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Smallest inputs only")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage")
+    parser.add_argument("--filter", default="", help="Run benchmarks matching this")
+    parser.add_argument("--compare", help="Commit to compare the results against")
+    parser.add_argument(
+        "--no-history", action="store_true", help="Do not append to the history"
+    )
+    args = parser.parse_args()
+
+    def selected(benchmark_name: str) -> bool:
+        return args.filter in benchmark_name
+
+    metadata = run_metadata()
+    records = []
+    for case_name, input_dict in bundled_cases().items():
+        records += run_case(case_name, input_dict, 0.5, args.repeat, selected)
+
+    sample_rates = QUICK_SAMPLE_RATES if args.quick else SAMPLE_RATES
+    durations = QUICK_DURATIONS if args.quick else DURATIONS
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for sample_rate in sample_rates:
+            for duration in durations:
+                input_dict = write_synthetic_case(Path(temp_dir), sample_rate, duration)
+                records += run_case(
+                    f"synthetic_lss_{sample_rate}hz_{duration:g}s",
+                    input_dict,
+                    duration / 2,
+                    args.repeat,
+                    selected,
+                )
+
+    records = [{**metadata, **record} for record in records]
+    if args.compare:
+        print(f"\nCompared to {args.compare}:")
+        print("\n".join(compare_runs(records, args.compare)))
+    if not args.no_history:
+        append_history(records)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""Scoreboard of the reflection detection strategies: runtime vs. accuracy.
+
+Every strategy of ReflectionDetectionStrategies is run on a labelled corpus of
+B-format impulse responses, either synthetic or read from a directory where each
+`<name>.wav` has a `<name>.json` sidecar with its ground truth reflections (a list
+of objects with `time`, `azimuth`, `elevation` and `level`). Impulse responses are
+spread across a process pool:
+
+    python -m benchmarks.strategies --synthetic 200 --workers 8
+    python -m benchmarks.strategies --corpus path/to/labelled_irs
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from aira.engine.intensity import (
+    analysis_crop_2d,
+    convert_bformat_to_intensity,
+    integrate_intensity_directions,
+    intensity_thresholding,
+)
+from aira.engine.reflections import (
+    ReflectionDetectionStrategies,
+    detect_reflections,
+    score_detected_reflections,
+)
+from aira.utils import cartesian_to_spherical
+from aira.utils.synthesis import (
+    SyntheticReflection,
+    reflection_times_from_direct,
+    synthesize_bformat,
+)
+
+SAMPLE_RATE = 48000
+DURATION = 0.5
+INTEGRATION_TIME = 0.005
+INTENSITY_THRESHOLD = -60
+ANALYSIS_LENGTH = 0.4
+DIFFUSE_LEVEL = -45
+
+
+def synthetic_item(seed: int) -> Tuple[np.ndarray, int, List[SyntheticReflection]]:
+    """Generates the labelled impulse response `seed` of the synthetic corpus."""
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0.015, 0.3, rng.integers(5, 30)))
+    reflections = [SyntheticReflection(0.01, rng.uniform(-180, 180), 0, 0)]
+    for time_i in times:
+        reflections.append(
+            SyntheticReflection(
+                time=time_i,
+                azimuth=rng.uniform(-180, 180),
+                elevation=rng.uniform(-60, 60),
+                level=-3 - 60 * time_i - rng.uniform(0, 6),
+            )
+        )
+    bformat = synthesize_bformat(
+        reflections, SAMPLE_RATE, DURATION, diffuse_level=DIFFUSE_LEVEL, seed=seed
+    )
+    return bformat, SAMPLE_RATE, reflections
+
+
+def corpus_item(wav_path: str) -> Tuple[np.ndarray, int, List[SyntheticReflection]]:
+    """Reads a labelled B-format impulse response and its JSON ground truth."""
+    bformat, sample_rate = sf.read(wav_path)
+    with open(Path(wav_path).with_suffix(".json"), "r", encoding="utf-8") as labels:
+        reflections = [SyntheticReflection(**item) for item in json.load(labels)]
+    return bformat.T, sample_rate, reflections
+
+
+def evaluate_item(item: str, settings: dict) -> Dict[str, Optional[tuple]]:
+    """Runs every strategy on one impulse response of the corpus.
+
+    Parameters
+    ----------
+    item : str
+        Seed of a synthetic impulse response (as a string) or path of a WAV file
+    settings : dict
+        Integration time, threshold, analysis length and tolerance of the run
+
+    Returns
+    -------
+    Dict[str, Optional[tuple]]
+        Per strategy name, (precision, recall, timing error, detection seconds), or
+        None when the strategy is not implemented
+    """
+    if item.isdigit():
+        bformat, sample_rate, reflections = synthetic_item(int(item))
+    else:
+        bformat, sample_rate, reflections = corpus_item(item)
+
+    intensity_directions = analysis_crop_2d(
+        settings["analysis_length"],
+        sample_rate,
+        convert_bformat_to_intensity(bformat),
+    )
+    intensity_windowed, time_windows = integrate_intensity_directions(
+        intensity_directions, settings["integration_time"], sample_rate
+    )
+    intensity, azimuth, elevation = cartesian_to_spherical(intensity_windowed)
+    expected_times = reflection_times_from_direct(reflections)
+
+    scores = {}
+    for strategy in ReflectionDetectionStrategies:
+        start = time.perf_counter()
+        try:
+            detections = detect_reflections(intensity, azimuth, elevation, strategy)
+        except NotImplementedError:
+            scores[strategy.name] = None
+            continue
+        *_, reflections_idx = intensity_thresholding(settings["threshold"], *detections)
+        elapsed = time.perf_counter() - start
+
+        # The first index is the direct sound
+        detected_times = time_windows[reflections_idx[1:]]
+        scores[strategy.name] = (
+            *score_detected_reflections(
+                detected_times, expected_times, settings["tolerance"]
+            ),
+            elapsed,
+        )
+    return scores
+
+
+def summarize(results: List[Dict[str, Optional[tuple]]]) -> Dict[str, dict]:
+    """Aggregates the per impulse response scores of every strategy."""
+    summary = {}
+    for strategy in ReflectionDetectionStrategies:
+        scores = [result[strategy.name] for result in results]
+        if any(score is None for score in scores):
+            summary[strategy.name] = None
+            continue
+        precision, recall, timing_error, elapsed = np.array(scores).T
+        summary[strategy.name] = {
+            "precision": float(np.mean(precision)),
+            "recall": float(np.mean(recall)),
+            "timing_error_ms": float(np.nanmean(timing_error) * 1000),
+            "irs_per_second": float(len(scores) / np.sum(elapsed)),
+        }
+    return summary
+
+
+def main():
+    """Runs the scoreboard from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="Directory of labelled B-format WAV files")
+    parser.add_argument(
+        "--synthetic", type=int, default=100, help="Synthetic corpus size"
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--integration-time", type=float, default=INTEGRATION_TIME)
+    parser.add_argument("--threshold", type=float, default=INTENSITY_THRESHOLD)
+    parser.add_argument("--analysis-length", type=float, default=ANALYSIS_LENGTH)
+    parser.add_argument(
+        "--tolerance", type=float, help="Match tolerance, by default integration time"
+    )
+    parser.add_argument("--output", help="Write the summary as JSON to this path")
+    args = parser.parse_args()
+
+    if args.corpus:
+        items = sorted(str(path) for path in Path(args.corpus).glob("*.wav"))
+    else:
+        items = [str(seed) for seed in range(args.synthetic)]
+    settings = {
+        "integration_time": args.integration_time,
+        "threshold": args.threshold,
+        "analysis_length": args.analysis_length,
+        "tolerance": args.tolerance or args.integration_time,
+    }
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        results = list(
+            executor.map(
+                evaluate_item,
+                items,
+                [settings] * len(items),
+                chunksize=max(1, len(items) // (4 * (args.workers or 1))),
+            )
+        )
+    wall_time = time.perf_counter() - start
+
+    summary = summarize(results)
+    print(f"{len(items)} impulse responses in {wall_time:.2f} s\n")
+    print(
+        f"{'strategy':<12} {'precision':>10} {'recall':>8} "
+        f"{'timing error':>14} {'IRs/s':>10}"
+    )
+    for name, scores in summary.items():
+        if scores is None:
+            print(f"{name:<12} {'not implemented':>46}")
+            continue
+        print(
+            f"{name:<12} {scores['precision']:>10.3f} {scores['recall']:>8.3f} "
+            f"{scores['timing_error_ms']:>11.3f} ms {scores['irs_per_second']:>10.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(
+                {"settings": settings, "items": len(items), "strategies": summary},
+                output_file,
+                indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Mocked measurements synthesized with known reflections."""
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from aira.engine.input import InputMode
+from aira.utils.synthesis import SyntheticReflection, synthesize_bformat
+
+SAMPLE_RATE = 48000
+
+
+@pytest.fixture
+def synthetic_reflections() -> list:
+    """Return the ground truth of a direct sound and two reflections."""
+    return [
+        SyntheticReflection(time=0.01, azimuth=0, elevation=0, level=0),
+        SyntheticReflection(time=0.03, azimuth=90, elevation=20, level=-6),
+        SyntheticReflection(time=0.05, azimuth=-150, elevation=-10, level=-10),
+    ]
+
+
+@pytest.fixture
+def bformat_input_dict(
+    synthetic_reflections: list, tmp_path  # pylint: disable=redefined-outer-name
+) -> dict:
+    """Return an input dictionary pointing to a synthetic 4 channel B-format file."""
+    bformat = synthesize_bformat(synthetic_reflections, SAMPLE_RATE, 0.5)
+    wav_path = tmp_path / "bformat.wav"
+    sf.write(wav_path, bformat.T / np.abs(bformat).max(), SAMPLE_RATE, "FLOAT")
+    return {
+        "stacked_signals": str(wav_path),
+        "input_mode": InputMode.BFORMAT,
+        "channels_per_file": 4,
+        "frequency_correction": False,
+    }
@@ -0,0 +1,193 @@
+"""Unit tests for the aira.aio module."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira.aio import AsyncAnalyzer
+from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.utils import StageProfiler
+
+
+def test_async_compute_matches_sync_compute(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing measurements from asyncio code
+    GIVEN several concurrent analyses of a synthetic B-format measurement
+    THEN each result matches the synchronous analysis and a figure is rendered.
+    """
+    expected = AmbisonicsImpulseResponseAnalyzer().compute(
+        bformat_input_dict, 0.002, -60, 0.3
+    )
+
+    async def main():
+        async with AsyncAnalyzer(max_concurrency=2) as analyzer:
+            results = await asyncio.gather(
+                *(analyzer.compute(bformat_input_dict, 0.002, -60, 0.3) for _ in "abc")
+            )
+            fig = await analyzer.analyze(bformat_input_dict, 0.002, -60, 0.3)
+        return results, fig
+
+    results, fig = asyncio.run(main())
+
+    for result in results:
+        np.testing.assert_array_equal(
+            result.reflection_times, expected.reflection_times
+        )
+        np.testing.assert_array_equal(result.w_channel, expected.w_channel)
+    assert len(fig.data) == 3
+
+
+def test_read_loads_only_measurement_paths(
+    bformat_input_dict: dict, tmp_path, monkeypatch
+):  # pylint: disable=redefined-outer-name
+    """WHEN reading measurements from asyncio code
+    GIVEN an extra string field that is also the name of a file in the current
+    directory
+    THEN only the measurement paths are read and the extra field is kept as is.
+    """
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "room").write_bytes(b"not audio")
+
+    async def main():
+        async with AsyncAnalyzer() as analyzer:
+            return await analyzer.read({**bformat_input_dict, "label": "room"})
+
+    signals_dict = asyncio.run(main())
+
+    assert signals_dict["label"] == "room"
+    assert signals_dict["stacked_signals"].shape[0] == 4
+
+
+def test_compute_many_bounds_running_analyses(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing many measurements with compute_many
+    GIVEN a concurrency limit of 2
+    THEN every input is analyzed and no more than 2 analyses run at once.
+    """
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    class CountingAnalyzer(AmbisonicsImpulseResponseAnalyzer):
+        """Analyzer that counts the analyses running at once."""
+
+        def compute(self, *args, **kwargs):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            try:
+                return super().compute(*args, **kwargs)
+            finally:
+                with lock:
+                    running[0] -= 1
+
+    async def main():
+        async with AsyncAnalyzer(CountingAnalyzer(), max_concurrency=2) as analyzer:
+            return [
+                index
+                async for index, _ in analyzer.compute_many(
+                    (bformat_input_dict for _ in range(6)), 0.002, -60, 0.3
+                )
+            ]
+
+    indexes = asyncio.run(main())
+
+    assert sorted(indexes) == list(range(6))
+    assert peak[0] <= 2
+
+
+def test_cancelled_analysis_stops_at_next_stage(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN cancelling the task of an analysis
+    GIVEN that the analysis is running one of its stages
+    THEN the task is cancelled and no further stage is run.
+    """
+    started, release = threading.Event(), threading.Event()
+
+    class BlockingProfiler(StageProfiler):
+        """Profiler that blocks the analysis in its intensity stage."""
+
+        def stage(self, name):
+            if name == "intensity":
+                started.set()
+                release.wait(10)
+            return super().stage(name)
+
+    profiler = BlockingProfiler(trace_memory=False)
+
+    async def main():
+        async with AsyncAnalyzer() as analyzer:
+            task = asyncio.ensure_future(
+                analyzer.compute(bformat_input_dict, 0.002, -60, 0.3, profiler)
+            )
+            await asyncio.get_running_loop().run_in_executor(None, started.wait, 10)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            finally:
+                # Released once the analysis was cancelled, not to race with it
+                release.set()
+        return False
+
+    assert asyncio.run(main())
+    stages = [record.name for record in profiler.records]
+    assert "intensity" in stages
+    assert "integration" not in stages
+
+
+def test_cancelled_analysis_keeps_its_slot_until_its_thread_finishes(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN cancelling an analysis whose thread can not stop right away
+    GIVEN a user executor with more threads than the concurrency limit of 1
+    THEN the next analysis only starts once the thread of the cancelled one
+    finished.
+    """
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    class BlockingAnalyzer(AmbisonicsImpulseResponseAnalyzer):
+        """Analyzer whose first analysis blocks until released."""
+
+        def compute(self, *args, **kwargs):
+            calls.append(None)
+            if len(calls) == 1:
+                started.set()
+                release.wait(10)
+            return super().compute(*args, **kwargs)
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            analyzer = AsyncAnalyzer(
+                BlockingAnalyzer(), max_concurrency=1, compute_executor=executor
+            )
+            first = asyncio.ensure_future(
+                analyzer.compute(bformat_input_dict, 0.002, -60, 0.3)
+            )
+            await loop.run_in_executor(None, started.wait, 10)
+            first.cancel()
+            second = asyncio.ensure_future(
+                analyzer.compute(bformat_input_dict, 0.002, -60, 0.3)
+            )
+            await asyncio.sleep(0.2)
+            calls_while_blocked = len(calls)
+            release.set()
+            result = await second
+        return first.cancelled(), calls_while_blocked, result
+
+    cancelled, calls_while_blocked, result = asyncio.run(main())
+
+    assert cancelled
+    assert calls_while_blocked == 1
+    assert len(result.reflection_times) > 0
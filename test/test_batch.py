@@ -0,0 +1,198 @@
+"""Unit tests for the aira.batch module."""
+
+import json
+import multiprocessing
+import subprocess
+import sys
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira import batch
+from aira.batch import read_manifest, run_batch
+from aira.utils.shared import receive_arrays
+from aira.utils.synthesis import synthesize_lss
+
+PARAMETERS = {
+    "integration_time": 0.002,
+    "intensity_threshold": -60,
+    "analysis_length": 0.3,
+}
+CAPSULE_KEYS = ("front_left_up", "front_right_down", "back_right_up", "back_left_down")
+
+# Runs a batch in a separate process whose workers are forked, so that anything
+# its resource tracker reports is written to the stderr of that process
+RUN_FORKED_BATCH = """
+import multiprocessing
+import sys
+from aira.batch import read_manifest, run_batch
+from aira.utils.shared import receive_arrays
+multiprocessing.set_start_method("fork")
+parameters = {"integration_time": 0.002, "intensity_threshold": -60,
+              "analysis_length": 0.3}
+print(run_batch(read_manifest(sys.argv[1]), sys.argv[2], parameters, workers=3))
+"""
+
+
+def test_run_batch_writes_and_resumes(
+    bformat_input_dict: dict, tmp_path
+):  # pylint: disable=redefined-outer-name
+    """WHEN running a batch twice over the same manifest
+    GIVEN two valid positions and one with a missing file
+    THEN results and errors are written once, and valid positions are not
+    analyzed again.
+    """
+    wav_name = Path(bformat_input_dict["stacked_signals"]).name
+    manifest_path = tmp_path / "manifest.csv"
+    manifest_path.write_text(
+        "position,input_mode,channels_per_file,frequency_correction,stacked_signals\n"
+        f"p1,bformat,4,false,{wav_name}\n"
+        f"p2,bformat,4,false,{wav_name}\n"
+        "p3,bformat,4,false,missing.wav\n",
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "results.jsonl"
+
+    positions = read_manifest(manifest_path)
+    counts = run_batch(positions, output_path, PARAMETERS, workers=2)
+    assert counts == {"ok": 2, "error": 1, "skipped": 0}
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    results = {record["position"]: record for record in records}
+    assert results["p3"]["status"] == "error"
+    assert results["p1"]["result"]["reflection_times"][0] == 0
+    assert "w_channel" not in results["p1"]["result"]
+
+    counts = run_batch(positions, output_path, PARAMETERS, workers=2)
+    assert counts == {"ok": 0, "error": 1, "skipped": 2}
+
+    counts = run_batch(positions[:1], output_path, PARAMETERS, workers=2)
+    assert counts == {"ok": 0, "error": 0, "skipped": 1}
+
+
+def test_only_large_results_use_shared_memory(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing a position in a worker
+    GIVEN a position whose w-channel envelope is requested
+    THEN the reflection arrays are returned in the record and only the envelope
+    travels through shared memory.
+    """
+    position = dict(bformat_input_dict, position="p1", input_mode="bformat")
+
+    record = batch.analyze_position(position, PARAMETERS, include_w_channel=False)
+    assert record["shared_arrays"] == {}
+    assert record["result"]["reflection_times"][0] == 0
+
+    record = batch.analyze_position(position, PARAMETERS, include_w_channel=True)
+    arrays = receive_arrays(record["shared_arrays"])
+    assert list(arrays) == ["w_channel"]
+    assert "w_channel" not in record["result"]
+    assert isinstance(record["result"]["reflection_levels"], list)
+
+
+def test_read_toml_manifest(tmp_path):
+    """WHEN reading a TOML manifest
+    GIVEN defaults and a position overriding them
+    THEN defaults are merged and paths resolved from the manifest directory.
+    """
+    manifest_path = tmp_path / "manifest.toml"
+    manifest_path.write_text(
+        "[defaults]\n"
+        'input_mode = "bformat"\n'
+        "channels_per_file = 4\n"
+        "analysis_length = 0.5\n"
+        "[[positions]]\n"
+        'position = "p1"\n'
+        'stacked_signals = "p1.wav"\n'
+        "analysis_length = 0.2\n",
+        encoding="utf-8",
+    )
+
+    (position,) = read_manifest(manifest_path)
+
+    assert position["input_mode"] == "bformat"
+    assert position["analysis_length"] == 0.2
+    assert position["stacked_signals"] == str(tmp_path / "p1.wav")
+
+
+def test_interrupted_batch_unlinks_shared_filters(tmp_path, monkeypatch):
+    """WHEN a batch is interrupted before its positions finish
+    GIVEN a position with an inverse filter shared with the workers and an output
+    file that can not be opened
+    THEN the error is raised and the shared memory of the filter is unlinked.
+    """
+    shared = []
+
+    def share_and_remember(positions):
+        shared.extend(share_inverse_filters(positions))
+        return shared
+
+    share_inverse_filters = batch.share_inverse_filters
+    monkeypatch.setattr(batch, "share_inverse_filters", share_and_remember)
+    inverse_filter_path = tmp_path / "inverse.wav"
+    batch.sf.write(inverse_filter_path, [0.0, 1.0, 0.0], 48000)
+    positions = [
+        {
+            "position": "p1",
+            "input_mode": "lss",
+            "inverse_filter": str(inverse_filter_path),
+        }
+    ]
+
+    with pytest.raises(OSError):
+        run_batch(positions, tmp_path, PARAMETERS, workers=1, resume=False)
+
+    assert len(shared) == 1
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=shared[0].handle.name)
+
+
+@pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(),
+    reason="The fork start method is not available",
+)
+def test_forked_batch_keeps_shared_filter_registered(
+    synthetic_reflections: list, tmp_path
+):  # pylint: disable=redefined-outer-name
+    """WHEN running a batch whose workers are forked
+    GIVEN LSS positions sharing one inverse filter, mapped by several workers
+    THEN every position is analyzed and the resource tracker reports no error when
+    the filter is unlinked.
+    """
+    captures, inverse_filter = synthesize_lss(synthetic_reflections, 48000, 0.4)
+    for key, capture in zip(CAPSULE_KEYS, captures):
+        batch.sf.write(tmp_path / f"{key}.wav", capture / np.abs(captures).max(), 48000)
+    batch.sf.write(tmp_path / "inverse.wav", inverse_filter, 48000, "FLOAT")
+    manifest_path = tmp_path / "manifest.csv"
+    manifest_path.write_text(
+        f"position,input_mode,{','.join(CAPSULE_KEYS)},inverse_filter\n"
+        + "".join(
+            f"p{i},lss,{','.join(f'{key}.wav' for key in CAPSULE_KEYS)},inverse.wav\n"
+            for i in range(6)
+        ),
+        encoding="utf-8",
+    )
+
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            RUN_FORKED_BATCH,
+            str(manifest_path),
+            str(tmp_path / "results.jsonl"),
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert "'ok': 6" in completed.stdout
+    assert completed.stderr == ""
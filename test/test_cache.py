@@ -0,0 +1,137 @@
+"""Unit tests for the aira.utils.cache module."""
+
+import io
+
+import numpy as np
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira import core
+from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.utils.cache import BFormatCache, ResultCache, hash_inputs
+
+
+def test_cached_analysis_skips_processing(
+    bformat_input_dict: dict, tmp_path, monkeypatch
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing the same measurement twice with a result cache
+    GIVEN unchanged files and parameters
+    THEN the second analysis returns the stored result and figure without reading
+    the files.
+    """
+    analyzer = AmbisonicsImpulseResponseAnalyzer(cache=ResultCache(tmp_path / "c"))
+    result = analyzer.compute(dict(bformat_input_dict), 0.002, -60, 0.3)
+    fig = analyzer.analyze(dict(bformat_input_dict), 0.002, -60, 0.3)
+
+    def fail(*_):
+        raise AssertionError("Cached analyses should not read the files")
+
+    monkeypatch.setattr(core, "read_signals_dict", fail)
+    cached_result = analyzer.compute(dict(bformat_input_dict), 0.002, -60, 0.3)
+    cached_fig = analyzer.analyze(dict(bformat_input_dict), 0.002, -60, 0.3)
+
+    np.testing.assert_allclose(cached_result.reflection_times, result.reflection_times)
+    np.testing.assert_allclose(cached_result.w_channel, result.w_channel)
+    assert cached_result.sample_rate == result.sample_rate
+    assert len(cached_fig.data) == len(fig.data)
+
+
+def test_bformat_cache_skips_input_processing(
+    bformat_input_dict: dict, tmp_path, monkeypatch
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing a measurement again with other parameters
+    GIVEN an analyzer with a B-format cache
+    THEN the processed signals are memory-mapped from the cache instead of decoded,
+    and the results match an uncached analysis.
+    """
+    bformat_cache = BFormatCache(tmp_path / "bformat")
+    analyzer = AmbisonicsImpulseResponseAnalyzer(bformat_cache=bformat_cache)
+    analyzer.compute(dict(bformat_input_dict), 0.002, -60, 0.3)
+    expected = AmbisonicsImpulseResponseAnalyzer().compute(
+        dict(bformat_input_dict), 0.005, -50, 0.2
+    )
+
+    def fail(*_):
+        raise AssertionError("Cached signals should not be decoded")
+
+    monkeypatch.setattr(core, "read_signals_dict", fail)
+    result = analyzer.compute(dict(bformat_input_dict), 0.005, -50, 0.2)
+
+    bformat, sample_rate = bformat_cache.load(hash_inputs(bformat_input_dict))
+    assert isinstance(bformat, np.memmap)
+    assert sample_rate == expected.sample_rate
+    np.testing.assert_allclose(result.reflection_times, expected.reflection_times)
+    np.testing.assert_allclose(result.w_channel, expected.w_channel)
+
+
+def test_cache_key_depends_on_content_and_parameters(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN building cache keys
+    GIVEN changes in the analysis parameters or in the file content
+    THEN the key changes, and it does not when nothing changes.
+    """
+    key = hash_inputs(bformat_input_dict, integration_time=0.002)
+
+    assert key == hash_inputs(dict(bformat_input_dict), integration_time=0.002)
+    assert key != hash_inputs(bformat_input_dict, integration_time=0.005)
+    assert key != hash_inputs(
+        {**bformat_input_dict, "frequency_correction": True}, integration_time=0.002
+    )
+
+    with open(bformat_input_dict["stacked_signals"], "ab") as wav_file:
+        wav_file.write(b"\0\0\0\0")
+    assert key != hash_inputs(bformat_input_dict, integration_time=0.002)
+
+
+def test_unseekable_inputs_are_not_cached():
+    """WHEN building the cache key of an input read from a file object
+    GIVEN a file object that can not be rewound after hashing it
+    THEN there is no key, so nothing is cached for it.
+    """
+
+    class Unseekable(io.RawIOBase):
+        """Readable stream that can not seek, like a pipe."""
+
+        def readable(self):
+            return True
+
+    assert hash_inputs({"stacked_signals": io.BytesIO(b"RIFF")}) is not None
+    assert hash_inputs({"stacked_signals": Unseekable()}) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """WHEN storing results beyond the size budget of the cache
+    GIVEN an entry that was read after being stored
+    THEN the least recently used entries are evicted first.
+    """
+    values = {"array": np.zeros(1000), "sample_rate": 48000}
+    cache = ResultCache(tmp_path, max_bytes=20000)
+    cache.store("first", values)
+    cache.store("second", values)
+    entry_size = sum(file.stat().st_size for file in (tmp_path / "first").iterdir())
+    cache.max_bytes = 2 * entry_size
+    assert cache.load("first")["sample_rate"] == 48000
+
+    cache.store("third", values)
+
+    assert cache.load("second") is None
+    assert cache.load("first") is not None
+    assert cache.load("third") is not None
+
+
+def test_clear_leaves_entries_being_written(tmp_path):
+    """WHEN clearing a cache
+    GIVEN a stored entry and an entry still being written by another process
+    THEN the stored entry is removed and the one being written is left alone.
+    """
+    cache = ResultCache(tmp_path)
+    cache.store("stored", {"sample_rate": 48000})
+    temp_path = cache._temp_entry()  # pylint: disable=protected-access
+
+    cache.clear()
+
+    assert cache.load("stored") is None
+    assert temp_path.is_dir()
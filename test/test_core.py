@@ -0,0 +1,171 @@
+"""Unit tests for the aira.core module."""
+
+import io
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira.engine import plot
+from aira.core import AmbisonicsImpulseResponseAnalyzer, AnalysisResult
+
+
+def test_compute_returns_arrays_without_plotting(
+    bformat_input_dict: dict, monkeypatch
+):  # pylint: disable=redefined-outer-name
+    """WHEN running the compute-only analysis
+    GIVEN a synthetic B-format measurement
+    THEN reflections and w-channel arrays are returned and no figure is built.
+    """
+
+    def fail():
+        raise AssertionError("No figure should be built")
+
+    monkeypatch.setattr(plot, "setup_plotly_layout", fail)
+
+    result = AmbisonicsImpulseResponseAnalyzer().compute(
+        bformat_input_dict, 0.002, -60, 0.3
+    )
+
+    assert isinstance(result, AnalysisResult)
+    assert len(result.reflection_times) == len(result.reflection_levels)
+    assert len(result.reflection_times) == len(result.reflection_azimuths)
+    assert len(result.reflection_times) == len(result.reflection_elevations)
+    assert result.reflection_times[0] == 0
+    assert result.reflection_levels[0] == 0
+    assert result.w_channel.max() == 1
+
+
+def test_analyze_builds_figure_from_result(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing a measurement
+    GIVEN a synthetic B-format measurement
+    THEN the figure has the hedgehog and both w-channel traces.
+    """
+    fig = AmbisonicsImpulseResponseAnalyzer().analyze(
+        bformat_input_dict, 0.002, -60, 0.3
+    )
+
+    assert len(fig.data) == 3
+
+
+def test_import_does_not_load_plotting_nor_scipy_signal():
+    """WHEN importing aira.core in a new interpreter
+    GIVEN that no figure is built and no signal is processed
+    THEN neither Plotly nor scipy.signal are loaded.
+    """
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, aira.core; "
+            "print([name for name in ('plotly', 'scipy.signal', 'pandas') "
+            "if name in sys.modules])",
+        ],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).parents[1],
+    ).stdout.strip()
+
+    assert loaded == "[]"
+
+
+def test_compute_recovers_reflections_without_modifying_input(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN running the analysis without frequency correction
+    GIVEN a synthetic B-format measurement with two known reflections
+    THEN their delays and directions are recovered and the input dictionary is left
+    untouched.
+    """
+    input_dict = dict(bformat_input_dict)
+
+    result = AmbisonicsImpulseResponseAnalyzer().compute(input_dict, 0.002, -60, 0.3)
+
+    assert input_dict == bformat_input_dict
+    np.testing.assert_allclose(result.reflection_times, [0, 0.02, 0.04], atol=0.002)
+    np.testing.assert_allclose(result.reflection_azimuths, [0, 90, -150], atol=1)
+    np.testing.assert_allclose(result.reflection_elevations, [0, 20, -10], atol=1)
+
+
+def test_threshold_is_applied_without_analyzing_again(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN changing the intensity threshold of a result and of its figure
+    GIVEN an analysis of a synthetic B-format measurement with a low threshold
+    THEN they match an analysis and a figure made with the new threshold.
+    """
+    analyzer = AmbisonicsImpulseResponseAnalyzer()
+    result = analyzer.compute(bformat_input_dict, 0.002, -60, 0.3)
+    expected = analyzer.compute(bformat_input_dict, 0.002, -15, 0.3)
+    fig = result.to_figure()
+
+    thresholded = result.with_threshold(-15)
+    thresholded.update_figure(fig)
+
+    assert 0 < len(thresholded.reflection_times) < len(result.reflection_times)
+    assert thresholded.to_dict() == expected.to_dict()
+    assert fig.to_plotly_json() == expected.to_figure().to_plotly_json()
+
+
+def test_compute_reads_inputs_from_memory(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN passing the measurement as bytes, a file object or an array
+    GIVEN a synthetic B-format measurement
+    THEN the results match the analysis of its file.
+    """
+    path = bformat_input_dict["stacked_signals"]
+    content = Path(path).read_bytes()
+    signals, sample_rate = sf.read(path)
+    analyzer = AmbisonicsImpulseResponseAnalyzer()
+    expected = analyzer.compute(bformat_input_dict, 0.002, -60, 0.3)
+
+    for stacked_signals, extra in (
+        (content, {}),
+        (io.BytesIO(content), {}),
+        (signals.T, {"sample_rate": sample_rate}),
+    ):
+        input_dict = {
+            **bformat_input_dict,
+            "stacked_signals": stacked_signals,
+            **extra,
+        }
+        result = analyzer.compute(input_dict, 0.002, -60, 0.3)
+        np.testing.assert_array_equal(result.w_channel, expected.w_channel)
+        np.testing.assert_array_equal(
+            result.reflection_azimuths, expected.reflection_azimuths
+        )
+
+
+def test_concurrent_analyses_share_one_analyzer(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN running several analyses at once on a thread pool
+    GIVEN a single analyzer and different analysis parameters
+    THEN every result matches the one of the same analysis run alone.
+    """
+    analyzer = AmbisonicsImpulseResponseAnalyzer()
+    parameters = [(0.001, -60, 0.3), (0.002, -50, 0.2), (0.005, -40, 0.4)] * 3
+    expected = [analyzer.compute(bformat_input_dict, *p) for p in parameters]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(lambda p: analyzer.compute(bformat_input_dict, *p), parameters)
+        )
+
+    for result, expected_result in zip(results, expected):
+        np.testing.assert_array_equal(
+            result.reflection_times, expected_result.reflection_times
+        )
+        np.testing.assert_array_equal(result.w_channel, expected_result.w_channel)
@@ -0,0 +1,57 @@
+"""Unit tests for the aira.engine.input module."""
+
+import numpy as np
+
+from aira.engine.input import (
+    AFormatProcessor,
+    BFormatProcessor,
+    InputMode,
+    InputProcessorChain,
+)
+
+
+def test_bformat_correction_runs_only_when_requested():
+    """WHEN processing B-format signals
+    GIVEN the frequency correction disabled, and then enabled
+    THEN the signals are passed through untouched when disabled, and corrected into
+    a new array, without modifying the input, when enabled.
+    """
+    signals = np.random.default_rng(0).standard_normal((4, 4800))
+    input_dict = {
+        "input_mode": InputMode.BFORMAT,
+        "stacked_signals": signals,
+        "sample_rate": 48000,
+    }
+    processor = BFormatProcessor()
+
+    uncorrected = processor.process({**input_dict, "frequency_correction": False})
+    corrected = processor.process({**input_dict, "frequency_correction": True})
+
+    assert uncorrected["stacked_signals"] is signals
+    assert corrected["stacked_signals"].dtype == np.float64
+    assert not np.allclose(corrected["stacked_signals"], signals)
+    np.testing.assert_array_equal(
+        signals, np.random.default_rng(0).standard_normal((4, 4800))
+    )
+
+
+def test_chain_applies_correction_only_when_requested():
+    """WHEN processing A-format and B-format signals through the input chain
+    GIVEN the frequency correction disabled, and then enabled
+    THEN disabled correction returns the B-format signals as converted or read,
+    and enabled correction changes them.
+    """
+    aformat = np.random.default_rng(1).standard_normal((4, 4800))
+    chain = InputProcessorChain()
+    for input_dict in (
+        {"input_mode": InputMode.AFORMAT, "stacked_signals": aformat},
+        {"input_mode": InputMode.BFORMAT, "stacked_signals": aformat},
+    ):
+        input_dict["sample_rate"] = 48000
+        expected = AFormatProcessor().process(dict(input_dict))["stacked_signals"]
+
+        uncorrected = chain.process({**input_dict, "frequency_correction": False})
+        corrected = chain.process({**input_dict, "frequency_correction": True})
+
+        np.testing.assert_array_equal(uncorrected, expected)
+        assert not np.allclose(corrected, expected)
@@ -0,0 +1,53 @@
+"""Unit tests for the aira.utils.jobs module."""
+
+import threading
+
+from aira.utils.jobs import JobQueue
+
+
+def test_job_queue_caps_running_jobs_and_reports_positions():
+    """WHEN submitting more jobs than the concurrency limit
+    GIVEN a queue that runs a single job at once
+    THEN the other jobs wait in submission order and report their position.
+    """
+    release = threading.Event()
+    jobs = JobQueue(max_concurrency=1)
+
+    futures = [jobs.submit(key, release.wait, 10) for key in "abc"]
+    while jobs.position("a") != 0:
+        threading.Event().wait(0.01)
+
+    assert [jobs.position(key) for key in "abc"] == [0, 1, 2]
+    assert (jobs.running, jobs.waiting) == (1, 2)
+    release.set()
+    assert all(future.result(10) for future in futures)
+    jobs.shutdown()
+    assert jobs.position("a") is None
+
+
+def test_job_queue_deduplicates_jobs_in_flight():
+    """WHEN submitting a job with the key of a job in flight
+    GIVEN a queue whose first job is still running
+    THEN both submissions share one future and the function runs once, and the key
+    can be submitted again once the job finished.
+    """
+    release = threading.Event()
+    calls = []
+    jobs = JobQueue(max_concurrency=2)
+
+    def job():
+        calls.append(None)
+        release.wait(10)
+        return len(calls)
+
+    first = jobs.submit("key", job)
+    second = jobs.submit("key", job)
+    release.set()
+
+    assert first is second
+    assert first.result(10) == 1
+    first_done = threading.Event()
+    first.add_done_callback(lambda _: first_done.set())
+    first_done.wait(10)
+    assert jobs.submit("key", job).result(10) == 2
+    jobs.shutdown()
@@ -0,0 +1,107 @@
+"""Unit tests for the aira.engine.plot module."""
+
+import importlib.util
+
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+
+from aira.engine.plot import (
+    W_CHANNEL_MAX_POINTS,
+    export_images,
+    hedgehog_data,
+    setup_plotly_layout,
+    w_channel,
+)
+
+
+def test_figures_are_exported_in_parallel(tmp_path):
+    """WHEN exporting several figures at once
+    GIVEN a pool of two renderer processes
+    THEN every figure is written to its image file and the throughput is reported.
+    """
+    pytest.importorskip("kaleido")
+    figures = [go.Figure(go.Scatter(y=[0, index, 0])) for index in range(4)]
+    paths = [tmp_path / f"figure_{index}.png" for index in range(4)]
+
+    stats = export_images(figures, paths, workers=2, width=100, height=100)
+
+    assert stats["images"] == 4
+    assert stats["images_per_second"] > 0
+    assert all(path.read_bytes().startswith(b"\x89PNG") for path in paths)
+
+
+def test_export_fails_when_the_renderer_can_not_start(tmp_path):
+    """WHEN exporting figures
+    GIVEN that Kaleido is not installed, so the renderer can not be warmed up
+    THEN the export fails with an error about the renderer.
+    """
+    if importlib.util.find_spec("kaleido") is not None:
+        pytest.skip("Kaleido is installed")
+
+    with pytest.raises(RuntimeError, match="renderer"):
+        export_images([go.Figure()], [tmp_path / "figure.png"], workers=1)
+
+
+def test_long_w_channel_is_decimated_keeping_its_peaks():
+    """WHEN plotting an omnidirectional channel envelope longer than the limit
+    GIVEN a noisy envelope with a peak at an arbitrary sample
+    THEN the trace is drawn with WebGL from at most the maximum number of points,
+    keeping the peak and both ends of the envelope.
+    """
+    envelope = np.random.default_rng(0).uniform(0, 0.5, 10 * W_CHANNEL_MAX_POINTS)
+    envelope[12345] = 1
+    time = np.arange(len(envelope)) / 48
+    fig = setup_plotly_layout()
+
+    w_channel(fig, time, envelope, np.array([1.0]))
+
+    trace = fig.data[0]
+    assert isinstance(trace, go.Scattergl)
+    assert len(trace.x) <= W_CHANNEL_MAX_POINTS + 2
+    assert max(trace.y) == 1
+    assert (trace.x[0], trace.x[-1]) == (time[0], time[-1])
+    assert np.all(np.diff(trace.x) > 0)
+
+
+def test_hedgehog_data_is_a_single_precision_polyline():
+    """WHEN computing the data of the hedgehog trace
+    GIVEN a direct sound and two reflections
+    THEN every line starts at the origin, its hover data follows its tip and all
+    arrays are single precision.
+    """
+    data = hedgehog_data(
+        np.array([0.0, 2.5, 7.25]),
+        np.array([0.0, -6.0, -12.0]),
+        np.array([0.0, 90.0, -45.0]),
+        np.array([0.0, 30.0, -10.0]),
+    )
+
+    assert all(values.dtype == np.float32 for values in data.values())
+    assert len(data["x"]) == 6
+    np.testing.assert_array_equal(data["x"][::2], 0)
+    np.testing.assert_array_equal(data["customdata"][::2], 0)
+    np.testing.assert_array_equal(data["customdata"][5], [-12.0, 7.25, -45.0, -10.0])
+    assert data["line_color"][1] == 1
+
+
+def test_serialized_hedgehog_is_half_the_size_of_double_precision():
+    """WHEN serializing a figure with a dense hedgehog
+    GIVEN 500 reflections
+    THEN its arrays are written as single precision typed arrays, and the figure
+    JSON is at most a bit over half the size it has with double precision arrays.
+    """
+    rng = np.random.default_rng(0)
+    data = hedgehog_data(
+        np.sort(rng.uniform(0, 500, 500)),
+        np.append(0, -rng.uniform(0, 60, 499)),
+        rng.uniform(-180, 180, 500),
+        rng.uniform(-90, 90, 500),
+    )
+    single = go.Figure(go.Scatter3d(**data)).to_json()
+    double = go.Figure(
+        go.Scatter3d(**{key: value.astype(float) for key, value in data.items()})
+    ).to_json()
+
+    assert '"dtype":"f4"' in single
+    assert len(single) < 0.55 * len(double)
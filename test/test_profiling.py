@@ -0,0 +1,125 @@
+"""Unit tests for the aira.utils.profiling module."""
+
+import json
+import tracemalloc
+
+import numpy as np
+import pytest
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.engine.input import InputMode, LSSInputProcessor
+from aira.utils import StageProfiler
+from aira.utils.profiling import AnalysisCancelled, CancellableProfiler
+
+
+def test_analyze_records_every_stage(
+    bformat_input_dict: dict, tmp_path
+):  # pylint: disable=redefined-outer-name
+    """WHEN analyzing a measurement with a StageProfiler
+    GIVEN a B-format input
+    THEN every stage is recorded and exported as a Chrome trace.
+    """
+    profiler = StageProfiler()
+    AmbisonicsImpulseResponseAnalyzer().analyze(
+        bformat_input_dict, 0.01, -60, 0.3, profiler=profiler
+    )
+
+    summary = profiler.summary()
+    assert list(summary) == [
+        "decode",
+        "deconvolution",
+        "a_to_b_conversion",
+        "correction",
+        "intensity",
+        "integration",
+        "detection",
+        "w_channel",
+        "plotting",
+    ]
+    assert all(stage["wall_time"] >= 0 for stage in summary.values())
+    assert summary["decode"]["peak_bytes"] > 0
+
+    trace_path = tmp_path / "trace.json"
+    profiler.export_chrome_trace(trace_path)
+    with open(trace_path, "r", encoding="utf-8") as trace_file:
+        events = json.load(trace_file)["traceEvents"]
+    assert [event["name"] for event in events] == list(summary)
+    assert all(event["ph"] == "X" for event in events)
+
+
+def test_cancelled_deconvolution_stops_between_channels():
+    """WHEN cancelling an analysis during the deconvolution of an LSS measurement
+    GIVEN a profiler cancelled after the first channel was deconvolved
+    THEN the deconvolution stops before the next channel.
+    """
+    checkpoints = []
+
+    class CancelAfterFirstChannel(CancellableProfiler):
+        """Profiler cancelled at its second checkpoint."""
+
+        def checkpoint(self):
+            checkpoints.append(None)
+            if len(checkpoints) == 2:
+                self.cancel()
+            super().checkpoint()
+
+    rng = np.random.default_rng(0)
+    input_dict = {
+        "stacked_signals": rng.standard_normal((4, 4800)),
+        "inverse_filter": rng.standard_normal(4800),
+        "input_mode": InputMode.LSS,
+    }
+    processed = LSSInputProcessor().process(input_dict)
+
+    with pytest.raises(AnalysisCancelled):
+        LSSInputProcessor().process(input_dict, CancelAfterFirstChannel())
+
+    assert processed["stacked_signals"].shape == (4, 9599)
+    np.testing.assert_allclose(
+        processed["stacked_signals"][0],
+        np.convolve(input_dict["stacked_signals"][0], input_dict["inverse_filter"]),
+        atol=1e-9,
+    )
+    assert len(checkpoints) == 2
+
+
+def test_failed_analysis_stops_memory_tracing():
+    """WHEN an analysis with a StageProfiler fails
+    GIVEN an input without audio files nor sample rate
+    THEN the error is raised and memory tracing is stopped anyway.
+    """
+    with pytest.raises(ValueError):
+        AmbisonicsImpulseResponseAnalyzer().compute(
+            {"input_mode": InputMode.BFORMAT, "channels_per_file": 4},
+            0.01,
+            -60,
+            0.3,
+            StageProfiler(),
+        )
+
+    assert not tracemalloc.is_tracing()
+
+
+def test_concurrent_profilers_share_memory_tracing():
+    """WHEN two profilers measure stages at the same time
+    GIVEN a stage of the second profiler starting inside a stage of the first one
+    THEN the peak of the first stage is kept, and tracing stops only once both
+    profilers are closed.
+    """
+    first, second = StageProfiler(), StageProfiler()
+
+    with first.stage("allocation"):
+        buffer = np.ones(1_000_000)
+        del buffer
+        with second.stage("other"):
+            pass
+    first.close()
+
+    assert first.summary()["allocation"]["peak_bytes"] >= 8_000_000
+    assert tracemalloc.is_tracing()
+    second.close()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,54 @@
+"""Unit tests for the aira.engine.raster module."""
+
+import numpy as np
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.engine.raster import portland, rasterize_hedgehog
+
+
+def test_rasterized_lines_follow_the_reflections():
+    """WHEN rasterizing the projection of a hedgehog
+    GIVEN a direct sound from the front, a reflection from the left and the weakest
+    reflection from behind
+    THEN the direct sound is a line to the right ending in the top color of the
+    colorscale, the reflection a shorter line upwards, the weakest reflection has
+    no length and the rest is transparent.
+    """
+    rgba = rasterize_hedgehog(
+        np.array([0.0, -20.0, -40.0]),
+        np.array([0.0, 90.0, 180.0]),
+        np.array([0.0, 0.0, 0.0]),
+        100,
+    )
+    alpha = rgba[..., 3]
+
+    assert rgba.shape == (100, 100, 4)
+    assert rgba.dtype == np.uint8
+    assert alpha[50, 97] == 255
+    np.testing.assert_allclose(rgba[50, 97, :3], portland(1.0), atol=8)
+    assert alpha[40, 50] == 255
+    assert alpha[2, 50] == 0
+    assert alpha[50, 2] == 0
+    assert alpha[97, 50] == 0
+    assert not rasterize_hedgehog(np.array([]), np.array([]), np.array([])).any()
+
+
+def test_result_projection_is_rasterized(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN asking a result for its projection on the horizontal plane
+    GIVEN the analysis of a synthetic B-format measurement
+    THEN an RGBA image of the requested size is drawn.
+    """
+    result = AmbisonicsImpulseResponseAnalyzer().compute(
+        bformat_input_dict, 0.002, -60, 0.3
+    )
+
+    rgba = result.to_xy_projection(64)
+
+    assert rgba.shape == (64, 64, 4)
+    assert rgba[..., 3].any()
@@ -0,0 +1,78 @@
+"""Unit tests for the aira.engine.raycasting module."""
+
+import numpy as np
+import pytest
+
+from aira.engine.raycasting import (
+    BoundingVolumeHierarchy,
+    TriangleMesh,
+    associate_reflections,
+)
+
+SHOEBOX_OBJ = """# 10 x 8 x 4 m room
+v 0 0 0
+v 10 0 0
+v 10 8 0
+v 0 8 0
+v 0 0 4
+v 10 0 4
+v 10 8 4
+v 0 8 4
+g floor
+f 1 2 3 4
+g ceiling
+f 5 8 7 6
+g front
+f 2 6 7 3
+g rear
+f 1 4 8 5
+g left
+f 4 3 7 8
+g right
+f 1 5 6 2
+"""
+
+
+@pytest.fixture
+def shoebox_bvh(tmp_path) -> BoundingVolumeHierarchy:
+    """Return a hierarchy built over a shoebox room loaded from an OBJ file."""
+    obj_path = tmp_path / "shoebox.obj"
+    obj_path.write_text(SHOEBOX_OBJ, encoding="utf-8")
+    return BoundingVolumeHierarchy(TriangleMesh.from_obj(obj_path), leaf_size=2)
+
+
+def test_associate_reflections_with_shoebox_surfaces(
+    shoebox_bvh: BoundingVolumeHierarchy,  # pylint: disable=redefined-outer-name
+):
+    """WHEN casting rays along the hedgehog directions
+    GIVEN a receiver inside a shoebox room
+    THEN each direction hits the expected wall at the expected distance.
+    """
+    receiver = np.array([4.0, 3.0, 1.5])
+    azimuth = np.array([0, 180, 90, -90, 0, 0])
+    elevation = np.array([0, 0, 0, 0, 90, -90])
+
+    surfaces, triangles, distances, hit_points = associate_reflections(
+        shoebox_bvh, receiver, azimuth, elevation
+    )
+
+    assert list(surfaces) == ["front", "rear", "left", "right", "ceiling", "floor"]
+    assert np.all(triangles >= 0)
+    np.testing.assert_allclose(distances, [6, 4, 5, 3, 2.5, 1.5])
+    np.testing.assert_allclose(hit_points[0], [10, 3, 1.5], atol=1e-9)
+
+
+def test_rays_leaving_the_mesh_report_no_surface(
+    shoebox_bvh: BoundingVolumeHierarchy,  # pylint: disable=redefined-outer-name
+):
+    """WHEN casting a ray away from the mesh
+    GIVEN a receiver outside the room
+    THEN no surface, triangle or distance is reported.
+    """
+    surfaces, triangles, distances, _ = associate_reflections(
+        shoebox_bvh, np.array([20.0, 4.0, 2.0]), np.array([0]), np.array([0])
+    )
+
+    assert surfaces[0] is None
+    assert triangles[0] == -1
+    assert np.isinf(distances[0])
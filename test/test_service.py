@@ -0,0 +1,154 @@
+"""Unit tests for the aira.service module, against a server on localhost."""
+
+import base64
+import json
+import threading
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pytest
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
+
+from aira.core import AmbisonicsImpulseResponseAnalyzer
+from aira.service import AnalysisHTTPServer, AnalysisService
+from aira.utils.cache import ResultCache
+
+
+@pytest.fixture
+def server(tmp_path):
+    """Return a running service with one worker, a queue of one job and a cache."""
+    service = AnalysisService(1, 1, ResultCache(tmp_path / "cache"))
+    http_server = AnalysisHTTPServer(("127.0.0.1", 0), service, verbose=False)
+    thread = threading.Thread(target=http_server.serve_forever, daemon=True)
+    thread.start()
+    yield http_server
+    http_server.shutdown()
+    http_server.server_close()
+
+
+def request(
+    server, path: str, payload: dict = None
+):  # pylint: disable=redefined-outer-name
+    """Sends a request to the server and returns the status, headers and body."""
+    url = f"http://127.0.0.1:{server.server_address[1]}{path}"
+    data = None if payload is None else json.dumps(payload).encode()
+    try:
+        with urllib.request.urlopen(url, data, timeout=60) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as error:
+        return error.code, error.headers, error.read()
+
+
+def position(input_dict: dict) -> dict:
+    """Converts an input dictionary to a JSON position."""
+    return {**input_dict, "input_mode": input_dict["input_mode"].value}
+
+
+def test_analyze_endpoint_returns_results_and_caches_them(
+    server, bformat_input_dict: dict
+):  # pylint: disable=redefined-outer-name
+    """WHEN posting the same analysis twice
+    GIVEN a synthetic B-format measurement
+    THEN the results match a local analysis and the second one is a cache hit.
+    """
+    payload = {**position(bformat_input_dict), "integration_time": 0.002}
+    expected = AmbisonicsImpulseResponseAnalyzer().compute(
+        bformat_input_dict, 0.002, -60, 0.5
+    )
+
+    status, headers, body = request(server, "/analyze", payload)
+    _, cached_headers, _ = request(server, "/analyze", payload)
+
+    assert status == 200
+    assert headers["X-Cache"] == "miss"
+    assert cached_headers["X-Cache"] == "hit"
+    np.testing.assert_allclose(
+        json.loads(body)["reflection_times"], expected.reflection_times
+    )
+
+
+def test_analyze_endpoint_renders_figures(
+    server, bformat_input_dict: dict
+):  # pylint: disable=redefined-outer-name
+    """WHEN asking for a figure or an HTML page
+    GIVEN a synthetic B-format measurement
+    THEN the Plotly figure or a page embedding it is returned.
+    """
+    payload = {**position(bformat_input_dict), "output": "figure"}
+    _, _, figure = request(server, "/analyze", payload)
+    _, headers, page = request(server, "/analyze", {**payload, "output": "html"})
+
+    assert len(json.loads(figure)["data"]) == 3
+    assert headers["Content-Type"].startswith("text/html")
+    assert b"plotly" in page
+
+
+def test_analyze_endpoint_decodes_uploads(
+    server, bformat_input_dict: dict
+):  # pylint: disable=redefined-outer-name
+    """WHEN posting a measurement uploaded as base64 instead of a path
+    GIVEN a synthetic B-format measurement
+    THEN the results match those of its file and of the cache entry of that file.
+    """
+    upload = base64.b64encode(Path(bformat_input_dict["stacked_signals"]).read_bytes())
+    payload = position(bformat_input_dict)
+
+    _, _, body = request(server, "/analyze", payload)
+    status, _, uploaded = request(
+        server,
+        "/analyze",
+        {**payload, "stacked_signals": {"base64": upload.decode()}},
+    )
+    invalid, _, _ = request(
+        server, "/analyze", {**payload, "stacked_signals": {"base64": "a"}}
+    )
+
+    assert status == 200
+    assert invalid == 400
+    assert json.loads(uploaded) == json.loads(body)
+
+
+def test_batch_endpoint_reports_each_position(
+    server, bformat_input_dict: dict
+):  # pylint: disable=redefined-outer-name
+    """WHEN posting a batch of positions
+    GIVEN a valid position and one with a missing file
+    THEN one record per position is returned with its status.
+    """
+    positions = [
+        {**position(bformat_input_dict), "position": "valid"},
+        {**position(bformat_input_dict), "position": "missing", "stacked_signals": "x"},
+    ]
+
+    status, _, body = request(
+        server,
+        "/batch",
+        {"positions": positions, "parameters": {"analysis_length": 0.3}},
+    )
+
+    records = json.loads(body)["positions"]
+    assert status == 200
+    assert [record["position"] for record in records] == ["valid", "missing"]
+    assert [record["status"] for record in records] == ["ok", "error"]
+
+
+def test_full_queue_rejects_requests(
+    server, bformat_input_dict: dict
+):  # pylint: disable=redefined-outer-name
+    """WHEN the job queue of the service is full
+    GIVEN a new analysis request
+    THEN it is rejected with 503 and a Retry-After header.
+    """
+    server.service._reserve(server.service.capacity)  # pylint: disable=protected-access
+
+    status, headers, _ = request(server, "/analyze", position(bformat_input_dict))
+    _, _, health = request(server, "/health")
+
+    assert status == 503
+    assert headers["Retry-After"]
+    assert json.loads(health)["in_flight"] == server.service.capacity
@@ -0,0 +1,64 @@
+"""Unit tests for the aira.utils.shared module."""
+
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from aira.utils.shared import SharedArray, attach_cached, receive_arrays, share_arrays
+
+# Attaches to a block in a separate process, which then waits for its resource
+# tracker to finish, so that a block left registered would be unlinked by then
+ATTACH_AND_EXIT = """
+import sys
+from multiprocessing import resource_tracker
+from aira.utils.shared import SharedArray, SharedArrayHandle
+SharedArray.attach(SharedArrayHandle(sys.argv[1], (16,), "<f8")).close()
+getattr(resource_tracker._resource_tracker, "_stop", lambda: None)()
+"""
+
+
+def _scale_shared(handle, factor):
+    """Reads a shared array in a worker and sends the scaled copy back."""
+    signal = attach_cached(handle)
+    return share_arrays({"scaled": signal * factor, "length": np.array([len(signal)])})
+
+
+def test_arrays_round_trip_through_shared_memory():
+    """WHEN a worker process maps a shared array and shares its results back
+    GIVEN an array owned by the parent process
+    THEN the worker reads it without pickling and the results are received intact.
+    """
+    signal = np.random.default_rng(0).standard_normal(48000)
+    shared_signal = SharedArray.create(signal)
+    try:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            handles = executor.submit(_scale_shared, shared_signal.handle, 2).result()
+        arrays = receive_arrays(handles)
+    finally:
+        shared_signal.unlink()
+
+    np.testing.assert_array_equal(arrays["scaled"], signal * 2)
+    assert arrays["length"][0] == signal.size
+
+
+def test_shared_array_outlives_the_processes_attached_to_it():
+    """WHEN a separate Python process attaches to a shared array and exits
+    GIVEN an array owned by the parent process
+    THEN the block is not unlinked when that process exits, and the parent can
+    still read it.
+    """
+    signal = np.arange(16.0)
+    shared_signal = SharedArray.create(signal)
+    try:
+        subprocess.run(
+            [sys.executable, "-c", ATTACH_AND_EXIT, shared_signal.handle.name],
+            check=True,
+        )
+        block = shared_memory.SharedMemory(name=shared_signal.handle.name)
+        np.testing.assert_array_equal(np.ndarray(16, buffer=block.buf), signal)
+        block.close()
+    finally:
+        shared_signal.unlink()
@@ -0,0 +1,88 @@
+"""Unit tests for the aira.utils.synthesis module."""
+
+import numpy as np
+import pytest
+from scipy.signal import fftconvolve
+
+from aira.engine.intensity import convert_bformat_to_intensity
+from aira.engine.reflections import score_detected_reflections
+from aira.utils import cartesian_to_spherical
+from aira.utils.synthesis import (
+    SyntheticReflection,
+    reflection_times_from_direct,
+    synthesize_aformat,
+    synthesize_bformat,
+    synthesize_lss,
+)
+
+SAMPLE_RATE = 48000
+
+
+@pytest.fixture
+def synthetic_reflections() -> list:
+    """Return the ground truth of a direct sound and three reflections."""
+    return [
+        SyntheticReflection(time=0.01, azimuth=30, elevation=10, level=0),
+        SyntheticReflection(time=0.025, azimuth=-120, elevation=0, level=-6),
+        SyntheticReflection(time=0.04, azimuth=90, elevation=45, level=-9),
+        SyntheticReflection(time=0.07, azimuth=180, elevation=-20, level=-12),
+    ]
+
+
+def test_bformat_intensity_points_to_the_direction_of_arrival(
+    synthetic_reflections: list,  # pylint: disable=redefined-outer-name
+):
+    """WHEN computing the intensity direction at each arrival
+    GIVEN a synthetic B-format impulse response
+    THEN azimuth and elevation match the ground truth.
+    """
+    bformat = synthesize_bformat(synthetic_reflections, SAMPLE_RATE, 0.2)
+    intensity_directions = convert_bformat_to_intensity(bformat)
+
+    for reflection in synthetic_reflections:
+        sample = int(round(reflection.time * SAMPLE_RATE))
+        _, azimuth, elevation = cartesian_to_spherical(
+            intensity_directions[:, sample : sample + 1]
+        )
+        # Azimuths of ±180° are the same direction
+        azimuth_error = (azimuth - reflection.azimuth + 180) % 360 - 180
+        assert np.isclose(azimuth_error, 0, atol=1e-6)
+        assert np.isclose(elevation, reflection.elevation, atol=1e-6)
+
+
+def test_lss_captures_deconvolve_to_aformat(
+    synthetic_reflections: list,  # pylint: disable=redefined-outer-name
+):
+    """WHEN convolving the synthetic LSS captures with the inverse filter
+    GIVEN captures generated from known reflections
+    THEN the A-format impulse responses are recovered.
+    """
+    captures, inverse_filter = synthesize_lss(
+        synthetic_reflections, SAMPLE_RATE, 0.2, sweep_duration=0.5
+    )
+    aformat = synthesize_aformat(synthetic_reflections, SAMPLE_RATE, 0.2)
+
+    delay = len(inverse_filter) - 1
+    impulse_responses = fftconvolve(captures, inverse_filter[np.newaxis, :], axes=1)
+    impulse_responses = impulse_responses[:, delay : delay + aformat.shape[1]]
+
+    assert np.abs(impulse_responses - aformat).max() < 0.01 * np.abs(aformat).max()
+
+
+def test_score_detected_reflections(
+    synthetic_reflections: list,  # pylint: disable=redefined-outer-name
+):
+    """WHEN scoring detections against the ground truth
+    GIVEN one missed reflection and one false detection
+    THEN precision, recall and timing error account for them.
+    """
+    expected_times = reflection_times_from_direct(synthetic_reflections)
+    detected_times = np.array([0.0151, 0.0299, 0.05])
+
+    precision, recall, timing_error = score_detected_reflections(
+        detected_times, expected_times, tolerance=0.001
+    )
+
+    assert precision == pytest.approx(2 / 3)
+    assert recall == pytest.approx(2 / 3)
+    assert timing_error == pytest.approx(0.0001)
@@ -1,10 +1,18 @@
 """Unit tests for the audio utility functions module."""
 
+import io
+from pathlib import Path
+
+import numpy as np
 from mock_data.recordings import (  # pylint: disable=unused-import
     aformat_signal_and_samplerate,
 )
+from mock_data.synthetic import (  # pylint: disable=unused-import
+    bformat_input_dict,
+    synthetic_reflections,
+)
 
-from aira.utils import read_aformat
+from aira.utils import read_aformat, read_signals_dict
 
 
 def test_read_aformat_from_list(
@@ -77,3 +85,22 @@ def test_read_aformat_from_dict(
     assert (
         expected_sample_rate == sample_rate
     ), f"Output sample rate: {sample_rate} != Expected sample rate: {expected_sample_rate}"
+
+
+def test_read_signals_dict_twice_from_file_object(
+    bformat_input_dict: dict,
+):  # pylint: disable=redefined-outer-name
+    """WHEN reading the signals of the same input dictionary twice
+    GIVEN a measurement given as a binary file object
+    THEN both reads decode the same signals, and the file object is left at its
+    position.
+    """
+    wav_file = io.BytesIO(Path(bformat_input_dict["stacked_signals"]).read_bytes())
+    input_dict = {**bformat_input_dict, "stacked_signals": wav_file}
+
+    first = read_signals_dict(input_dict)
+    second = read_signals_dict(input_dict)
+
+    assert wav_file.tell() == 0
+    assert first["stacked_signals"].shape[0] == 4
+    np.testing.assert_array_equal(first["stacked_signals"], second["stacked_signals"])